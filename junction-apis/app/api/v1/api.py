@@ -1,7 +1,11 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from app.api.v1.endpoints import clients
 from app.api.v1.endpoints import properties
 from app.api.v1.endpoints import recommendations
+from app.api.v1.endpoints import jobs
+from app.services.modules.model_utils import model_registry
+from app.services.modules.scoring_pool import scoring_pool
 
 api_router = APIRouter()
 
@@ -9,8 +13,15 @@ api_router = APIRouter()
 async def test_endpoint():
     return {"message": "API v1 is working"}
 
+@api_router.get("/ready")
+async def readiness():
+    """Readiness probe: 200 only once the match model is loaded and warmed up."""
+    status = {**model_registry.status(), "scoring_pool": scoring_pool.status()}
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
 # Include endpoint routers
 
 api_router.include_router(clients.router, prefix="/clients", tags=["clients"])
 api_router.include_router(properties.router, prefix="/properties", tags=["properties"])
-api_router.include_router(recommendations.router, tags=["recommendations"])
\ No newline at end of file
+api_router.include_router(recommendations.router, tags=["recommendations"])
+api_router.include_router(jobs.router, tags=["recommendations"])
\ No newline at end of file
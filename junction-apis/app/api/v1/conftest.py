@@ -0,0 +1,63 @@
+import uuid
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base, get_db
+from app.models.client import Client
+from app.models.property import Property
+from app.services.modules.bulk_jobs import BulkJobWorker, bulk_job_worker
+from app.services.modules.client_store import ClientSnapshot, client_store
+from app.services.modules.match_scores import IncrementalRescoring, incremental_rescoring
+from app.services.modules.response_cache import data_version
+from main import app
+
+CONTACTS_PATH = "./app/services/data/Synthetic_Contacts__2000_Buyers_.csv"
+PROPERTIES_PATH = "./app/services/data/synthetic_houses_200.csv"
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """The app on a local SQLite stand-in with 2000 clients and 200 properties."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'api.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    TestSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    contacts = pd.read_csv(CONTACTS_PATH)
+    properties = pd.read_csv(PROPERTIES_PATH, encoding="utf-8-sig")
+    with engine.begin() as connection:
+        for model, frame in ((Client, contacts), (Property, properties)):
+            columns = [c.name for c in model.__table__.columns if c.name in frame.columns]
+            records = frame[columns].astype(object).where(frame[columns].notna(), None).to_dict("records")
+            connection.execute(model.__table__.insert(), [dict(r, is_active=True) for r in records])
+
+    def get_test_db():
+        db = TestSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = get_test_db
+    monkeypatch.setattr(client_store, "snapshot_path", str(tmp_path / "clients_snapshot.npz"))
+    monkeypatch.setattr(client_store, "load_in_background", lambda session_factory: None)
+    monkeypatch.setattr(client_store, "ready", False)
+    monkeypatch.setattr(client_store, "_snapshot", ClientSnapshot.empty())
+    # Every test database starts again at client snapshot version 1: a new boot id keeps
+    # responses cached by an earlier test from matching
+    monkeypatch.setattr(data_version, "boot_id", uuid.uuid4().hex[:8])
+    monkeypatch.setattr(data_version, "_stored", None)
+    monkeypatch.setattr(bulk_job_worker, "result_dir", str(tmp_path / "bulk_jobs"))
+    monkeypatch.setattr(bulk_job_worker, "start", lambda session_factory: BulkJobWorker.start(bulk_job_worker, TestSession))
+    monkeypatch.setattr(
+        incremental_rescoring, "start", lambda session_factory: IncrementalRescoring.start(incremental_rescoring, TestSession)
+    )
+    monkeypatch.setattr(incremental_rescoring, "session_factory", None)
+    try:
+        with TestClient(app) as client:
+            yield client, contacts["client_id"].tolist()
+    finally:
+        app.dependency_overrides.pop(get_db, None)
@@ -1,17 +1,20 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import func, or_
 from app.core.database import get_db
 from app.models.client import Client
 from app.schemas.client import Client as ClientSchema, ClientCreate, ClientUpdate
+from app.services.modules.client_store import client_store
+from app.services.modules.match_scores import client_changed
 
 
 router = APIRouter()
 
 @router.post("/", response_model=ClientSchema)
-async def create_client(
+def create_client(
     client: ClientCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
@@ -30,27 +33,23 @@ async def create_client(
     db.add(db_client)
     db.commit()
     db.refresh(db_client)
+    client_store.upsert(db_client)
+    background_tasks.add_task(client_changed, db_client.client_id)
     
     return db_client
 
-@router.get("/", response_model=List[ClientSchema])
-async def get_clients(
-    skip: int = Query(0, ge=0, description="Number of clients to skip"),
-    limit: int = Query(100, ge=1, le=1000, description="Number of clients to return"),
-    location: Optional[str] = Query(None, description="Filter by preferred location"),
-    property_type: Optional[str] = Query(None, description="Filter by property type"),
-    min_budget: Optional[float] = Query(None, ge=0, description="Minimum budget filter"),
-    max_budget: Optional[float] = Query(None, ge=0, description="Maximum budget filter"),
-    has_kids: Optional[bool] = Query(None, description="Filter by has_kids status"),
-    marital_status: Optional[str] = Query(None, description="Filter by marital status"),
-    db: Session = Depends(get_db)
+def filter_clients(
+    query,
+    location: Optional[str] = None,
+    property_type: Optional[str] = None,
+    min_budget: Optional[float] = None,
+    max_budget: Optional[float] = None,
+    has_kids: Optional[bool] = None,
+    marital_status: Optional[str] = None
 ):
-    """
-    Retrieve clients with optional filtering.
-    """
-    query = db.query(Client).filter(Client.is_active == True)
+    """The GET /clients/ filters, shared with /clients/count."""
+    query = query.filter(Client.is_active == True)
     
-    # Apply filters
     if location:
         query = query.filter(Client.preferred_location.ilike(f"%{location}%"))
     
@@ -69,11 +68,57 @@ async def get_clients(
     if marital_status:
         query = query.filter(Client.marital_status == marital_status)
     
-    clients = query.offset(skip).limit(limit).all()
+    return query
+
+@router.get("/", response_model=List[ClientSchema])
+def get_clients(
+    response: Response,
+    skip: int = Query(0, ge=0, description="Number of clients to skip (prefer after_id for deep pages)"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of clients to return"),
+    after_id: Optional[int] = Query(None, ge=0, description="Cursor: only clients with id > after_id (the X-Next-Cursor of the previous page)"),
+    location: Optional[str] = Query(None, description="Filter by preferred location"),
+    property_type: Optional[str] = Query(None, description="Filter by property type"),
+    min_budget: Optional[float] = Query(None, ge=0, description="Minimum budget filter"),
+    max_budget: Optional[float] = Query(None, ge=0, description="Maximum budget filter"),
+    has_kids: Optional[bool] = Query(None, description="Filter by has_kids status"),
+    marital_status: Optional[str] = Query(None, description="Filter by marital status"),
+    db: Session = Depends(get_db)
+):
+    """
+    Retrieve clients with optional filtering, in id order.
+    Page with after_id: every page is one index range scan, however deep.
+    """
+    query = filter_clients(db.query(Client), location, property_type, min_budget, max_budget, has_kids, marital_status)
+    if after_id is not None:
+        query = query.filter(Client.id > after_id)
+    
+    clients = query.order_by(Client.id).offset(skip).limit(limit).all()
+    if len(clients) == limit:
+        response.headers["X-Next-Cursor"] = str(clients[-1].id)
     return clients
 
+@router.get("/count")
+def count_clients(
+    location: Optional[str] = Query(None, description="Filter by preferred location"),
+    property_type: Optional[str] = Query(None, description="Filter by property type"),
+    min_budget: Optional[float] = Query(None, ge=0, description="Minimum budget filter"),
+    max_budget: Optional[float] = Query(None, ge=0, description="Maximum budget filter"),
+    has_kids: Optional[bool] = Query(None, description="Filter by has_kids status"),
+    marital_status: Optional[str] = Query(None, description="Filter by marital status"),
+    db: Session = Depends(get_db)
+):
+    """
+    Number of active clients matching the GET /clients/ filters, with their budget range,
+    in one aggregate query (instead of probing with /clients/?limit=1).
+    """
+    query = db.query(func.count(Client.id), func.min(Client.min_budget_DZD), func.max(Client.max_budget_DZD))
+    total, min_budget_DZD, max_budget_DZD = filter_clients(
+        query, location, property_type, min_budget, max_budget, has_kids, marital_status
+    ).one()
+    return {"total": total, "min_budget_DZD": min_budget_DZD, "max_budget_DZD": max_budget_DZD}
+
 @router.get("/{client_id}", response_model=ClientSchema)
-async def get_client(
+def get_client(
     client_id: str,
     db: Session = Depends(get_db)
 ):
@@ -94,9 +139,10 @@ async def get_client(
     return client
 
 @router.put("/{client_id}", response_model=ClientSchema)
-async def update_client(
+def update_client(
     client_id: int,
     client_update: ClientUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
@@ -127,18 +173,24 @@ async def update_client(
             )
     
     # Update fields
+    previous_client_id = db_client.client_id
     update_data = client_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_client, field, value)
     
     db.commit()
     db.refresh(db_client)
+    if db_client.client_id != previous_client_id:
+        client_store.remove(previous_client_id)
+    client_store.upsert(db_client)
+    background_tasks.add_task(client_changed, db_client.client_id, previous_client_id)
     
     return db_client
 
 @router.delete("/{client_id}")
-async def delete_client(
+def delete_client(
     client_id: int,
+    background_tasks: BackgroundTasks,
     permanent: bool = Query(False, description="Permanently delete (true) or soft delete (false)"),
     db: Session = Depends(get_db)
 ):
@@ -153,6 +205,7 @@ async def delete_client(
             detail=f"Client with ID {client_id} not found"
         )
     
+    removed_client_id = client.client_id
     if permanent:
         # Permanent delete
         db.delete(client)
@@ -163,5 +216,7 @@ async def delete_client(
         message = f"Client {client_id} deactivated"
     
     db.commit()
+    client_store.remove(removed_client_id)
+    background_tasks.add_task(client_changed, removed_client_id)
     
     return {"message": message}
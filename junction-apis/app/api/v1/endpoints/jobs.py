@@ -0,0 +1,44 @@
+import os
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.schemas.bulk_job import BulkJob as BulkJobSchema, BulkJobCreate
+from app.services.modules.bulk_jobs import create_job, get_job
+
+router = APIRouter()
+
+@router.post("/recommendations/jobs", response_model=BulkJobSchema, status_code=202)
+def create_bulk_job(
+    job_in: BulkJobCreate = BulkJobCreate(),
+    db: Session = Depends(get_db)
+):
+    """
+    Queue GET /recommendations/properties/ as a background job. Poll
+    /recommendations/jobs/{job_id} for progress, then download /result (NDJSON).
+    """
+    return create_job(db, top_n=job_in.top_n, explain=job_in.explain, strict=job_in.strict)
+
+@router.get("/recommendations/jobs/{job_id}", response_model=BulkJobSchema)
+def get_bulk_job(
+    job_id: str,
+    db: Session = Depends(get_db)
+):
+    job = get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/recommendations/jobs/{job_id}/result")
+def get_bulk_job_result(
+    job_id: str,
+    db: Session = Depends(get_db)
+):
+    job = get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}, no result yet")
+    if not job.result_path or not os.path.exists(job.result_path):
+        raise HTTPException(status_code=410, detail="Job result is no longer available on this server")
+    return FileResponse(job.result_path, media_type="application/x-ndjson", filename=f"bulk_recommendations_{job_id}.ndjson")
@@ -1,15 +1,19 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.models.property import Property
 from app.schemas.property import Property as PropertySchema, PropertyCreate, PropertyUpdate
+from app.services.modules.match_scores import property_changed
+from app.services.modules.response_cache import data_version
 
 router = APIRouter()
 
 @router.post("/", response_model=PropertySchema)
-async def create_property(
+def create_property(
     property_in: PropertyCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     existing = db.query(Property).filter(Property.property_id == property_in.property_id).first()
@@ -19,21 +23,23 @@ async def create_property(
     db.add(db_property)
     db.commit()
     db.refresh(db_property)
+    data_version.bump_properties()
+    background_tasks.add_task(property_changed, db_property.property_id)
     return db_property
 
-@router.get("/", response_model=List[PropertySchema])
-async def get_properties(
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1, le=1000),
-    location: Optional[str] = Query(None),
-    property_type: Optional[str] = Query(None),
-    min_price: Optional[float] = Query(None, ge=0),
-    max_price: Optional[float] = Query(None, ge=0),
-    min_area: Optional[int] = Query(None, ge=0),
-    max_area: Optional[int] = Query(None, ge=0),
-    db: Session = Depends(get_db)
+def filter_properties(
+    query,
+    location: Optional[str] = None,
+    property_type: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_area: Optional[int] = None,
+    max_area: Optional[int] = None,
+    include_inactive: bool = False
 ):
-    query = db.query(Property)
+    """The GET /properties/ filters, shared with /properties/count."""
+    if not include_inactive:
+        query = query.filter(Property.is_active == True)
     if location:
         query = query.filter(Property.location.ilike(f"%{location}%"))
     if property_type:
@@ -46,11 +52,62 @@ async def get_properties(
         query = query.filter(Property.area >= min_area)
     if max_area is not None:
         query = query.filter(Property.area <= max_area)
-    properties = query.offset(skip).limit(limit).all()
+    return query
+
+@router.get("/", response_model=List[PropertySchema])
+def get_properties(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    after_id: Optional[int] = Query(None, ge=0, description="Cursor: only properties with id > after_id (the X-Next-Cursor of the previous page)"),
+    location: Optional[str] = Query(None),
+    property_type: Optional[str] = Query(None),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    min_area: Optional[int] = Query(None, ge=0),
+    max_area: Optional[int] = Query(None, ge=0),
+    include_inactive: bool = Query(False, description="Also list soft-deleted properties"),
+    db: Session = Depends(get_db)
+):
+    query = filter_properties(
+        db.query(Property), location, property_type, min_price, max_price, min_area, max_area, include_inactive
+    )
+    if after_id is not None:
+        query = query.filter(Property.id > after_id)
+    properties = query.order_by(Property.id).offset(skip).limit(limit).all()
+    if len(properties) == limit:
+        response.headers["X-Next-Cursor"] = str(properties[-1].id)
     return properties
 
+@router.get("/count")
+def count_properties(
+    location: Optional[str] = Query(None),
+    property_type: Optional[str] = Query(None),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    min_area: Optional[int] = Query(None, ge=0),
+    max_area: Optional[int] = Query(None, ge=0),
+    include_inactive: bool = Query(False, description="Also count soft-deleted properties"),
+    db: Session = Depends(get_db)
+):
+    """Number of properties matching the GET /properties/ filters, with their price and area ranges."""
+    query = db.query(
+        func.count(Property.id), func.min(Property.price_DZD), func.max(Property.price_DZD),
+        func.min(Property.area), func.max(Property.area)
+    )
+    total, min_price_DZD, max_price_DZD, min_area_m2, max_area_m2 = filter_properties(
+        query, location, property_type, min_price, max_price, min_area, max_area, include_inactive
+    ).one()
+    return {
+        "total": total,
+        "min_price_DZD": min_price_DZD,
+        "max_price_DZD": max_price_DZD,
+        "min_area": min_area_m2,
+        "max_area": max_area_m2
+    }
+
 @router.get("/{property_id}", response_model=PropertySchema)
-async def get_property(
+def get_property(
     property_id: str,
     db: Session = Depends(get_db)
 ):
@@ -62,9 +119,10 @@ async def get_property(
     return property_obj
 
 @router.put("/{property_id}", response_model=PropertySchema)
-async def update_property(
+def update_property(
     property_id: str,
     property_update: PropertyUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     db_property = db.query(Property).filter(Property.property_id == property_id).first()
@@ -75,16 +133,27 @@ async def update_property(
         setattr(db_property, field, value)
     db.commit()
     db.refresh(db_property)
+    data_version.bump_properties()
+    background_tasks.add_task(property_changed, property_id)
     return db_property
 
 @router.delete("/{property_id}")
-async def delete_property(
+def delete_property(
     property_id: str,
+    background_tasks: BackgroundTasks,
+    permanent: bool = Query(True, description="Permanently delete (true) or soft delete (false)"),
     db: Session = Depends(get_db)
 ):
     db_property = db.query(Property).filter(Property.property_id == property_id).first()
     if not db_property:
         raise HTTPException(status_code=404, detail=f"Property with property_id '{property_id}' not found")
-    db.delete(db_property)
+    if permanent:
+        db.delete(db_property)
+        message = f"Property '{property_id}' deleted successfully"
+    else:
+        db_property.is_active = False
+        message = f"Property '{property_id}' deactivated"
     db.commit()
-    return {"message": f"Property '{property_id}' deleted successfully"}
\ No newline at end of file
+    data_version.bump_properties()
+    background_tasks.add_task(property_changed, property_id)
+    return {"message": message}
\ No newline at end of file
@@ -1,79 +1,112 @@
-import os
-import csv
-import tempfile
 import json
-from fastapi import APIRouter, HTTPException, Depends, Body, BackgroundTasks
-from fastapi.responses import FileResponse
+from contextlib import contextmanager
+from typing import List, Optional, Union
+from fastapi import APIRouter, HTTPException, Depends, Body, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import DatabaseError
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.models.property import Property
 from app.models.client import Client
-from app.services.test_model_with_dataset import (
+from app.core.responses import json_response
+from app.schemas.recommendation import (
+    BulkRecommendations, ClientRecommendations, ComparisonResult, PairExplanation, PropertyRecommendations,
+    StoredClientRecommendations, StoredPropertyRecommendations
+)
+from app.services.modules.recommendation import (
+    CLIENT_SECTIONS,
+    PROPERTY_SECTIONS,
     predict_matches,
     get_bulk_recommendations,
-    recommend_houses_for_client,
-    train_model
+    iter_bulk_ndjson,
+    parse_fields,
+    project,
+    recommend_houses_for_client
 )
+from app.services.modules.comparison import compare_properties, comparison_pdf
+from app.services.modules.explanation import explain_pair
+from app.services.modules.model_utils import ModelRegistry, get_model_registry, scoring_slots
+from app.services.modules.client_store import ClientSnapshot, get_client_snapshot
+from app.services.modules.match_scores import house_record, stored_scores_info, top_clients_for_property, top_properties_for_client
+from app.services.modules.scoring_pool import scoring_pool
+from app.services.modules.response_cache import data_version, response_cache
+from app.services.modules.timing import span
 from fastapi import UploadFile, File
 
 import pandas as pd
-import numpy as np
 from fastapi import Query
 
 router = APIRouter()
 
-@router.get("/recommendations/property/{property_id}")
-async def recommend_contacts_for_property(
+TOP_N_QUERY = Query(10, ge=1, le=100, description="Number of matches to return")
+PROFIT_QUERY = Query(True, description="Include profit_analysis (the matches again, with margins, ordered by margin); false skips computing it")
+# Properties in one comparison (one row each in the report)
+MAX_COMPARED_PROPERTIES = 20
+
+
+def fields_query(sections):
+    return Query(None, description=(
+        "Comma-separated sections to return, out of " + ", ".join(sections) + "; section.field keeps only that"
+        " field of the section's rows (e.g. matches.client_id,matches.confidence). Sections left out are not computed"
+    ))
+
+
+def response_fields(fields, sections, profit):
+    try:
+        return parse_fields(fields, sections, profit)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@contextmanager
+def stored_scores(db):
+    """Reads of match_scores; a 503 until the table has been created and filled"""
+    try:
+        yield
+    except DatabaseError:
+        db.rollback()
+        raise HTTPException(
+            status_code=503,
+            detail="Stored match scores are not available; run python -m app.scripts.rebuild_match_scores"
+        )
+
+
+def fields_key(fields):
+    """A canonical, hashable form of a parse_fields projection, for cache keys and ETags"""
+    if fields is None:
+        return None
+    return tuple((section, None if rows is None else tuple(sorted(rows))) for section, rows in sorted(fields.items()))
+
+
+@router.get("/recommendations/property/{property_id}", responses={200: {
+    "model": Union[PropertyRecommendations, StoredPropertyRecommendations],
+    "description": "PropertyRecommendations, or with mode=stored StoredPropertyRecommendations"
+}})
+def recommend_contacts_for_property(
+    request: Request,
     property_id: str,
-    db: Session = Depends(get_db)
+    top_n: int = TOP_N_QUERY,
+    explain: bool = Query(True, description="Include explanations; when false, fetch them per row from /recommendations/explain/{property_id}/{client_id}"),
+    profit: bool = PROFIT_QUERY,
+    fields: Optional[str] = fields_query(PROPERTY_SECTIONS),
+    strict: bool = Query(False, description="Also require min_budget_DZD <= price and the area within [min_area, max_area]"),
+    mode: str = Query("live", pattern="^(live|stored)$", description="live: score now; stored: read the precomputed match_scores ranking"),
+    offset: int = Query(0, ge=0, description="Rank to start from (mode=stored)"),
+    db: Session = Depends(get_db),
+    registry: ModelRegistry = Depends(get_model_registry),
+    clients: ClientSnapshot = Depends(get_client_snapshot)
 ):
+    fields = response_fields(fields, PROPERTY_SECTIONS, profit)
+
     # Fetch the property from the DB
-    property_obj = db.query(Property).filter(Property.property_id == property_id).first()
+    with span("db"):
+        property_obj = db.query(Property).filter(Property.property_id == property_id).first()
     if not property_obj:
         raise HTTPException(status_code=404, detail="Property not found")
 
-    # Fetch all clients from the DB
-    clients = db.query(Client).all()
-    if not clients:
+    if len(clients) == 0:
         raise HTTPException(status_code=404, detail="No clients found in database")
 
-    # Write clients to a temporary CSV file with all new fields
-    client_fieldnames = [
-        "client_id", "preferred_location", "min_budget_DZD", "max_budget_DZD",
-        "min_area", "max_area", "preferred_property_type", "marital_status", "has_kids",
-        "weight_location", "weight_property_type", "preferred_rooms", "weight_rooms",
-        "preferred_schools_nearby", "weight_schools_nearby", "preferred_hospitals_nearby", "weight_hospitals_nearby",
-        "preferred_parks_nearby", "weight_parks_nearby", "preferred_public_transport_score", "weight_public_transport_score"
-    ]
-    with tempfile.NamedTemporaryFile(mode="w+", newline='', suffix=".csv", delete=False) as tmpfile:
-        writer = csv.DictWriter(tmpfile, fieldnames=client_fieldnames)
-        writer.writeheader()
-        for client in clients:
-            writer.writerow({
-                "client_id": client.client_id,
-                "preferred_location": client.preferred_location,
-                "min_budget_DZD": client.min_budget_DZD,
-                "max_budget_DZD": client.max_budget_DZD,
-                "min_area": client.min_area,
-                "max_area": client.max_area,
-                "preferred_property_type": client.preferred_property_type,
-                "marital_status": client.marital_status,
-                "has_kids": client.has_kids,
-                "weight_location": client.weight_location,
-                "weight_property_type": client.weight_property_type,
-                "preferred_rooms": client.preferred_rooms,
-                "weight_rooms": client.weight_rooms,
-                "preferred_schools_nearby": client.preferred_schools_nearby,
-                "weight_schools_nearby": client.weight_schools_nearby,
-                "preferred_hospitals_nearby": client.preferred_hospitals_nearby,
-                "weight_hospitals_nearby": client.weight_hospitals_nearby,
-                "preferred_parks_nearby": client.preferred_parks_nearby,
-                "weight_parks_nearby": client.weight_parks_nearby,
-                "preferred_public_transport_score": client.preferred_public_transport_score,
-                "weight_public_transport_score": client.weight_public_transport_score,
-            })
-        contacts_path = tmpfile.name
-
     # Prepare house_data from the property object
     house_data = {
         "location": property_obj.location,
@@ -87,110 +120,194 @@ async def recommend_contacts_for_property(
         "public_transport_score": property_obj.public_transport_score
     }
 
-    # Use the new predict_matches API
-    model, expected_columns = train_model()
-    results = predict_matches(
-        model=model,
-        expected_columns=expected_columns,
-        house_data=house_data,
-        contacts_df=pd.read_csv(contacts_path),
-        top_n=10,
-        include_explanations=True,
-        return_json=True
-    )
-
-    try:
-        os.remove(contacts_path)
-    except Exception as e:
-        print(f"Warning: could not delete temp file {contacts_path}: {e}")
-
-    return results
-
-
+    if mode == "stored":
+        payload = {"house_info": house_data}
+        with stored_scores(db):
+            if fields is None or "matches" in fields:
+                payload["matches"] = top_clients_for_property(db, property_id, limit=top_n, offset=offset)
+            stored = {"offset": offset, **stored_scores_info(db, property_id=property_id)}
+        return json_response(request, {**project(payload, fields), "stored": stored})
 
+    # Use the new predict_matches API
+    def compute():
+        with scoring_slots, scoring_pool.session(clients, registry.encoder) as pool:
+            return predict_matches(
+                model=registry.scorer,
+                expected_columns=registry.expected_columns,
+                house_data=house_data,
+                contacts_df=clients.to_frame(),
+                top_n=top_n,
+                include_explanations=explain,
+                return_json=True,
+                encoder=registry.encoder,
+                buyer_index=clients.buyer_index,
+                strict=strict,
+                pool=pool,
+                fields=fields
+            )
+
+    key = ("property", property_id, top_n, explain, fields_key(fields), strict, registry.variant, data_version.current(clients, db))
+    return response_cache.respond(request, key, compute)
+
+
+@router.get("/recommendations/client/{client_id}", responses={200: {
+    "model": Union[ClientRecommendations, StoredClientRecommendations],
+    "description": "ClientRecommendations, or with mode=stored StoredClientRecommendations"
+}})
+def recommend_properties_for_client(
+    request: Request,
+    client_id: str,
+    top_n: int = TOP_N_QUERY,
+    explain: bool = Query(True, description="Include explanations; when false, fetch them per row from /recommendations/explain/{property_id}/{client_id}"),
+    profit: bool = PROFIT_QUERY,
+    fields: Optional[str] = fields_query(CLIENT_SECTIONS),
+    strict: bool = Query(False, description="Also require min_budget_DZD <= price and the area within [min_area, max_area]"),
+    mode: str = Query("live", pattern="^(live|stored)$", description="live: score now; stored: read the precomputed match_scores ranking"),
+    offset: int = Query(0, ge=0, description="Rank to start from (mode=stored)"),
+    db: Session = Depends(get_db),
+    registry: ModelRegistry = Depends(get_model_registry),
+    clients: ClientSnapshot = Depends(get_client_snapshot)
+):
+    fields = response_fields(fields, CLIENT_SECTIONS, profit)
 
+    with span("db"):
+        client_obj = db.query(Client).filter(Client.client_id == client_id).first()
+    if not client_obj:
+        raise HTTPException(status_code=404, detail="Client not found")
 
-@router.get("/recommendations/client/{client_id}")
-async def recommend_properties_for_client(
+    if mode == "stored":
+        recommended = {}
+        with stored_scores(db):
+            if fields is None or "recommendations" in fields:
+                recommended["recommendations"] = top_properties_for_client(db, client_id, limit=top_n, offset=offset)
+            stored = {"offset": offset, **stored_scores_info(db, client_id=client_id)}
+        return json_response(request, {
+            "client_id": client_id,
+            "recommended_properties": {**project(recommended, fields), "stored": stored}
+        })
+
+    def compute():
+        with span("db"):
+            properties = db.query(Property).filter(Property.is_active == True).all()
+        if not properties:
+            raise HTTPException(status_code=404, detail="No properties found in database")
+
+        # Prepare buyers_df (single client) and houses_df (all properties) in memory
+        with span("frame"):
+            buyers_df = pd.DataFrame([{
+                "client_id": client_obj.client_id,
+                "preferred_location": client_obj.preferred_location,
+                "min_budget_DZD": client_obj.min_budget_DZD,
+                "max_budget_DZD": client_obj.max_budget_DZD,
+                "min_area": client_obj.min_area,
+                "max_area": client_obj.max_area,
+                "preferred_property_type": client_obj.preferred_property_type,
+                "marital_status": client_obj.marital_status,
+                "has_kids": client_obj.has_kids,
+                "weight_location": client_obj.weight_location,
+                "weight_property_type": client_obj.weight_property_type,
+                "preferred_rooms": client_obj.preferred_rooms,
+                "weight_rooms": client_obj.weight_rooms,
+                "preferred_schools_nearby": client_obj.preferred_schools_nearby,
+                "weight_schools_nearby": client_obj.weight_schools_nearby,
+                "preferred_hospitals_nearby": client_obj.preferred_hospitals_nearby,
+                "weight_hospitals_nearby": client_obj.weight_hospitals_nearby,
+                "preferred_parks_nearby": client_obj.preferred_parks_nearby,
+                "weight_parks_nearby": client_obj.weight_parks_nearby,
+                "preferred_public_transport_score": client_obj.preferred_public_transport_score,
+                "weight_public_transport_score": client_obj.weight_public_transport_score
+            }])
+
+            houses_df = pd.DataFrame([{
+                "location": prop.location,
+                "price_DZD": prop.price_DZD,
+                "area": prop.area,
+                "property_type": prop.property_type,
+                "rooms": prop.rooms,
+                "schools_nearby": prop.schools_nearby,
+                "hospitals_nearby": prop.hospitals_nearby,
+                "parks_nearby": prop.parks_nearby,
+                "public_transport_score": prop.public_transport_score
+            } for prop in properties])
+
+        with scoring_slots, scoring_pool.session(clients, registry.encoder) as pool:
+            # The pool scores from the client's row in the snapshot; a client the snapshot
+            # does not have yet is scored in this thread
+            position = clients.index.get(client_id) if pool is not None else None
+            top_matches = recommend_houses_for_client(
+                client_id,
+                buyers_df,
+                houses_df,
+                registry.scorer,
+                registry.expected_columns,
+                top_n=top_n,
+                include_explanations=explain,
+                encoder=registry.encoder,
+                strict=strict,
+                fields=fields,
+                pool=pool,
+                position=position
+            )
+        return {"client_id": client_id, "recommended_properties": top_matches}
+
+    key = ("client", client_id, top_n, explain, fields_key(fields), strict, registry.variant, data_version.current(clients, db))
+    return response_cache.respond(request, key, compute)
+
+
+@router.get("/recommendations/explain/{property_id}/{client_id}", responses={200: {"model": PairExplanation}})
+def explain_property_client_pair(
+    request: Request,
+    property_id: str,
     client_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    registry: ModelRegistry = Depends(get_model_registry),
+    clients: ClientSnapshot = Depends(get_client_snapshot)
 ):
-    client_obj = db.query(Client).filter(Client.client_id == client_id).first()
-    if not client_obj:
+    """Score and explanations for one (property, client) pair, fetched when a row is expanded."""
+    with span("db"):
+        property_obj = db.query(Property).filter(Property.property_id == property_id).first()
+    if not property_obj:
+        raise HTTPException(status_code=404, detail="Property not found")
+
+    buyer_data = clients.record(client_id)
+    if buyer_data is None:
         raise HTTPException(status_code=404, detail="Client not found")
 
-    properties = db.query(Property).all()
-    if not properties:
-        raise HTTPException(status_code=404, detail="No properties found in database")
+    house_data = {
+        "location": property_obj.location,
+        "price_DZD": property_obj.price_DZD,
+        "area": property_obj.area,
+        "property_type": property_obj.property_type,
+        "rooms": property_obj.rooms,
+        "schools_nearby": property_obj.schools_nearby,
+        "hospitals_nearby": property_obj.hospitals_nearby,
+        "parks_nearby": property_obj.parks_nearby,
+        "public_transport_score": property_obj.public_transport_score
+    }
 
-    # Prepare buyers_df (single client) and houses_df (all properties)
-    buyers_fieldnames = [
-        "client_id", "preferred_location", "min_budget_DZD", "max_budget_DZD",
-        "min_area", "max_area", "preferred_property_type", "marital_status", "has_kids",
-        "weight_location", "weight_property_type", "preferred_rooms", "weight_rooms",
-        "preferred_schools_nearby", "weight_schools_nearby", "preferred_hospitals_nearby", "weight_hospitals_nearby",
-        "preferred_parks_nearby", "weight_parks_nearby", "preferred_public_transport_score", "weight_public_transport_score"
-]
-    houses_fieldnames = [
-        "location", "price_DZD", "area", "property_type", "rooms",
-        "schools_nearby", "hospitals_nearby", "parks_nearby", "public_transport_score"
-    ]
-
-    # Create DataFrames in memory
-    buyers_df = pd.DataFrame([{
-        "client_id": client_obj.client_id,
-        "preferred_location": client_obj.preferred_location,
-        "min_budget_DZD": client_obj.min_budget_DZD,
-        "max_budget_DZD": client_obj.max_budget_DZD,
-        "min_area": client_obj.min_area,
-        "max_area": client_obj.max_area,
-        "preferred_property_type": client_obj.preferred_property_type,
-        "marital_status": client_obj.marital_status,
-        "has_kids": client_obj.has_kids,
-        "weight_location": client_obj.weight_location,
-        "weight_property_type": client_obj.weight_property_type,
-        "preferred_rooms": client_obj.preferred_rooms,
-        "weight_rooms": client_obj.weight_rooms,
-        "preferred_schools_nearby": client_obj.preferred_schools_nearby,
-        "weight_schools_nearby": client_obj.weight_schools_nearby,
-        "preferred_hospitals_nearby": client_obj.preferred_hospitals_nearby,
-        "weight_hospitals_nearby": client_obj.weight_hospitals_nearby,
-        "preferred_parks_nearby": client_obj.preferred_parks_nearby,
-        "weight_parks_nearby": client_obj.weight_parks_nearby,
-        "preferred_public_transport_score": client_obj.preferred_public_transport_score,
-        "weight_public_transport_score": client_obj.weight_public_transport_score
-    }])
-
-    houses_df = pd.DataFrame([{
-        "location": prop.location,
-        "price_DZD": prop.price_DZD,
-        "area": prop.area,
-        "property_type": prop.property_type,
-        "rooms": prop.rooms,
-        "schools_nearby": prop.schools_nearby,
-        "hospitals_nearby": prop.hospitals_nearby,
-        "parks_nearby": prop.parks_nearby,
-        "public_transport_score": prop.public_transport_score
-    } for prop in properties])
-
-    model, expected_columns = train_model()
-    top_matches = recommend_houses_for_client(
-        client_id,
-        buyers_df,
-        houses_df,
-        model,
-        expected_columns,
-        top_n=10,
-        include_explanations=True
-    )
-    # Convert numpy types to Python types
-    top_matches = convert_numpy(top_matches)
-    return {"client_id": client_id, "recommended_properties": top_matches}
+    def compute():
+        explanation = explain_pair(
+            registry.scorer,
+            registry.expected_columns,
+            house_data,
+            buyer_data,
+            encoder=registry.encoder
+        )
+        return {"property_id": property_id, **explanation}
+
+    key = ("explain", property_id, client_id, registry.variant, data_version.current(clients, db))
+    return response_cache.respond(request, key, compute)
 
 
+@router.get("/recommendations/cache")
+def recommendation_cache_stats():
+    """Hit/miss counters of the recommendation response cache."""
+    return response_cache.stats()
 
-router.post("/recommendations/properties/")
-async def bulk_recommendations_for_properties(
+
+@router.post("/recommendations/properties/", responses={200: {"model": BulkRecommendations}})
+def bulk_recommendations_for_properties(
+    request: Request,
     properties_list: list = Body(..., example=[
         {
             "location": "Bejaia",
@@ -204,377 +321,187 @@ async def bulk_recommendations_for_properties(
             "public_transport_score": 8
         }
     ]),
-    db: Session = Depends(get_db)
+    top_n: int = TOP_N_QUERY,
+    explain: bool = Query(False, description="Include explanations; when false, fetch them per row from /recommendations/explain/{property_id}/{client_id}"),
+    profit: bool = PROFIT_QUERY,
+    fields: Optional[str] = fields_query(PROPERTY_SECTIONS),
+    strict: bool = Query(False, description="Also require min_budget_DZD <= price and the area within [min_area, max_area]"),
+    registry: ModelRegistry = Depends(get_model_registry),
+    clients: ClientSnapshot = Depends(get_client_snapshot)
 ):
-    clients = db.query(Client).all()
-    if not clients:
+    """Bulk recommendations for properties posted in the body (they need not be in the database)."""
+    # fields shapes each prediction_result
+    fields = response_fields(fields, PROPERTY_SECTIONS, profit)
+    if len(clients) == 0:
         raise HTTPException(status_code=404, detail="No clients found in database")
 
-    # Write clients to a temporary CSV file with all new fields
-    client_fieldnames = [
-        "client_id", "preferred_location", "min_budget_DZD", "max_budget_DZD",
-        "min_area", "max_area", "preferred_property_type", "marital_status", "has_kids",
-        "weight_location", "weight_property_type", "preferred_rooms", "weight_rooms",
-        "preferred_schools_nearby", "weight_schools_nearby", "preferred_hospitals_nearby", "weight_hospitals_nearby",
-        "preferred_parks_nearby", "weight_parks_nearby", "preferred_public_transport_score", "weight_public_transport_score"
-    ]
-    with tempfile.NamedTemporaryFile(mode="w+", newline='', suffix=".csv", delete=False) as tmpfile:
-        writer = csv.DictWriter(tmpfile, fieldnames=client_fieldnames)
-        writer.writeheader()
-        for client in clients:
-            writer.writerow({
-                "client_id": client.client_id,
-                "preferred_location": client.preferred_location,
-                "min_budget_DZD": client.min_budget_DZD,
-                "max_budget_DZD": client.max_budget_DZD,
-                "min_area": client.min_area,
-                "max_area": client.max_area,
-                "preferred_property_type": client.preferred_property_type,
-                "marital_status": client.marital_status,
-                "has_kids": client.has_kids,
-                "weight_location": client.weight_location,
-                "weight_property_type": client.weight_property_type,
-                "preferred_rooms": client.preferred_rooms,
-                "weight_rooms": client.weight_rooms,
-                "preferred_schools_nearby": client.preferred_schools_nearby,
-                "weight_schools_nearby": client.weight_schools_nearby,
-                "preferred_hospitals_nearby": client.preferred_hospitals_nearby,
-                "weight_hospitals_nearby": client.weight_hospitals_nearby,
-                "preferred_parks_nearby": client.preferred_parks_nearby,
-                "weight_parks_nearby": client.weight_parks_nearby,
-                "preferred_public_transport_score": client.preferred_public_transport_score,
-                "weight_public_transport_score": client.weight_public_transport_score,
-            })
-        contacts_path = tmpfile.name
-
-    weight_location, weight_budget, weight_area, weight_model = 0.3, 0.3, 0.2, 0.2
-
-    results = get_bulk_recommendations(
-        properties_source=properties_list,
-        top_n=10,
-        show_explanations=True,
-        contacts_path=contacts_path,
-        weight_location=weight_location,
-        weight_budget=weight_budget,
-        weight_area=weight_area,
-        weight_model=weight_model,
-        return_json=True
-    )
-
-    try:
-        os.remove(contacts_path)
-    except Exception as e:
-        print(f"Warning: could not delete temp file {contacts_path}: {e}")
-
-    return results
-
-
-@router.get("/recommendations/properties/")
-async def bulk_recommendations_for_all_properties(
-    db: Session = Depends(get_db)
+    with scoring_slots, scoring_pool.session(clients, registry.encoder) as pool:
+        results = get_bulk_recommendations(
+            properties_source=properties_list,
+            top_n=top_n,
+            show_explanations=explain,
+            contacts_df=clients.to_frame(),
+            model=registry.scorer,
+            expected_columns=registry.expected_columns,
+            encoder=registry.encoder,
+            buyer_index=clients.buyer_index,
+            strict=strict,
+            pool=pool,
+            return_json=True,
+            fields=fields
+        )
+
+    with span("serialize"):
+        return json_response(request, results)
+
+
+@router.get(
+    "/recommendations/properties/",
+    responses={200: {
+        "model": BulkRecommendations,
+        "content": {"application/x-ndjson": {}},
+        "description": "With stream=true: one BulkPropertyResult per line, then a summary line"
+    }}
+)
+def bulk_recommendations_for_all_properties(
+    request: Request,
+    top_n: int = TOP_N_QUERY,
+    explain: bool = Query(True, description="Include explanations; when false, fetch them per row from /recommendations/explain/{property_id}/{client_id}"),
+    profit: bool = PROFIT_QUERY,
+    fields: Optional[str] = fields_query(PROPERTY_SECTIONS),
+    strict: bool = Query(False, description="Also require min_budget_DZD <= price and the area within [min_area, max_area]"),
+    stream: bool = Query(False, description="Stream application/x-ndjson: one line per property as soon as it is scored, then a summary line"),
+    db: Session = Depends(get_db),
+    registry: ModelRegistry = Depends(get_model_registry),
+    clients: ClientSnapshot = Depends(get_client_snapshot)
 ):
-    clients = db.query(Client).all()
-    if not clients:
+    # fields shapes each prediction_result
+    fields = response_fields(fields, PROPERTY_SECTIONS, profit)
+    if len(clients) == 0:
         raise HTTPException(status_code=404, detail="No clients found in database")
 
-    properties = db.query(Property).all()
+    with span("db"):
+        properties = db.query(Property).filter(Property.is_active == True).all()
     if not properties:
         raise HTTPException(status_code=404, detail="No properties found in database")
 
-    # Write properties to a temporary CSV file (use property fields, not client fields!)
-    properties_fieldnames = [
-        "location", "price_DZD", "area", "property_type", "rooms",
-        "schools_nearby", "hospitals_nearby", "parks_nearby", "public_transport_score"
-    ]
-    with tempfile.NamedTemporaryFile(mode="w+", newline='', suffix=".csv", delete=False) as tmp_properties:
-        writer = csv.DictWriter(tmp_properties, fieldnames=properties_fieldnames)
-        writer.writeheader()
-        for prop in properties:
-            writer.writerow({
-                "location": prop.location,
-                "price_DZD": prop.price_DZD,
-                "area": prop.area,
-                "property_type": prop.property_type,
-                "rooms": prop.rooms,
-                "schools_nearby": prop.schools_nearby,
-                "hospitals_nearby": prop.hospitals_nearby,
-                "parks_nearby": prop.parks_nearby,
-                "public_transport_score": prop.public_transport_score
-            })
-        properties_path = tmp_properties.name
-
-    # Write clients to a temporary CSV file with all new fields
-    clients_fieldnames = [
-        "client_id", "preferred_location", "min_budget_DZD", "max_budget_DZD",
-        "min_area", "max_area", "preferred_property_type", "marital_status", "has_kids",
-        "weight_location", "weight_property_type", "preferred_rooms", "weight_rooms",
-        "preferred_schools_nearby", "weight_schools_nearby", "preferred_hospitals_nearby", "weight_hospitals_nearby",
-        "preferred_parks_nearby", "weight_parks_nearby", "preferred_public_transport_score", "weight_public_transport_score"
-    ]
-    with tempfile.NamedTemporaryFile(mode="w+", newline='', suffix=".csv", delete=False) as tmp_clients:
-        writer = csv.DictWriter(tmp_clients, fieldnames=clients_fieldnames)
-        writer.writeheader()
-        for client in clients:
-            writer.writerow({
-                "client_id": client.client_id,
-                "preferred_location": client.preferred_location,
-                "min_budget_DZD": client.min_budget_DZD,
-                "max_budget_DZD": client.max_budget_DZD,
-                "min_area": client.min_area,
-                "max_area": client.max_area,
-                "preferred_property_type": client.preferred_property_type,
-                "marital_status": client.marital_status,
-                "has_kids": client.has_kids,
-                "weight_location": client.weight_location,
-                "weight_property_type": client.weight_property_type,
-                "preferred_rooms": client.preferred_rooms,
-                "weight_rooms": client.weight_rooms,
-                "preferred_schools_nearby": client.preferred_schools_nearby,
-                "weight_schools_nearby": client.weight_schools_nearby,
-                "preferred_hospitals_nearby": client.preferred_hospitals_nearby,
-                "weight_hospitals_nearby": client.weight_hospitals_nearby,
-                "preferred_parks_nearby": client.preferred_parks_nearby,
-                "weight_parks_nearby": client.weight_parks_nearby,
-                "preferred_public_transport_score": client.preferred_public_transport_score,
-                "weight_public_transport_score": client.weight_public_transport_score
-            })
-        contacts_path = tmp_clients.name
+    properties_list = [{
+        "location": prop.location,
+        "price_DZD": prop.price_DZD,
+        "area": prop.area,
+        "property_type": prop.property_type,
+        "rooms": prop.rooms,
+        "schools_nearby": prop.schools_nearby,
+        "hospitals_nearby": prop.hospitals_nearby,
+        "parks_nearby": prop.parks_nearby,
+        "public_transport_score": prop.public_transport_score
+    } for prop in properties]
+
+    if stream:
+        def ndjson_lines():
+            # Runs while the response is sent; the scoring slot is held until the last line
+            with scoring_slots, scoring_pool.session(clients, registry.encoder) as pool:
+                yield from iter_bulk_ndjson(
+                    properties_list,
+                    clients.to_frame(),
+                    registry.scorer,
+                    registry.encoder,
+                    top_n=top_n,
+                    show_explanations=explain,
+                    buyer_index=clients.buyer_index,
+                    strict=strict,
+                    pool=pool,
+                    fields=fields
+                )
+
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
 
     # Call the bulk recommendation function
-    results = get_bulk_recommendations(
-        properties_source=properties_path,
-        top_n=10,
-        show_explanations=True,
-        contacts_path=contacts_path,
-        return_json=True
-    )
-
-    try:
-        os.remove(contacts_path)
-        os.remove(properties_path)
-    except Exception as e:
-        print(f"Warning: could not delete temp file: {e}")
-
-    return results
-
-
-
+    with scoring_slots, scoring_pool.session(clients, registry.encoder) as pool:
+        results = get_bulk_recommendations(
+            properties_source=properties_list,
+            top_n=top_n,
+            show_explanations=explain,
+            contacts_df=clients.to_frame(),
+            model=registry.scorer,
+            expected_columns=registry.expected_columns,
+            encoder=registry.encoder,
+            buyer_index=clients.buyer_index,
+            strict=strict,
+            pool=pool,
+            return_json=True,
+            fields=fields
+        )
+
+    # Already plain Python types: rendered in one pass, gzipped when the client accepts it
+    with span("serialize"):
+        return json_response(request, results)
+
+
+@router.get(
+    "/recommendations/compare-properties/",
+    responses={200: {"model": ComparisonResult, "content": {"application/pdf": {}}, "description": "With format=pdf: the report"}}
+)
+def compare_properties_view(
+    request: Request,
+    property_ids: List[str] = Query(..., description="Two or more property ids (repeat the parameter)"),
+    format: str = Query("json", pattern="^(json|pdf)$", description="json: the comparison table; pdf: the report"),
+    db: Session = Depends(get_db),
+    registry: ModelRegistry = Depends(get_model_registry),
+    clients: ClientSnapshot = Depends(get_client_snapshot)
+):
+    """Compare any number of properties, as JSON for the compare page or as the PDF report."""
+    return comparison_response(request, property_ids, format, db, registry, clients)
 
 
 @router.post("/recommendations/compare-properties/")
-async def compare_properties_api(
-    property_id_1: str = Body(..., embed=True, example="12122392382937"),
-    property_id_2: str = Body(..., embed=True, example="12122392382938"),
+def compare_properties_api(
+    request: Request,
+    property_id_1: Optional[str] = Body(None, embed=True, example="12122392382937"),
+    property_id_2: Optional[str] = Body(None, embed=True, example="12122392382938"),
+    property_ids: Optional[List[str]] = Body(None, embed=True, description="Two or more property ids, instead of property_id_1 / property_id_2"),
     *,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    registry: ModelRegistry = Depends(get_model_registry),
+    clients: ClientSnapshot = Depends(get_client_snapshot)
 ):
     """
-    Compare two properties by their IDs and generate a PDF report.
+    Compare properties by their IDs and generate a PDF report.
     """
-    # Fetch properties from DB
-    prop1 = db.query(Property).filter(Property.property_id == property_id_1).first()
-    prop2 = db.query(Property).filter(Property.property_id == property_id_2).first()
-    if not prop1 or not prop2:
-        raise HTTPException(status_code=404, detail="One or both properties not found")
-
-    # Prepare house dicts
-    house1 = {
-        "property_id": prop1.property_id,
-        "location": prop1.location,
-        "price_DZD": prop1.price_DZD,
-        "area": prop1.area,
-        "property_type": prop1.property_type,
-        "rooms": prop1.rooms,
-        "schools_nearby": prop1.schools_nearby,
-        "hospitals_nearby": prop1.hospitals_nearby,
-        "parks_nearby": prop1.parks_nearby,
-        "public_transport_score": prop1.public_transport_score
-    }
-    house2 = {
-        "property_id": prop2.property_id,
-        "location": prop2.location,
-        "price_DZD": prop2.price_DZD,
-        "area": prop2.area,
-        "property_type": prop2.property_type,
-        "rooms": prop2.rooms,
-        "schools_nearby": prop2.schools_nearby,
-        "hospitals_nearby": prop2.hospitals_nearby,
-        "parks_nearby": prop2.parks_nearby,
-        "public_transport_score": prop2.public_transport_score
-    }
+    ids = property_ids or [i for i in (property_id_1, property_id_2) if i]
+    return comparison_response(request, ids, "pdf", db, registry, clients)
 
-    # Load model and contacts
-    from app.services.test_model_with_dataset import train_model
-    import pandas as pd
-    model, expected_columns = train_model()
-    contacts = db.query(Client).all()
-    contacts_df = pd.DataFrame([{
-        "client_id": c.client_id,
-        "preferred_location": c.preferred_location,
-        "min_budget_DZD": c.min_budget_DZD,
-        "max_budget_DZD": c.max_budget_DZD,
-        "min_area": c.min_area,
-        "max_area": c.max_area,
-        "preferred_property_type": c.preferred_property_type,
-        "marital_status": c.marital_status,
-        "has_kids": c.has_kids,
-        "weight_location": c.weight_location,
-        "weight_property_type": c.weight_property_type,
-        "preferred_rooms": c.preferred_rooms,
-        "weight_rooms": c.weight_rooms,
-        "preferred_schools_nearby": c.preferred_schools_nearby,
-        "weight_schools_nearby": c.weight_schools_nearby,
-        "preferred_hospitals_nearby": c.preferred_hospitals_nearby,
-        "weight_hospitals_nearby": c.weight_hospitals_nearby,
-        "preferred_parks_nearby": c.preferred_parks_nearby,
-        "weight_parks_nearby": c.weight_parks_nearby,
-        "preferred_public_transport_score": c.preferred_public_transport_score,
-        "weight_public_transport_score": c.weight_public_transport_score
-    } for c in contacts])
-
-    # Compare and generate PDF using local functions
-    comparison_df = compare_properties(model, expected_columns, house1, house2, contacts_df)
-    filename = export_comparison_to_pdf(comparison_df)
-    full_path = os.path.join("comparison_pdf", filename)
-    background_tasks.add_task(os.remove, full_path)
-    return FileResponse(full_path, media_type="application/pdf", filename=filename)
-
-
-
-
-def convert_numpy(obj):
-    if isinstance(obj, dict):
-        return {k: convert_numpy(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_numpy(i) for i in obj]
-    elif isinstance(obj, (np.integer, np.int64)):
-        return int(obj)
-    elif isinstance(obj, (np.floating, np.float64)):
-        return float(obj)
-    elif isinstance(obj, np.bool_):
-        return bool(obj)
-    else:
-        return obj
-
-
-# --- Property Comparison Utilities ---
-def compare_properties(model, expected_columns, house1, house2, contacts_df):
-    import json
-    def score_property(house):
-        matches = predict_matches(model, expected_columns, house, contacts_df, top_n=10)
-        # Always extract 'matches' if present (for return_json=True)
-        if isinstance(matches, dict) and "matches" in matches:
-            matches = matches["matches"]
-        parsed_matches = []
-        for m in matches:
-            if isinstance(m, str):
-                try:
-                    parsed_matches.append(json.loads(m))
-                except Exception:
-                    continue
-            else:
-                parsed_matches.append(m)
-        if not parsed_matches:
-            return 0
-        avg_conf = sum([m["confidence"] for m in parsed_matches]) / len(parsed_matches)
-        return avg_conf
-
-    def infrastructure_score(house):
-        return sum([
-            house.get("schools_nearby", 0),
-            house.get("hospitals_nearby", 0),
-            house.get("parks_nearby", 0),
-            house.get("public_transport_score", 0)
-        ])
-
-    # Run predictions
-    score1 = score_property(house1)
-    score2 = score_property(house2)
-
-    infra1 = infrastructure_score(house1)
-    infra2 = infrastructure_score(house2)
-
-    # Build comparison table
-    comparison = pd.DataFrame([
-        {
-            "ID": house1["property_id"],
-            "Location": house1["location"],
-            "Price (DZD)": house1["price_DZD"],
-            "Infrastructur Score": infra1,
-            "Avg Buyer Score": round(score1, 4)
-        },
-        {
-            "ID": house2["property_id"],
-            "Location": house2["location"],
-            "Price (DZD)": house2["price_DZD"],
-            "Infrastructur Score": infra2,
-            "Avg Buyer Score": round(score2, 4)
-        }
-    ])
-
-    return comparison
-
-def export_comparison_to_pdf(df):
-    from fpdf import FPDF
-    import os
-
-    os.makedirs("comparison_pdf", exist_ok=True)
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-
-    # Title
-    pdf.cell(200, 10, txt="Property Comparison Report", ln=True, align="C")
-    pdf.ln(10)
-
-    # Header row
-    pdf.set_font("Arial", "B", size=11)
-    num_cols = len(df.columns)
-    col_widths = [190 / num_cols] * num_cols
-    headers = df.columns.tolist()
-    for i in range(num_cols):
-        header = headers[i]
-        if header == "Avg Buyer Score":
-            header = "Avg Buyer Score (%)"
-        pdf.cell(col_widths[i], 10, txt=str(header), border=1, align="C")
-    pdf.ln()
-
-    # Data rows
-    pdf.set_font("Arial", size=10)
-    for _, row in df.iterrows():
-        for i, val in enumerate(row):
-            if headers[i] == "Avg Buyer Score":
-                val = f"{round(val * 100, 2)}%"
-            pdf.cell(col_widths[i], 10, txt=str(val), border=1)
-        pdf.ln()
-
-    # Determine winning property
-    df_sorted = df.sort_values(by="Avg Buyer Score", ascending=False)
-    winner = df_sorted.iloc[0]
-
-    # Add invoice-style summary
-    pdf.ln(10)
-    pdf.set_font("Arial", "B", size=12)
-    pdf.cell(190, 10, txt="Recommended Property", ln=True)
-
-    pdf.set_font("Arial", size=11)
-    pdf.cell(190, 8, txt=f"Property ID: {winner['ID']}", ln=True)
-    pdf.cell(190, 8, txt=f"Location: {winner['Location']}", ln=True)
-    pdf.cell(190, 8, txt=f"Price (DZD): {winner['Price (DZD)']:,}", ln=True)
-    pdf.cell(190, 8, txt=f"Infrastructure Score: {winner['Infrastructur Score']}", ln=True)
-    pdf.cell(190, 8, txt=f"Avg Buyer Score: {round(winner['Avg Buyer Score'] * 100, 2)}%", ln=True)
-
-    pdf.ln(5)
-    pdf.set_font("Arial", "I", size=10)
-    pdf.cell(190, 8, txt="This property is expected to attract more potential buyers based on the model's confidence scores.", ln=True)
-
-    import uuid
-    unique_id = uuid.uuid4().hex
-    filename = f"{df.iloc[0]['ID']}{df.iloc[1]['ID']}_{unique_id}.pdf"
-    full_path = f"comparison_pdf/{filename}"
-
-    pdf.output(full_path)
-    return filename
-    
-    
\ No newline at end of file
+
+def comparison_response(request, property_ids, format, db, registry, clients):
+    """
+    The comparison of property_ids (duplicates dropped, order kept), scored in one batched
+    pass and rendered in memory. Reports are cached per (ids, data version), so downloading
+    the same comparison again costs nothing until a property or client changes.
+    """
+    property_ids = list(dict.fromkeys(property_ids))
+    if not 2 <= len(property_ids) <= MAX_COMPARED_PROPERTIES:
+        raise HTTPException(status_code=422, detail=f"Compare between 2 and {MAX_COMPARED_PROPERTIES} distinct properties")
+
+    # Fetch properties from DB
+    with span("db"):
+        found = {p.property_id: p for p in db.query(Property).filter(Property.property_id.in_(property_ids)).all()}
+    missing = [i for i in property_ids if i not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Properties not found: {', '.join(missing)}")
+    houses = [{"property_id": i, **house_record(found[i])} for i in property_ids]
+
+    def compute():
+        # Model and contacts are already resident in the registry / client store
+        with scoring_slots, scoring_pool.session(clients, registry.encoder) as pool:
+            return compare_properties(
+                houses, clients.to_frame(), registry.scorer, registry.encoder, buyer_index=clients.buyer_index, pool=pool
+            )
+
+    key = ("compare", format, tuple(property_ids), registry.variant, data_version.current(clients, db))
+    if format == "json":
+        return response_cache.respond(request, key, compute)
+    filename = f"comparison_{'_'.join(property_ids)}.pdf"
+    return response_cache.respond(
+        request, key, compute, media_type="application/pdf", render=comparison_pdf,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
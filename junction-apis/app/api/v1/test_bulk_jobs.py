@@ -0,0 +1,79 @@
+import json
+import os
+import time
+
+from app.models.bulk_job import BulkJob
+from app.services.modules import bulk_jobs
+from app.services.modules.bulk_jobs import bulk_job_worker
+
+JOBS_URL = "/api/v1/recommendations/jobs"
+
+
+def wait_for(client, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"{JOBS_URL}/{job_id}").json()
+        if job["status"] in ("succeeded", "failed") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.1)
+
+
+def test_bulk_job_runs_in_the_background_and_serves_its_result(api):
+    client, _ = api
+    created = client.post(JOBS_URL, json={"top_n": 5})
+    assert created.status_code == 202
+    job_id = created.json()["job_id"]
+    assert created.json()["status"] in ("pending", "running")
+
+    job = wait_for(client, job_id)
+    assert job["status"] == "succeeded", job
+    assert job["done"] == job["total"] == 200 and job["progress"] == 1.0
+
+    result = client.get(f"{JOBS_URL}/{job_id}/result")
+    assert result.status_code == 200
+    lines = [json.loads(line) for line in result.text.splitlines()]
+    streamed = client.get("/api/v1/recommendations/properties/", params={"explain": "false", "stream": "true"})
+    # Same content as the streaming endpoint, top_n aside
+    assert len(lines) == len(streamed.text.splitlines()) == 201
+    assert all(len(line["prediction_result"]["matches"]) <= 5 for line in lines[:-1])
+    assert lines[-1]["summary"]["total_properties_processed"] == 200
+
+
+def test_unknown_and_unfinished_jobs(api):
+    client, _ = api
+    assert client.get(f"{JOBS_URL}/nope").status_code == 404
+    assert client.get(f"{JOBS_URL}/nope/result").status_code == 404
+
+    bulk_job_worker.stop()
+    job = client.post(JOBS_URL).json()
+    assert job["status"] == "pending" and job["progress"] is None
+    assert client.get(f"{JOBS_URL}/{job['job_id']}/result").status_code == 409
+
+
+def test_a_reclaimed_run_neither_publishes_nor_removes_the_new_claims_file(api, monkeypatch):
+    client, _ = api
+    bulk_job_worker.stop()
+    job_id = client.post(JOBS_URL).json()["job_id"]
+    path = os.path.join(bulk_job_worker.result_dir, f"{job_id}.ndjson")
+    progress = []
+
+    def lines(houses, *args, **kwargs):
+        for i in range(len(houses)):
+            if i == 150:
+                # This run stalled and another worker took the job over
+                db = bulk_job_worker.session_factory()
+                progress.append(db.query(BulkJob.done).filter(BulkJob.job_id == job_id).scalar())
+                db.query(BulkJob).filter(BulkJob.job_id == job_id).update({"attempts": BulkJob.attempts + 1})
+                db.commit()
+                db.close()
+                with open(f"{path}.2.tmp", "wb") as out:
+                    out.write(b"partial\n")
+            yield b'{"property_index": %d}\n' % i
+        yield b'{"summary": {}}\n'
+
+    monkeypatch.setattr(bulk_jobs, "iter_bulk_ndjson", lines)
+    assert bulk_job_worker.run_next()
+    # Progress counted property lines only; the new claim's file is intact and nothing was published
+    assert progress == [150]
+    assert os.path.exists(f"{path}.2.tmp") and not os.path.exists(f"{path}.1.tmp")
+    assert not os.path.exists(path)
@@ -0,0 +1,34 @@
+import json
+
+BULK_URL = "/api/v1/recommendations/properties/"
+
+
+def test_ndjson_stream_matches_the_buffered_response(api):
+    client, _ = api
+    buffered = client.get(BULK_URL, params={"explain": "false"}).json()
+
+    response = client.get(BULK_URL, params={"explain": "false", "stream": "true"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    assert lines[:-1] == buffered["properties_results"]
+    assert lines[-1]["summary"] == buffered["summary"]
+    assert lines[-1]["processing_info"]["total_properties"] == len(lines) - 1
+
+
+def test_posted_properties_are_scored_like_stored_ones(api):
+    client, _ = api
+    fields = ["location", "price_DZD", "area", "property_type", "rooms",
+              "schools_nearby", "hospitals_nearby", "parks_nearby", "public_transport_score"]
+    houses = []
+    for property_id in ("H0047", "H0007"):
+        stored = client.get(f"/api/v1/properties/{property_id}").json()
+        houses.append({field: stored[field] for field in fields})
+
+    response = client.post(BULK_URL, json=houses)
+    assert response.status_code == 200
+    results = response.json()["properties_results"]
+    assert [r["property_info"] for r in results] == houses
+    assert results[0]["prediction_result"] == client.get("/api/v1/recommendations/property/H0047", params={"explain": "false"}).json()
+    assert response.json()["summary"]["total_properties_processed"] == 2
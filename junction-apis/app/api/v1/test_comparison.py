@@ -0,0 +1,42 @@
+import os
+
+
+def test_compare_many_properties_as_json(api):
+    client, _ = api
+    url = "/api/v1/recommendations/compare-properties/"
+    ids = ["H0047", "H0007", "H0003"]
+    response = client.get(url, params={"property_ids": ids})
+    assert response.status_code == 200
+    comparison = response.json()
+    assert [row["property_id"] for row in comparison["properties"]] == ids
+    assert comparison["recommended"] == max(comparison["properties"], key=lambda row: row["avg_buyer_score"])
+    # Nobody can afford H0003
+    assert comparison["properties"][2]["avg_buyer_score"] == 0
+    assert response.headers["X-Cache"] == "miss"
+    assert client.get(url, params={"property_ids": ids}).headers["X-Cache"] == "hit"
+
+    assert client.get(url, params={"property_ids": ["H0047", "NOPE"]}).status_code == 404
+    assert client.get(url, params={"property_ids": ["H0047", "H0047"]}).status_code == 422
+
+
+def test_pdf_report_is_rendered_in_memory_and_cached(api):
+    client, _ = api
+    on_disk = sorted(os.listdir("comparison_pdf")) if os.path.isdir("comparison_pdf") else []
+    body = {"property_id_1": "H0047", "property_id_2": "H0007"}
+    response = client.post("/api/v1/recommendations/compare-properties/", json=body)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.content.startswith(b"%PDF")
+    assert 'filename="comparison_H0047_H0007.pdf"' in response.headers["Content-Disposition"]
+    assert (sorted(os.listdir("comparison_pdf")) if os.path.isdir("comparison_pdf") else []) == on_disk
+
+    again = client.post("/api/v1/recommendations/compare-properties/", json={"property_ids": ["H0047", "H0007"]})
+    assert again.headers["X-Cache"] == "hit"
+    assert again.content == response.content
+
+    assert client.put("/api/v1/properties/H0007", json={"price_DZD": 1_000_000}).status_code == 200
+    fresh = client.get(
+        "/api/v1/recommendations/compare-properties/", params={"property_ids": ["H0047", "H0007"], "format": "pdf"}
+    )
+    assert fresh.headers["X-Cache"] == "miss"
+    assert fresh.content.startswith(b"%PDF")
@@ -0,0 +1,51 @@
+import statistics
+import threading
+import time
+
+BULK_URL = "/api/v1/recommendations/properties/"
+
+
+def light_latencies(client, client_ids, n=20):
+    timings = []
+    for client_id in client_ids[:n]:
+        start = time.perf_counter()
+        assert client.get(f"/api/v1/clients/{client_id}").status_code == 200
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def test_crud_latency_stays_flat_during_bulk_scoring(api):
+    client, client_ids = api
+    # Warm up: model, client store and the first bulk call
+    assert client.get(BULK_URL, params={"explain": "false"}).status_code == 200
+
+    idle = statistics.median(light_latencies(client, client_ids))
+    start = time.perf_counter()
+    assert client.get(BULK_URL, params={"explain": "false"}).status_code == 200
+    bulk_seconds = time.perf_counter() - start
+
+    stop = threading.Event()
+    bulk_calls = []
+
+    def keep_scoring():
+        while not stop.is_set():
+            bulk_calls.append(client.get(BULK_URL, params={"explain": "false"}).status_code)
+
+    scorers = [threading.Thread(target=keep_scoring) for _ in range(2)]
+    for thread in scorers:
+        thread.start()
+    time.sleep(bulk_seconds / 4)
+    try:
+        busy = statistics.median(light_latencies(client, client_ids[20:]))
+    finally:
+        stop.set()
+        for thread in scorers:
+            thread.join()
+
+    assert bulk_calls and set(bulk_calls) == {200}
+    # With a blocked event loop every light call would queue behind a whole bulk request;
+    # otherwise it only pays for sharing the CPU with the scoring threads
+    assert busy < min(max(5 * idle, idle + 0.05), bulk_seconds / 2), (
+        f"bulk call {bulk_seconds * 1000:.0f} ms | GET /clients/{{id}} p50 idle {idle * 1000:.1f} ms, "
+        f"during scoring {busy * 1000:.1f} ms"
+    )
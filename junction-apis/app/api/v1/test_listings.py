@@ -0,0 +1,44 @@
+from app.core.config import settings
+
+
+def page_through(client, url, limit, **params):
+    ids, cursor = [], None
+    while True:
+        response = client.get(url, params=dict(params, limit=limit, **({"after_id": cursor} if cursor else {})))
+        assert response.status_code == 200
+        ids.extend(row["id"] for row in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return ids
+
+
+def test_keyset_pages_cover_the_offset_listing(api):
+    client, _ = api
+    params = {"min_budget": 10_000_000, "property_type": "villa"}
+    everything = [row["id"] for row in client.get("/api/v1/clients/", params=dict(params, limit=1000)).json()]
+    assert everything == sorted(everything)
+    assert page_through(client, "/api/v1/clients/", 37, **params) == everything
+
+    count = client.get("/api/v1/clients/count", params=params).json()
+    assert count["total"] == len(everything)
+    assert count["max_budget_DZD"] >= 10_000_000
+
+
+def test_soft_deleted_properties_are_hidden_from_listings_and_counts(api):
+    client, _ = api
+    assert client.get("/api/v1/properties/count").json()["total"] == 200
+    assert len(page_through(client, "/api/v1/properties/", 64)) == 200
+
+    assert client.delete("/api/v1/properties/H0001", params={"permanent": "false"}).status_code == 200
+    assert client.get("/api/v1/properties/count").json()["total"] == 199
+    assert client.get("/api/v1/properties/count", params={"include_inactive": "true"}).json()["total"] == 200
+    assert "H0001" not in {row["property_id"] for row in client.get("/api/v1/properties/", params={"limit": 1000}).json()}
+
+
+def test_cross_origin_pages_can_read_the_cursor(api):
+    client, _ = api
+    origin = settings.BACKEND_CORS_ORIGINS[0]
+    response = client.get("/api/v1/properties/", params={"limit": 5}, headers={"Origin": origin})
+    assert response.headers["access-control-allow-origin"] == origin
+    assert "X-Next-Cursor" in response.headers["access-control-expose-headers"]
+    assert response.headers["X-Next-Cursor"]
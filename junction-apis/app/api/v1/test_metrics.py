@@ -0,0 +1,30 @@
+def stage_names(server_timing):
+    return [entry.split(";")[0] for entry in server_timing.split(", ")]
+
+
+def test_recommendation_reports_its_stages(api):
+    client, _ = api
+    response = client.get("/api/v1/recommendations/property/H0047")
+    assert response.status_code == 200
+    stages = stage_names(response.headers["Server-Timing"])
+    assert {"clients", "db", "filter", "distance", "encode", "predict", "rank", "explain", "serialize"} <= set(stages)
+    assert stages[-1] == "total"
+
+    # Served from the response cache: no pipeline stage ran
+    cached = client.get("/api/v1/recommendations/property/H0047")
+    assert "predict" not in stage_names(cached.headers["Server-Timing"])
+
+
+def test_metrics_endpoint_exposes_route_and_stage_metrics(api):
+    client, _ = api
+    client.get("/api/v1/recommendations/property/H0007", params={"explain": "false"})
+    client.get("/api/v1/recommendations/property/NOPE")
+
+    text = client.get("/metrics").text
+    route = 'route="/api/v1/recommendations/property/{property_id}",method="GET"'
+    assert f'junction_requests_total{{{route},status="200"}}' in text
+    assert f'junction_requests_total{{{route},status="404"}}' in text
+    assert f"junction_requests_in_flight{{{route}}} 0" in text
+    assert f'junction_request_duration_seconds_bucket{{{route},le="+Inf"}}' in text
+    assert 'junction_stage_duration_seconds_count{stage="predict"}' in text
+    assert 'route="/metrics",method="GET"' in text
@@ -0,0 +1,91 @@
+from datetime import datetime, timezone
+
+from app.core.database import get_db
+from app.models.property import Property
+from app.services.modules.response_cache import data_version, response_cache
+from main import app
+
+
+def test_repeated_recommendation_is_served_from_cache(api):
+    client, _ = api
+    url = "/api/v1/recommendations/property/H0001"
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first.headers["X-Cache"] == "miss"
+
+    second = client.get(url)
+    assert second.headers["X-Cache"] == "hit"
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert second.json() == first.json()
+
+    # Options are part of the key
+    assert client.get(url, params={"explain": "false"}).headers["X-Cache"] == "miss"
+
+    revalidated = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+
+    stats = client.get("/api/v1/recommendations/cache").json()
+    assert stats["hits"] >= 1 and stats["misses"] >= 2 and stats["not_modified"] >= 1
+
+
+def test_writes_invalidate_cached_recommendations(api):
+    client, _ = api
+    buyer = client.get("/api/v1/clients/", params={"limit": 1}).json()[0]
+    property_url = "/api/v1/recommendations/property/H0002"
+    client_url = f"/api/v1/recommendations/client/{buyer['client_id']}"
+    etags = {url: client.get(url).headers["ETag"] for url in (property_url, client_url)}
+
+    assert client.put("/api/v1/properties/H0002", json={"price_DZD": 12_345_678}).status_code == 200
+    after_property = client.get(property_url)
+    assert after_property.headers["X-Cache"] == "miss"
+    assert after_property.headers["ETag"] != etags[property_url]
+    stale = client.get(client_url, headers={"If-None-Match": etags[client_url]})
+    assert stale.status_code == 200
+
+    etag = client.get(client_url).headers["ETag"]
+    assert client.put(f"/api/v1/clients/{buyer['id']}", json={"max_budget_DZD": 90_000_000}).status_code == 200
+    after_client = client.get(client_url)
+    assert after_client.headers["X-Cache"] == "miss"
+    assert after_client.headers["ETag"] != etag
+
+
+def test_if_none_match_lists_and_vary(api):
+    client, _ = api
+    url = "/api/v1/recommendations/property/H0001"
+    first = client.get(url, params={"top_n": 1}, headers={"Accept-Encoding": "identity"})
+    etag = first.headers["ETag"]
+    # Uncompressed, but the representation still depends on Accept-Encoding
+    assert "content-encoding" not in first.headers
+    assert first.headers["Vary"] == "Accept-Encoding"
+
+    for header in (etag, f'"other", W/{etag}', f' "other" ,{etag} ', "*"):
+        revalidated = client.get(url, params={"top_n": 1}, headers={"If-None-Match": header})
+        assert revalidated.status_code == 304, header
+        assert revalidated.headers["Vary"] == "Accept-Encoding"
+    # A different tag, or text that merely contains this one, is no match
+    for header in ('"other"', etag[:-2] + '"', f'"other"{etag}'):
+        assert client.get(url, params={"top_n": 1}, headers={"If-None-Match": header}).status_code == 200, header
+
+
+def test_property_writes_from_elsewhere_change_the_etag(api, monkeypatch):
+    client, _ = api
+    monkeypatch.setattr(data_version, "refresh_seconds", 0)
+    url = "/api/v1/recommendations/property/H0004"
+    etag = client.get(url).headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    # Written by another process: this one's property counter does not move
+    db = next(app.dependency_overrides[get_db]())
+    prop = db.query(Property).filter(Property.property_id == "H0004").one()
+    prop.price_DZD = 1_000_000
+    prop.updated_at = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    db.commit()
+    db.close()
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+
+    # Expired entries are never confirmed, even for an unchanged version
+    etag = changed.headers["ETag"]
+    response_cache.clear()
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,49 @@
+def test_fields_projection_skips_what_was_not_asked_for(api):
+    client, _ = api
+    url = "/api/v1/recommendations/property/H0047"
+    full = client.get(url).json()
+    assert set(full) >= {"house_info", "matches", "profit_analysis", "summary"}
+
+    response = client.get(url, params={"top_n": 3, "fields": "matches.client_id,matches.confidence,summary"})
+    assert response.status_code == 200
+    shaped = response.json()
+    assert set(shaped) == {"matches", "summary"}
+    assert [set(row) for row in shaped["matches"]] == [{"client_id", "confidence"}] * 3
+    assert [row["client_id"] for row in shaped["matches"]] == [row["client_id"] for row in full["matches"][:3]]
+    # Neither explanations nor the profit analysis were computed
+    assert "best_profit_margin" not in shaped["summary"]
+    assert "explain;" not in response.headers["Server-Timing"]
+
+    without_profit = client.get(url, params={"profit": "false"}).json()
+    assert "profit_analysis" not in without_profit
+    assert without_profit["matches"] == full["matches"]
+
+    assert client.get(url, params={"fields": "matches,nope"}).status_code == 422
+
+
+def test_client_and_bulk_endpoints_take_the_same_parameters(api):
+    client, client_ids = api
+    shaped = client.get(
+        f"/api/v1/recommendations/client/{client_ids[0]}", params={"top_n": 2, "fields": "recommendations.location"}
+    ).json()
+    assert shaped["client_id"] == client_ids[0]
+    assert list(shaped["recommended_properties"]) == ["recommendations"]
+    assert all(set(row) == {"location"} for row in shaped["recommended_properties"]["recommendations"])
+    assert len(shaped["recommended_properties"]["recommendations"]) <= 2
+
+    bulk = client.get("/api/v1/recommendations/properties/", params={"top_n": 1, "fields": "summary"}).json()
+    assert all(list(r["prediction_result"]) in (["summary"], ["error"]) for r in bulk["properties_results"])
+    assert all(r["prediction_result"]["summary"]["total_matches"] <= 1
+               for r in bulk["properties_results"] if "summary" in r["prediction_result"])
+    assert bulk["summary"]["total_matches_found"] > 0
+
+    houses = client.get("/api/v1/properties/", params={"limit": 3}).json()
+    url = "/api/v1/recommendations/properties/"
+    posted = client.post(url, json=houses).json()
+    # Explanations are opt-in here, as the heaviest path
+    assert all("explanations" not in m for r in posted["properties_results"] for m in r["prediction_result"].get("matches", []))
+    shaped = client.post(url, json=houses, params={"top_n": 1, "fields": "matches.client_id", "explain": "true"}).json()
+    assert all(set(r["prediction_result"]) <= {"matches", "error"} for r in shaped["properties_results"])
+    assert all(len(r["prediction_result"]["matches"]) <= 1 for r in shaped["properties_results"])
+    assert shaped["properties_results"][0]["prediction_result"]["matches"][0].keys() == {"client_id"}
+    assert client.post(url, json=houses, params={"fields": "nope"}).status_code == 422
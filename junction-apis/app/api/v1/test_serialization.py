@@ -0,0 +1,45 @@
+from app.schemas.recommendation import (
+    BulkRecommendations, ClientRecommendations, PairExplanation, PropertyRecommendations,
+    StoredClientRecommendations, StoredPropertyRecommendations
+)
+
+
+def test_responses_match_their_schemas(api):
+    client, client_ids = api
+    PropertyRecommendations.model_validate(client.get("/api/v1/recommendations/property/H0047").json())
+    PropertyRecommendations.model_validate(
+        client.get("/api/v1/recommendations/property/H0003", params={"explain": "false"}).json()
+    )
+    ClientRecommendations.model_validate(client.get(f"/api/v1/recommendations/client/{client_ids[0]}").json())
+    PairExplanation.model_validate(client.get(f"/api/v1/recommendations/explain/H0047/{client_ids[0]}").json())
+
+    stored = {"mode": "stored"}
+    StoredPropertyRecommendations.model_validate(client.get("/api/v1/recommendations/property/H0047", params=stored).json())
+    StoredClientRecommendations.model_validate(client.get(f"/api/v1/recommendations/client/{client_ids[0]}", params=stored).json())
+
+
+def test_openapi_documents_live_and_stored_shapes(api):
+    client, _ = api
+    schemas = client.get("/api/v1/openapi.json").json()["components"]["schemas"]
+    for name in ("PropertyRecommendations", "StoredPropertyRecommendations", "ClientRecommendations", "StoredClientRecommendations"):
+        assert name in schemas
+    assert "stored" not in schemas["PropertyRecommendations"]["properties"]
+    assert schemas["StoredPropertyRecommendations"]["required"] == ["stored"]
+
+
+def test_large_bulk_response_is_gzipped(api):
+    client, _ = api
+    url = "/api/v1/recommendations/properties/"
+    compressed = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert compressed.status_code == 200
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert int(compressed.headers["Content-Length"]) < len(compressed.content)
+    BulkRecommendations.model_validate(compressed.json())
+
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.json() == compressed.json()
+
+    # Small bodies are not worth compressing
+    single = client.get("/api/v1/recommendations/property/H0047", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in single.headers
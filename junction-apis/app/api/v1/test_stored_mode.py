@@ -0,0 +1,72 @@
+from app.core.config import settings
+from app.core.database import get_db
+from app.models.match_score import MatchScore
+from app.services.modules.client_store import ClientStore
+from app.services.modules.match_scores import incremental_rescoring, rebuild_match_scores
+from app.services.modules.model_utils import get_model_registry
+from main import app
+
+
+def api_session():
+    """A session on the api fixture's database."""
+    return next(app.dependency_overrides[get_db]())
+
+
+def test_stored_mode_pages_through_the_stored_ranking(api):
+    client, client_ids = api
+    db = api_session()
+    rebuild_match_scores(db, get_model_registry(), ClientStore(None).rebuild(db), verbose=False)
+    db.close()
+
+    k = settings.STORED_TOP_K
+    pages = {
+        "/api/v1/recommendations/property/H0047": ("matches", "client_id", None),
+        f"/api/v1/recommendations/client/{client_ids[0]}": ("recommendations", "property_id", "recommended_properties"),
+    }
+    for url, (section, key, wrapper) in pages.items():
+        def page(**params):
+            response = client.get(url, params={"mode": "stored", **params})
+            assert response.status_code == 200
+            body = response.json()
+            return body[wrapper] if wrapper else body
+
+        first = page(top_n=k)
+        ranking = [row[key] for row in first[section]]
+        assert first["stored"]["offset"] == 0
+        assert first["stored"]["total"] == len(ranking) > 10
+        assert first["stored"]["scored_at"] is not None
+        assert [row["confidence"] for row in first[section]] == sorted((row["confidence"] for row in first[section]), reverse=True)
+
+        # offset continues where the previous page stopped, up to rank STORED_TOP_K
+        second = page(top_n=5, offset=5)
+        assert [row[key] for row in second[section]] == ranking[5:10]
+        assert second["stored"] == {**first["stored"], "offset": 5}
+        assert page(top_n=5, offset=k)[section] == []
+
+
+def test_stored_mode_without_the_table_is_a_503(api):
+    client, client_ids = api
+    db = api_session()
+    MatchScore.__table__.drop(bind=db.get_bind())
+    db.close()
+
+    for url in ("/api/v1/recommendations/property/H0047", f"/api/v1/recommendations/client/{client_ids[0]}"):
+        response = client.get(url, params={"mode": "stored"})
+        assert response.status_code == 503
+        assert "rebuild_match_scores" in response.json()["detail"]
+    # Live mode does not need it
+    assert client.get("/api/v1/recommendations/property/H0047").status_code == 200
+
+
+def test_writes_rescore_in_the_test_database(api):
+    client, client_ids = api
+    db = api_session()
+    assert incremental_rescoring.session_factory().get_bind().url == db.get_bind().url
+    assert db.query(MatchScore).count() == 0
+
+    # Background tasks run before TestClient returns
+    assert client.put("/api/v1/properties/H0047", json={"price_DZD": 1_000_000}).status_code == 200
+    assert db.query(MatchScore).filter(MatchScore.property_id == "H0047").count() >= settings.STORED_TOP_K
+    db.close()
+    stored = client.get("/api/v1/recommendations/property/H0047", params={"mode": "stored"}).json()["stored"]
+    assert stored["total"] == settings.STORED_TOP_K
@@ -20,6 +20,41 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Match model served by the API: random_forest, shallow_forest, hist_gradient_boosting
+    # or logistic_regression (trained on first use if its artifact is missing)
+    MATCH_MODEL_VARIANT: str = "random_forest"
+    # match_scores keeps the best STORED_TOP_K clients of each property and properties of
+    # each client (see app/services/modules/match_scores.py)
+    STORED_TOP_K: int = 20
+    
+    # Request handling: endpoints run in a threadpool of THREADPOOL_SIZE threads, of which
+    # at most SCORING_CONCURRENCY may be scoring at once (the rest stay free for CRUD calls)
+    THREADPOOL_SIZE: int = 40
+    SCORING_CONCURRENCY: int = 2
+    # Worker processes for property scoring (see app/services/modules/scoring_pool.py);
+    # 0 scores in the request thread, set it to the number of cores to use them all
+    SCORING_PROCESSES: int = 0
+    
+    # Warm client store (see app/services/modules/client_store.py)
+    CLIENT_SNAPSHOT_PATH: str = "./app/services/cache/clients_snapshot.npz"
+    CLIENT_STORE_REFRESH_SECONDS: int = 30
+    # Client writes are saved to CLIENT_SNAPSHOT_PATH this long after the first unsaved one
+    CLIENT_SNAPSHOT_SAVE_DELAY_SECONDS: float = 5.0
+    
+    # Bulk recommendation jobs (see app/services/modules/bulk_jobs.py): result files, how often
+    # an idle worker polls the bulk_jobs table, and after how long a silent run is re-claimed
+    BULK_JOB_DIR: str = "./app/services/cache/bulk_jobs"
+    BULK_JOB_POLL_SECONDS: int = 5
+    BULK_JOB_STALE_SECONDS: int = 300
+    
+    # Rendered recommendation responses kept per process (see app/services/modules/response_cache.py)
+    RESPONSE_CACHE_SIZE: int = 512
+    RESPONSE_CACHE_TTL_SECONDS: int = 300
+    # JSON bodies of at least GZIP_MIN_BYTES are gzip-compressed for clients that accept it
+    # (0 disables compression); see app/core/responses.py
+    GZIP_MIN_BYTES: int = 65536
+    GZIP_LEVEL: int = 5
+    
     # Redis
     REDIS_URL: Optional[str] = None
     
@@ -20,6 +20,9 @@ def get_database_url():
 
 def get_connect_args():
     """Get connection arguments for pg8000"""
+    # Local SQLite stand-in (tests, development): handlers run in threadpool workers
+    if settings.database_url.startswith("sqlite"):
+        return {"check_same_thread": False}
     # Enable SSL for Render PostgreSQL
     if "render.com" in settings.database_url:
         return {"ssl_context": True}
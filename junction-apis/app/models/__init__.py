@@ -2,9 +2,13 @@
 from .base import BaseModel
 from .client import Client
 from .property import Property
+from .match_score import MatchScore
+from .bulk_job import BulkJob
 
 __all__ = [
     "BaseModel",
     "Client",
-    "Property"
+    "Property",
+    "MatchScore",
+    "BulkJob"
 ]
\ No newline at end of file
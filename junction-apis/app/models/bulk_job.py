@@ -0,0 +1,42 @@
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, Text, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class BulkJob(Base):
+    """
+    A bulk recommendation run over every property, executed by the local job worker
+    (app/services/modules/bulk_jobs.py). The row is the durable state of the job: a worker
+    claims a pending row by flipping its status, reports progress in `done` and keeps
+    heartbeat_at fresh so a run abandoned by a dead process can be picked up again.
+    """
+    __tablename__ = "bulk_jobs"
+
+    job_id = Column(String(36), primary_key=True)
+    status = Column(String(20), nullable=False, default="pending")  # pending, running, succeeded, failed
+
+    # Parameters of GET /recommendations/properties/
+    top_n = Column(Integer, nullable=False, default=10)
+    explain = Column(Boolean, nullable=False, default=False)
+    strict = Column(Boolean, nullable=False, default=False)
+
+    total = Column(Integer, nullable=True)
+    done = Column(Integer, nullable=False, default=0)
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    result_path = Column(String(500), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_bulk_jobs_status_created", "status", "created_at"),
+    )
+
+    @property
+    def progress(self):
+        """Share of the properties scored so far (None until the run knows its total)."""
+        if not self.total:
+            return 1.0 if self.status == "succeeded" else None
+        return round(self.done / self.total, 4)
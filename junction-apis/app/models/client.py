@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, Boolean
+from sqlalchemy import Column, String, Integer, Float, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from .base import BaseModel
 
@@ -40,6 +40,15 @@ class Client(BaseModel):
     weight_parks_nearby = Column(Float, nullable=True)
     preferred_public_transport_score = Column(Integer, nullable=True)
     weight_public_transport_score = Column(Float, nullable=True)
+
+    # Partial indexes over the active rows, matching the GET /clients/ filters: budget
+    # overlap and preferred property type (keyset pages, id > cursor, use the primary key)
+    __table_args__ = (
+        Index("ix_clients_active_budget", "max_budget_DZD", "min_budget_DZD",
+              postgresql_where=text("is_active"), sqlite_where=text("is_active")),
+        Index("ix_clients_active_type", "preferred_property_type", "id",
+              postgresql_where=text("is_active"), sqlite_where=text("is_active")),
+    )
     
 def __repr__(self):
         return (
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, String, Float, DateTime, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class MatchScore(Base):
+    """
+    Materialized scores written by the batched scorer: each property's top STORED_TOP_K
+    clients and each client's top STORED_TOP_K properties (the union of both).
+    The two composite indexes serve "top clients for a property" and "top properties for a
+    client" as a single ordered index scan.
+    """
+    __tablename__ = "match_scores"
+
+    property_id = Column(String(50), primary_key=True)
+    client_id = Column(String(50), primary_key=True)
+
+    distance_km = Column(Float, nullable=False)
+    confidence_model = Column(Float, nullable=False)
+    confidence_distance = Column(Float, nullable=False)
+    confidence = Column(Float, nullable=False)
+
+    model_variant = Column(String(50), nullable=False)
+    scored_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_match_scores_property_rank", "property_id", confidence.desc(), "client_id"),
+        Index("ix_match_scores_client_rank", "client_id", confidence.desc(), "property_id"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float
+from sqlalchemy import Column, String, Integer, Float, Index, text
 from .base import BaseModel
 
 class Property(BaseModel):
@@ -14,4 +14,14 @@ class Property(BaseModel):
     hospitals_nearby = Column(Integer, nullable=True)
     parks_nearby = Column(Integer, nullable=True)
     public_transport_score = Column(Integer, nullable=True)
-    match = Column(Integer, nullable=True)
\ No newline at end of file
+    match = Column(Integer, nullable=True)
+
+    # Partial indexes over the active (not soft-deleted) rows, matching the GET /properties/
+    # filters: price and area ranges, property type + price (keyset pages, id > cursor, use
+    # the primary key)
+    __table_args__ = (
+        Index("ix_properties_active_price", "price_DZD", postgresql_where=text("is_active"), sqlite_where=text("is_active")),
+        Index("ix_properties_active_area", "area", postgresql_where=text("is_active"), sqlite_where=text("is_active")),
+        Index("ix_properties_active_type_price", "property_type", "price_DZD",
+              postgresql_where=text("is_active"), sqlite_where=text("is_active")),
+    )
@@ -0,0 +1,26 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Optional
+
+class BulkJobCreate(BaseModel):
+    top_n: int = Field(10, ge=1, le=100)
+    explain: bool = False
+    strict: bool = False
+
+class BulkJob(BaseModel):
+    job_id: str
+    status: str
+    top_n: int
+    explain: bool
+    strict: bool
+    total: Optional[int] = None
+    done: int = 0
+    progress: Optional[float] = None
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
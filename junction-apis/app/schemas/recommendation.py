@@ -0,0 +1,163 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+# The recommendation endpoints return already rendered responses (cached, gzipped), so
+# FastAPI does not validate against these schemas; they document the shapes (responses=)
+# and the API tests check them
+
+
+class BuyerDetails(BaseModel):
+    budget_range: str
+    area_range: str
+    property_type: Optional[str] = None
+    marital_status: Optional[str] = None
+    has_kids: Optional[bool] = None
+
+# Rows carry only the fields asked for with fields=section.field
+class BuyerMatch(BaseModel):
+    client_id: Optional[str] = None
+    preferred_location: Optional[str] = None
+    distance_km: Optional[float] = None
+    confidence_model: Optional[float] = None
+    confidence_distance: Optional[float] = None
+    confidence: Optional[float] = None
+    price: Optional[float] = None
+    # With explain=true
+    explanations: Optional[List[str]] = None
+    buyer_details: Optional[BuyerDetails] = None
+
+class BuyerProfit(BuyerMatch):
+    potential_margin_DZD: Optional[float] = None
+    potential_margin_percent: Optional[float] = None
+    commission_profit_DZD: Optional[float] = None
+
+class BuyerFiltering(BaseModel):
+    excluded_buyers: int
+    remaining_buyers: int
+    exclusion_reason: str
+
+class MatchSummary(BaseModel):
+    total_matches: int
+    top_confidence: float
+    # Only with the profit analysis
+    best_profit_margin: Optional[float] = None
+
+class StoredInfo(BaseModel):
+    offset: int = 0
+    total: int
+    scored_at: Optional[str] = None
+
+# Sections left out with fields= (or profit=false) are absent
+class PropertyRecommendations(BaseModel):
+    house_info: Optional[Dict[str, Any]] = None
+    processing_info: Optional[Dict[str, Any]] = None
+    filtering_results: Optional[BuyerFiltering] = None
+    matches: Optional[List[BuyerMatch]] = None
+    profit_analysis: Optional[List[BuyerProfit]] = None
+    summary: Optional[MatchSummary] = None
+    # Set when no buyer can afford the property
+    error: Optional[str] = None
+
+# mode=stored: the stored ranking of the clients, no scoring details
+class StoredPropertyRecommendations(BaseModel):
+    house_info: Optional[Dict[str, Any]] = None
+    matches: Optional[List[BuyerMatch]] = None
+    stored: StoredInfo
+
+
+class HouseMatch(BaseModel):
+    house_index: Optional[int] = None
+    property_id: Optional[str] = None
+    location: Optional[str] = None
+    price: Optional[float] = None
+    area: Optional[int] = None
+    type: Optional[str] = None
+    distance_km: Optional[float] = None
+    confidence_model: Optional[float] = None
+    confidence_distance: Optional[float] = None
+    confidence: Optional[float] = None
+    explanations: Optional[List[str]] = None
+
+class HouseProfit(HouseMatch):
+    potential_margin_DZD: Optional[float] = None
+    potential_margin_percent: Optional[float] = None
+    commission_profit_DZD: Optional[float] = None
+
+class ClientInfo(BaseModel):
+    client_id: str
+    preferred_location: Optional[str] = None
+    budget_range: str
+    area_preference: str
+    property_type: Optional[str] = None
+    has_kids: Optional[bool] = None
+
+class HouseFiltering(BaseModel):
+    excluded_houses: int
+    remaining_houses: int
+    exclusion_reason: str
+
+class HouseSummary(BaseModel):
+    total_recommendations: int
+    top_confidence: float
+    best_profit_margin: Optional[float] = None
+
+class ClientRecommendationResult(BaseModel):
+    client_info: Optional[ClientInfo] = None
+    processing_info: Optional[Dict[str, Any]] = None
+    filtering_results: Optional[HouseFiltering] = None
+    recommendations: Optional[List[HouseMatch]] = None
+    profit_analysis: Optional[List[HouseProfit]] = None
+    summary: Optional[HouseSummary] = None
+    error: Optional[str] = None
+
+class ClientRecommendations(BaseModel):
+    client_id: str
+    recommended_properties: ClientRecommendationResult
+
+class StoredClientRecommendationResult(BaseModel):
+    recommendations: Optional[List[HouseMatch]] = None
+    stored: StoredInfo
+
+class StoredClientRecommendations(BaseModel):
+    client_id: str
+    recommended_properties: StoredClientRecommendationResult
+
+
+class PairExplanation(BaseModel):
+    property_id: str
+    client_id: str
+    preferred_location: Optional[str] = None
+    distance_km: float
+    confidence_model: float
+    confidence_distance: float
+    confidence: float
+    explanations: List[str]
+
+
+class BulkPropertyResult(BaseModel):
+    property_info: Dict[str, Any]
+    prediction_result: PropertyRecommendations
+    property_index: int
+
+class BulkSummary(BaseModel):
+    total_properties_processed: int
+    total_matches_found: int
+    average_matches_per_property: float
+
+class BulkRecommendations(BaseModel):
+    processing_info: Dict[str, Any]
+    properties_results: List[BulkPropertyResult]
+    summary: BulkSummary
+
+
+class PropertyComparison(BaseModel):
+    property_id: str
+    location: str
+    price_DZD: float
+    infrastructure_score: int
+    avg_buyer_score: float
+    matches_scored: int
+
+class ComparisonResult(BaseModel):
+    properties: List[PropertyComparison]
+    recommended: PropertyComparison
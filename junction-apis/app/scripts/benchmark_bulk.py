@@ -0,0 +1,83 @@
+"""
+Throughput of the batched bulk scorer against the old per-property loop.
+
+    python -m app.scripts.benchmark_bulk [contacts_csv] [n_properties]
+
+Both paths use the same model, encoder and inputs, and the script checks that they
+return identical payloads before reporting timings.
+"""
+import sys
+import time
+
+import pandas as pd
+
+from app.services.modules.model_utils import get_model_registry
+from app.services.modules.recommendation import get_bulk_recommendations, predict_matches
+
+CONTACTS_PATH = "./app/services/data/contacts_20k.csv"
+PROPERTIES_PATH = "./app/services/data/synthetic_houses_200.csv"
+CLIENT_COLUMNS = [
+    "client_id", "preferred_location", "min_budget_DZD", "max_budget_DZD",
+    "min_area", "max_area", "preferred_property_type", "marital_status", "has_kids"
+]
+
+
+def per_property_loop(registry, properties, contacts_df, top_n):
+    """The previous get_bulk_recommendations inner loop: one predict_matches call per property"""
+    return [
+        predict_matches(
+            model=registry.model,
+            expected_columns=registry.expected_columns,
+            house_data=house,
+            contacts_df=contacts_df.copy(),
+            top_n=top_n,
+            include_explanations=True,
+            return_json=True,
+            encoder=registry.encoder
+        )
+        for house in properties
+    ]
+
+
+def batched(registry, properties, contacts_df, top_n):
+    result = get_bulk_recommendations(
+        properties_source=properties,
+        top_n=top_n,
+        show_explanations=True,
+        contacts_df=contacts_df,
+        model=registry.model,
+        expected_columns=registry.expected_columns,
+        encoder=registry.encoder,
+        return_json=True
+    )
+    return [r["prediction_result"] for r in result["properties_results"]]
+
+
+def main(contacts_path=CONTACTS_PATH, n_properties=200, top_n=10):
+    registry = get_model_registry()
+    contacts_df = pd.read_csv(contacts_path)
+    contacts_df = contacts_df[[c for c in CLIENT_COLUMNS if c in contacts_df.columns]]
+    properties = pd.read_csv(PROPERTIES_PATH, encoding="utf-8-sig").head(n_properties)
+    properties = properties.drop(columns=["property_id"]).to_dict("records")
+    pairs = len(properties) * len(contacts_df)
+
+    print(f"🏘️ {len(properties)} properties × {len(contacts_df)} clients ({pairs:,} candidate pairs)")
+
+    timings = {}
+    outputs = {}
+    for name, fn in (("per-property loop", per_property_loop), ("batched", batched)):
+        start = time.perf_counter()
+        outputs[name] = fn(registry, properties, contacts_df, top_n)
+        timings[name] = time.perf_counter() - start
+        print(f"⏱ {name:<18} {timings[name]:8.2f} s  ({len(properties) / timings[name]:7.1f} properties/s, {pairs / timings[name]:,.0f} pairs/s)")
+
+    same = outputs["per-property loop"] == outputs["batched"]
+    print(f"{'✅' if same else '❌'} Identical results: {same}")
+    print(f"🚀 Speed-up: {timings['per-property loop'] / timings['batched']:.2f}x")
+    return timings
+
+
+if __name__ == "__main__":
+    contacts_path = sys.argv[1] if len(sys.argv) > 1 else CONTACTS_PATH
+    n_properties = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    main(contacts_path, n_properties)
@@ -0,0 +1,64 @@
+"""
+Latency of the flat-array forest evaluator against sklearn's predict_proba on match_predictor.pkl.
+
+    python -m app.scripts.benchmark_flat_forest [repeats]
+
+Rows are real (buyer, house) pairs encoded with the served encoder. For each batch size the
+script checks that both evaluators return identical probabilities, then reports p50/p99
+latency over `repeats` calls.
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.services.modules.flat_forest import FlatForest, FLAT_FOREST_MAX_ROWS
+from app.services.modules.model_utils import distances_km, get_model_registry
+
+CONTACTS_PATH = "./app/services/data/contacts_20k.csv"
+PROPERTIES_PATH = "./app/services/data/synthetic_houses_200.csv"
+BATCH_SIZES = (1, 10, 50, 200, 500, 2000)
+
+
+def latencies_ms(predict_proba, X, repeats):
+    predict_proba(X)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict_proba(X)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 99)
+
+
+def main(repeats=50):
+    registry = get_model_registry()
+    model = registry.model
+    start = time.perf_counter()
+    flat = FlatForest.from_sklearn(model)
+    export_s = time.perf_counter() - start
+    print(f"🌲 {flat.n_trees} trees, {flat.n_nodes:,} nodes, {flat.nbytes / 1e6:.1f} MB flat arrays (export {export_s:.2f} s)")
+
+    contacts = pd.read_csv(CONTACTS_PATH)
+    house = pd.read_csv(PROPERTIES_PATH, encoding="utf-8-sig").iloc[0].to_dict()
+    X_all = registry.encoder.transform(
+        contacts, house, distances_km(contacts["preferred_location"], house["location"])
+    )
+
+    print(f"{'rows':>6} | {'sklearn p50':>11} {'p99':>8} | {'flat p50':>9} {'p99':>8} | speed-up")
+    results = {}
+    for n_rows in BATCH_SIZES:
+        X = X_all[:n_rows]
+        same = np.array_equal(flat.predict_proba(X), model.predict_proba(X))
+        sk = latencies_ms(model.predict_proba, X, max(3, repeats if n_rows <= 500 else repeats // 5))
+        fl = latencies_ms(flat.predict_proba, X, max(3, repeats if n_rows <= 500 else repeats // 5))
+        results[n_rows] = {"sklearn": sk, "flat": fl, "identical": same}
+        print(f"{n_rows:>6} | {sk[0]:9.2f}ms {sk[1]:6.2f}ms | {fl[0]:7.2f}ms {fl[1]:6.2f}ms | "
+              f"{sk[0] / fl[0]:5.2f}x {'✅' if same else '❌ results differ'}")
+
+    print(f"ℹ️  The served scorer uses the flat evaluator up to {FLAT_FOREST_MAX_ROWS} rows and sklearn above that.")
+    return results
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
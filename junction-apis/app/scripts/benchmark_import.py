@@ -0,0 +1,90 @@
+"""
+Throughput of the bulk CSV loader against the previous row-by-row import scripts.
+
+    python -m app.scripts.benchmark_import [contacts_csv] [--database-url URL] [--rows N]
+
+By default both loaders write into throwaway SQLite files. Pass --database-url to measure
+against a real (empty, scratch) database, where the per-row commits of the old scripts
+pay a network round trip each. The rows the two loaders stored are compared before the
+timings are reported.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.client import Client
+from app.services.modules.bulk_import import CLIENT_IMPORT, IMPORT_BATCH_ROWS, import_csv, validate_frame
+
+CONTACTS_PATH = "./app/services/data/contacts_20k.csv"
+
+
+def row_by_row(db, csv_path):
+    """What import_contacts.py used to do: one ORM object and one commit per CSV row."""
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    records, _, _ = validate_frame(df, CLIENT_IMPORT)
+    existing = {row[0] for row in db.query(Client.client_id).all()}
+    added = 0
+    for record in records:
+        if record["client_id"] in existing:
+            continue
+        db.add(Client(**record))
+        db.commit()
+        added += 1
+    return added
+
+
+def stored_clients(db):
+    columns = [getattr(Client, c) for c in CLIENT_IMPORT.columns]
+    return pd.DataFrame(db.query(*columns).order_by(Client.client_id).all(), columns=list(CLIENT_IMPORT.columns))
+
+
+def fresh_session(url):
+    engine = create_engine(url)
+    Base.metadata.drop_all(engine, tables=[Client.__table__])
+    Base.metadata.create_all(engine, tables=[Client.__table__])
+    return sessionmaker(bind=engine)()
+
+
+def main(csv_path=CONTACTS_PATH, database_url=None, rows=None, batch_size=IMPORT_BATCH_ROWS):
+    with tempfile.TemporaryDirectory() as tmp:
+        if rows:
+            sample = os.path.join(tmp, "sample.csv")
+            pd.read_csv(csv_path, dtype=str, keep_default_na=False, nrows=rows).to_csv(sample, index=False)
+            csv_path = sample
+        urls = [database_url] * 2 if database_url else [f"sqlite:///{tmp}/{name}.db" for name in ("rows", "bulk")]
+
+        db = fresh_session(urls[0])
+        start = time.perf_counter()
+        added = row_by_row(db, csv_path)
+        old_s = time.perf_counter() - start
+        old_rows = stored_clients(db)
+        db.close()
+
+        db = fresh_session(urls[1])
+        report = import_csv(db, csv_path, CLIENT_IMPORT, batch_size=batch_size, verbose=False)
+        new_rows = stored_clients(db)
+        db.close()
+
+    same = old_rows.equals(new_rows)
+    print(f"📥 {added:,} rows from {csv_path}")
+    print(f"   row by row : {old_s:8.2f} s  {added / old_s:10,.0f} rows/s")
+    print(f"   bulk upsert: {report.seconds:8.2f} s  {report.rows_per_second:10,.0f} rows/s "
+          f"({report.batches} batches of {batch_size})")
+    print(f"   speed-up   : {old_s / report.seconds:8.1f}x {'✅ same rows stored' if same else '❌ stored rows differ'}")
+    return {"row_by_row_s": old_s, "bulk_s": report.seconds, "rows": added, "identical": same}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv_path", nargs="?", default=CONTACTS_PATH)
+    parser.add_argument("--database-url", help="scratch database to write into (its clients table is recreated)")
+    parser.add_argument("--rows", type=int, help="only import the first N rows")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_ROWS)
+    args = parser.parse_args()
+    main(args.csv_path, args.database_url, args.rows, args.batch_size)
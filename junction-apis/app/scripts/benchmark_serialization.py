@@ -0,0 +1,112 @@
+"""
+Serialization time and payload size of the bulk recommendation response, the way the
+endpoint used to render it against the current path.
+
+    python -m app.scripts.benchmark_serialization [contacts_csv] [n_properties] [repeats]
+
+before: the recursive convert_numpy_types walk, then FastAPI's jsonable_encoder and
+        json.dumps (what a plain `return results` costs).
+after:  app.core.responses.dumps on the natively built payload, plus gzip as served to
+        clients sending Accept-Encoding: gzip.
+
+The script checks that both bodies decode to the same document before reporting.
+"""
+import gzip
+import json
+import statistics
+import sys
+import time
+
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.responses import dumps
+from app.services.modules.client_store import CLIENT_FIELDS, ClientSnapshot
+from app.services.modules.model_utils import get_model_registry
+from app.services.modules.recommendation import get_bulk_recommendations
+
+CONTACTS_PATH = "./app/services/data/Synthetic_Contacts__2000_Buyers_.csv"
+PROPERTIES_PATH = "./app/services/data/synthetic_houses_200.csv"
+
+
+def convert_numpy_types(obj):
+    """The walker every response used to go through before being encoded"""
+    if isinstance(obj, dict):
+        return {key: convert_numpy_types(value) for key, value in obj.items()}
+    elif isinstance(obj, list):
+        return [convert_numpy_types(item) for item in obj]
+    elif hasattr(obj, 'item'):  # numpy scalar
+        return obj.item()
+    elif hasattr(obj, 'tolist'):  # numpy array
+        return obj.tolist()
+    else:
+        return obj
+
+
+def before(payload):
+    return JSONResponse(jsonable_encoder(convert_numpy_types(payload))).body
+
+
+def after(payload):
+    return dumps(payload)
+
+
+def after_gzip(payload):
+    return gzip.compress(dumps(payload), compresslevel=settings.GZIP_LEVEL)
+
+
+def median_ms(fn, payload, repeats):
+    fn(payload)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(payload)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def bulk_payload(contacts_path, n_properties):
+    registry = get_model_registry()
+    contacts = pd.read_csv(contacts_path)
+    contacts["client_id"] = contacts["client_id"].astype(str)
+    snapshot = ClientSnapshot.from_frame(contacts.reindex(columns=CLIENT_FIELDS))
+    properties = pd.read_csv(PROPERTIES_PATH, encoding="utf-8-sig").head(n_properties)
+    return get_bulk_recommendations(
+        properties_source=properties.drop(columns=["property_id"]).to_dict("records"),
+        top_n=10,
+        show_explanations=True,
+        contacts_df=snapshot.to_frame(),
+        model=registry.scorer,
+        expected_columns=registry.expected_columns,
+        encoder=registry.encoder,
+        buyer_index=snapshot.buyer_index,
+        return_json=True
+    )
+
+
+def main(contacts_path=CONTACTS_PATH, n_properties=200, repeats=10):
+    payload = bulk_payload(contacts_path, n_properties)
+    print(f"📦 Bulk response: {len(payload['properties_results'])} properties, "
+          f"{payload['summary']['total_matches_found']} matches, with explanations")
+
+    bodies = {"before": before(payload), "after": after(payload), "after + gzip": after_gzip(payload)}
+    same = json.loads(bodies["before"]) == json.loads(bodies["after"]) == json.loads(gzip.decompress(bodies["after + gzip"]))
+    print(f"{'✅' if same else '❌'} Identical documents: {same}")
+
+    results = {}
+    for name, fn in (("before", before), ("after", after), ("after + gzip", after_gzip)):
+        results[name] = {"median_ms": median_ms(fn, payload, repeats), "bytes": len(bodies[name])}
+        print(f"⏱ {name:<13} {results[name]['median_ms']:8.2f} ms   {results[name]['bytes']:>10,} bytes")
+
+    print(f"🚀 Serialization: {results['before']['median_ms'] / results['after']['median_ms']:.1f}x faster, "
+          f"gzip body {results['before']['bytes'] / results['after + gzip']['bytes']:.1f}x smaller")
+    return results
+
+
+if __name__ == "__main__":
+    contacts_path = sys.argv[1] if len(sys.argv) > 1 else CONTACTS_PATH
+    n_properties = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    main(contacts_path, n_properties, repeats)
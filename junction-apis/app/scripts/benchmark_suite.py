@@ -0,0 +1,285 @@
+"""
+Latency benchmarks of the recommendation pipeline over the bundled datasets, with a JSON
+baseline to catch regressions.
+
+    python -m app.scripts.benchmark_suite [--datasets NAME ...] [--repeats N] [--skip-training]
+                                          [--output results.json] [--save-baseline]
+                                          [--compare [BASELINE]] [--threshold 0.25]
+
+For every buyer dataset (each against synthetic_houses_200.csv) it times predict_matches,
+recommend_houses_for_client and get_bulk_recommendations in-process, then the same
+recommendations through the HTTP endpoints, served by the app on a throwaway SQLite
+database holding that dataset. train_model is timed once, on balanced_contacts_20k.csv,
+into a temporary directory.
+
+--save-baseline writes the results to BASELINE_PATH. --compare runs the suite and reports
+every case whose median is more than --threshold (25% by default) slower than the
+baseline; the exit status is 1 when there is at least one regression. Timings only compare
+meaningfully against a baseline recorded on the same machine.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from app.services.modules.client_store import CLIENT_FIELDS, ClientSnapshot
+from app.services.modules.model_utils import DATASET_PATH, get_model_registry, train_model
+from app.services.modules.recommendation import get_bulk_recommendations, predict_matches, recommend_houses_for_client
+
+DATA_DIR = "./app/services/data"
+PROPERTIES_PATH = f"{DATA_DIR}/synthetic_houses_200.csv"
+DATASETS = {
+    "test_contacts_2k": f"{DATA_DIR}/test_contacts_2k.csv",
+    "synthetic_contacts_2000": f"{DATA_DIR}/Synthetic_Contacts__2000_Buyers_.csv",
+    "contacts_20k": f"{DATA_DIR}/contacts_20k.csv",
+}
+BASELINE_PATH = "./app/scripts/benchmark_baseline.json"
+DEFAULT_REPEATS = 10
+# Whole-catalogue runs are much slower than a single recommendation
+BULK_REPEATS = 3
+DEFAULT_THRESHOLD = 0.25
+# Differences below this are timer noise, whatever the ratio
+NOISE_FLOOR_MS = 2.0
+
+
+def measure(fn, repeats):
+    """Call fn(i) once to warm up, then repeats times; wall-clock statistics in ms."""
+    fn(0)
+    timings = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        fn(i)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "repeats": repeats,
+        "min_ms": round(timings[0], 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "max_ms": round(timings[-1], 3),
+    }
+
+
+def load_contacts(path):
+    df = pd.read_csv(path)
+    df["client_id"] = df["client_id"].astype(str)
+    return df[[c for c in df.columns if c in CLIENT_FIELDS]]
+
+
+def load_houses():
+    return pd.read_csv(PROPERTIES_PATH, encoding="utf-8-sig")
+
+
+def bench_pipeline(contacts, houses, repeats):
+    """The service functions, called the way the endpoints call them."""
+    registry = get_model_registry()
+    # Like the client store built from the database: columns missing from the CSV are NULL
+    snapshot = ClientSnapshot.from_frame(contacts.reindex(columns=CLIENT_FIELDS))
+    contacts_df = snapshot.to_frame()
+    houses_df = houses.drop(columns=["property_id"])
+    house_records = houses_df.to_dict("records")
+    client_ids = contacts["client_id"].tolist()
+
+    def one_property(i):
+        predict_matches(
+            registry.scorer, registry.expected_columns, house_records[i % len(house_records)], contacts_df,
+            top_n=10, include_explanations=True, encoder=registry.encoder, buyer_index=snapshot.buyer_index
+        )
+
+    def one_client(i):
+        client_id = client_ids[i % len(client_ids)]
+        recommend_houses_for_client(
+            client_id, contacts_df[contacts_df["client_id"] == client_id], houses_df,
+            registry.scorer, registry.expected_columns, top_n=10, include_explanations=True, encoder=registry.encoder
+        )
+
+    def bulk(_):
+        get_bulk_recommendations(
+            house_records, top_n=10, show_explanations=True, contacts_df=contacts_df, model=registry.scorer,
+            expected_columns=registry.expected_columns, encoder=registry.encoder, buyer_index=snapshot.buyer_index
+        )
+
+    return {
+        "predict_matches": measure(one_property, repeats),
+        "recommend_houses_for_client": measure(one_client, repeats),
+        "get_bulk_recommendations": measure(bulk, min(repeats, BULK_REPEATS)),
+    }
+
+
+@contextmanager
+def local_app(contacts, houses, tmp):
+    """TestClient of the app on a SQLite stand-in holding contacts and houses."""
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.core.database import Base, get_db
+    from app.models.client import Client
+    from app.models.property import Property
+    from app.services.modules.client_store import client_store
+    from app.services.modules.response_cache import response_cache
+    from main import app
+
+    engine = create_engine(f"sqlite:///{tmp}/bench.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine, tables=[Client.__table__, Property.__table__])
+    with engine.begin() as connection:
+        for model, frame in ((Client, contacts), (Property, houses)):
+            columns = [c.name for c in model.__table__.columns if c.name in frame.columns]
+            records = frame[columns].astype(object).where(frame[columns].notna(), None).to_dict("records")
+            connection.execute(model.__table__.insert(), [dict(r, is_active=True) for r in records])
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def get_bench_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    saved = client_store.snapshot_path, client_store._snapshot, client_store.ready, response_cache.max_entries
+    app.dependency_overrides[get_db] = get_bench_db
+    # No persisted snapshot (it belongs to the real database) and no cache hits between repeats
+    client_store.snapshot_path, client_store._snapshot, client_store.ready = None, ClientSnapshot.empty(), False
+    response_cache.max_entries = 0
+    try:
+        # Without `with`, startup hooks (real database, bulk job worker) do not run
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        client_store.snapshot_path, client_store._snapshot, client_store.ready, response_cache.max_entries = saved
+        response_cache.clear()
+        engine.dispose()
+
+
+def bench_http(contacts, houses, repeats):
+    """The recommendation endpoints, from request to parsed JSON."""
+    property_ids = houses["property_id"].tolist()
+    client_ids = contacts["client_id"].tolist()
+
+    with tempfile.TemporaryDirectory() as tmp, local_app(contacts, houses, tmp) as client:
+        def get(url):
+            response = client.get(f"/api/v1{url}")
+            response.raise_for_status()
+            return response.json()
+
+        return {
+            "GET /recommendations/property/{id}": measure(
+                lambda i: get(f"/recommendations/property/{property_ids[i % len(property_ids)]}"), repeats),
+            "GET /recommendations/client/{id}": measure(
+                lambda i: get(f"/recommendations/client/{client_ids[i % len(client_ids)]}"), repeats),
+            "GET /recommendations/explain/{pid}/{cid}": measure(
+                lambda i: get(f"/recommendations/explain/{property_ids[i % len(property_ids)]}/{client_ids[i]}"), repeats),
+            "GET /recommendations/properties/": measure(
+                lambda i: get("/recommendations/properties/"), min(repeats, BULK_REPEATS)),
+        }
+
+
+def bench_training():
+    with tempfile.TemporaryDirectory() as tmp:
+        model_out, columns_out = os.path.join(tmp, "model.pkl"), os.path.join(tmp, "columns.pkl")
+        start = time.perf_counter()
+        train_model(DATASET_PATH, model_out, columns_out)
+        elapsed = (time.perf_counter() - start) * 1000
+    return {"train_model": {"repeats": 1, "min_ms": round(elapsed, 3), "median_ms": round(elapsed, 3),
+                            "p95_ms": round(elapsed, 3), "max_ms": round(elapsed, 3)}}
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run(datasets, repeats=DEFAULT_REPEATS, skip_training=False):
+    houses = load_houses()
+    results = {}
+    for name in datasets:
+        contacts = load_contacts(DATASETS[name])
+        print(f"⏱  {name}: {len(contacts):,} buyers x {len(houses)} properties")
+        results[name] = {**bench_pipeline(contacts, houses, repeats), **bench_http(contacts, houses, repeats)}
+        for case, stats in results[name].items():
+            print(f"   {case:<42} median {stats['median_ms']:10.2f} ms   p95 {stats['p95_ms']:10.2f} ms")
+    if not skip_training:
+        print("⏱  training on balanced_contacts_20k")
+        results["training"] = bench_training()
+        print(f"   {'train_model':<42} {results['training']['train_model']['median_ms']:17.2f} ms")
+    return {"environment": environment(), "results": results}
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """(dataset, case, baseline ms, current ms, ratio, status) for every case in both runs."""
+    rows = []
+    for dataset, cases in current["results"].items():
+        for case, stats in cases.items():
+            before = baseline["results"].get(dataset, {}).get(case)
+            if before is None:
+                continue
+            old, new = before["median_ms"], stats["median_ms"]
+            ratio = new / old if old else float("inf")
+            if ratio > 1 + threshold and new - old > NOISE_FLOOR_MS:
+                status = "regression"
+            elif ratio < 1 - threshold and old - new > NOISE_FLOOR_MS:
+                status = "improvement"
+            else:
+                status = "ok"
+            rows.append((dataset, case, old, new, ratio, status))
+    return rows
+
+
+def print_comparison(rows, threshold):
+    marks = {"regression": "❌", "improvement": "🚀", "ok": "  "}
+    print(f"\n📊 Median latency against the baseline (threshold {threshold:.0%}):")
+    for dataset, case, old, new, ratio, status in rows:
+        print(f" {marks[status]} {dataset:<24} {case:<42} {old:10.2f} -> {new:10.2f} ms ({ratio:5.2f}x)")
+    regressions = sum(1 for row in rows if row[5] == "regression")
+    print(f"\n{'❌' if regressions else '✅'} {regressions} regression(s) in {len(rows)} compared cases")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--datasets", nargs="+", choices=list(DATASETS), default=list(DATASETS))
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--skip-training", action="store_true", help="do not time train_model")
+    parser.add_argument("--output", help="also write this run's results to a JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help=f"write the results to {BASELINE_PATH}")
+    parser.add_argument("--compare", nargs="?", const=BASELINE_PATH, metavar="BASELINE",
+                        help="compare against a baseline JSON (default: the saved baseline)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slow-down of the median reported as a regression")
+    args = parser.parse_args(argv)
+
+    current = run(args.datasets, args.repeats, args.skip_training)
+    for path in filter(None, (args.output, BASELINE_PATH if args.save_baseline else None)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+            f.write("\n")
+        print(f"💾 Results written to {path}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if print_comparison(compare(baseline, current, args.threshold), args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+"""
+Create the listing indexes declared on the models that an existing database is missing.
+
+    python -m app.scripts.create_indexes
+
+create_tables.py drops and recreates everything; this only adds indexes (CREATE INDEX,
+skipping those that already exist) and drops the ones no longer declared, so it is safe
+on a populated database.
+"""
+from sqlalchemy import text
+
+from app.core.database import engine
+from app.models.client import Client
+from app.models.property import Property
+
+# Earlier partial indexes on id, which only duplicated the primary key
+DROPPED_INDEXES = ("ix_clients_active_id", "ix_properties_active_id")
+
+
+def main():
+    with engine.begin() as connection:
+        for name in DROPPED_INDEXES:
+            connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            print(f"🗑 {name}")
+    for model in (Client, Property):
+        for index in sorted(model.__table__.indexes, key=lambda i: i.name):
+            index.create(bind=engine, checkfirst=True)
+            print(f"✅ {index.name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 from app.core.database import Base, engine
 from app.models.client import Client
 from app.models.property import Property
+from app.models.match_score import MatchScore
+from app.models.bulk_job import BulkJob
 
 if __name__ == "__main__":
     # Drop all tables
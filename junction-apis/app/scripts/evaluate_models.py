@@ -0,0 +1,122 @@
+"""
+Evaluation report for the match model variants.
+
+    python -m app.scripts.evaluate_models [--variants random_forest,logistic_regression] [--save] [--json report.json]
+
+Every variant is trained on the same 80/20 split of balanced_contacts_20k.csv that train_model
+uses. The report puts held-out AUC and accuracy next to the artifact size, joblib load time and
+p50/p99 predict latency at batch sizes 1, 200 and 20k. Latency is measured on the scorer the API
+would serve (see serving_scorer). With --save the artifacts are written where the API looks for
+them (match_predictor_<variant>.pkl), so MATCH_MODEL_VARIANT can switch to them without retraining.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import joblib
+import numpy as np
+from sklearn.metrics import accuracy_score, roc_auc_score
+
+from app.services.modules.model_utils import (
+    COLUMNS_PATH, DATASET_PATH, MODEL_VARIANTS, FeatureEncoder, build_model, encoder_path_for,
+    model_path_for, serving_scorer, split_training_matrix, training_matrix
+)
+
+BATCH_SIZES = (1, 200, 20000)
+REPEATS = {1: 200, 200: 50, 20000: 5}
+
+
+def percentiles_ms(fn, repeats):
+    fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(float(np.percentile(timings, 50)), 3), round(float(np.percentile(timings, 99)), 3)
+
+
+def evaluate_variant(variant, X_matrix, split, model_path):
+    X_train, X_test, y_train, y_test = split
+    model = build_model(variant)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - start
+
+    proba = model.predict_proba(X_test)[:, 1]
+    joblib.dump(model, model_path)
+
+    load_times = []
+    for _ in range(3):
+        start = time.perf_counter()
+        loaded = joblib.load(model_path)
+        load_times.append(time.perf_counter() - start)
+    scorer = serving_scorer(loaded)
+
+    latency = {}
+    for batch in BATCH_SIZES:
+        X = np.resize(X_matrix, (batch, X_matrix.shape[1]))
+        p50, p99 = percentiles_ms(lambda: scorer.predict_proba(X), REPEATS[batch])
+        latency[str(batch)] = {"p50_ms": p50, "p99_ms": p99}
+
+    return {
+        "variant": variant,
+        "auc": round(float(roc_auc_score(y_test, proba)), 4),
+        "accuracy": round(float(accuracy_score(y_test, (proba >= 0.5).astype(int))), 4),
+        "fit_s": round(fit_s, 2),
+        "size_mb": round(os.path.getsize(model_path) / 1e6, 2),
+        "load_s": round(float(np.median(load_times)), 3),
+        "scorer": type(scorer).__name__,
+        "latency": latency,
+    }
+
+
+def print_report(results):
+    header = f"{'variant':<24} {'AUC':>6} {'acc':>6} {'size MB':>8} {'load s':>7}"
+    for batch in BATCH_SIZES:
+        header += f" | {f'b={batch} p50/p99 ms':>20}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        line = f"{r['variant']:<24} {r['auc']:>6.4f} {r['accuracy']:>6.4f} {r['size_mb']:>8.2f} {r['load_s']:>7.3f}"
+        for batch in BATCH_SIZES:
+            lat = r["latency"][str(batch)]
+            line += f" | {lat['p50_ms']:>9.2f} /{lat['p99_ms']:>9.2f}"
+        print(line)
+
+
+def main(variants=MODEL_VARIANTS, save=False, json_path=None, dataset_path=DATASET_PATH):
+    columns, X_matrix, y = training_matrix(dataset_path, verbose=False)
+    split = split_training_matrix(X_matrix, y)
+    print(f"📊 {len(X_matrix)} rows, {len(columns)} features, {len(split[1])} held out")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for variant in variants:
+            model_path = model_path_for(variant) if save else os.path.join(tmp, f"{variant}.pkl")
+            print(f"⏳ Training and timing {variant}...")
+            results.append(evaluate_variant(variant, X_matrix, split, model_path))
+
+    if save:
+        joblib.dump(columns, COLUMNS_PATH)
+        joblib.dump(FeatureEncoder.from_columns(columns), encoder_path_for(COLUMNS_PATH))
+        print(f"💾 Saved artifacts next to {COLUMNS_PATH}")
+
+    print()
+    print_report(results)
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n📝 Report written to {json_path}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variants", default=",".join(MODEL_VARIANTS))
+    parser.add_argument("--save", action="store_true", help="write the artifacts where the API loads them from")
+    parser.add_argument("--json", dest="json_path")
+    args = parser.parse_args()
+    main(args.variants.split(","), args.save, args.json_path)
@@ -1,68 +1,31 @@
-import csv
-from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
-from app.models.client import Client
-
-CSV_PATH = "./app/services/data/Synthetic_Contacts__2000_Buyers_.csv"
-
-def parse_bool(val):
-    return str(val).lower() in ("true", "1", "yes")
-
-def parse_float(val):
-    return float(val) if val not in ("", None) else None
+"""
+Bulk import (upsert on client_id) of a contacts CSV into the clients table.
 
-def parse_int(val):
-    return int(val) if val not in ("", None) else None
+    python -m app.scripts.import_contacts [csv_path] [--batch-size 1000] [--dry-run]
 
-def main():
-    db: Session = SessionLocal()
-    existing_clients = set(row[0] for row in db.query(Client.client_id).all())
+Rows are validated column by column before anything is written; rejected rows are listed
+with their CSV line number. Existing clients are updated in place (and reactivated).
+"""
+import argparse
 
-    print(f"📦 Existing clients in DB: {len(existing_clients)}")
-
-    added_count = 0
-
-    with open(CSV_PATH, newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for i, row in enumerate(reader, start=1):
-            client_id = str(row["client_id"])
-            if client_id in existing_clients:
-                continue
+from app.core.database import SessionLocal
+from app.services.modules.bulk_import import CLIENT_IMPORT, IMPORT_BATCH_ROWS, import_csv, print_report
 
-            try:
-                client = Client(
-                    client_id=client_id,
-                    preferred_location=row.get("preferred_location"),
-                    min_budget_DZD=parse_float(row.get("min_budget_DZD")),
-                    max_budget_DZD=parse_float(row.get("max_budget_DZD")),
-                    min_area=parse_int(row.get("min_area")),
-                    max_area=parse_int(row.get("max_area")),
-                    preferred_property_type=row.get("preferred_property_type"),
-                    marital_status=row.get("marital_status"),
-                    has_kids=parse_bool(row.get("has_kids")),
-                    weight_location=parse_float(row.get("weight_location")),
-                    weight_property_type=parse_float(row.get("weight_property_type")),
-                    preferred_rooms=parse_int(row.get("preferred_rooms")),
-                    weight_rooms=parse_float(row.get("weight_rooms")),
-                    preferred_schools_nearby=parse_int(row.get("preferred_schools_nearby")),
-                    weight_schools_nearby=parse_float(row.get("weight_schools_nearby")),
-                    preferred_hospitals_nearby=parse_int(row.get("preferred_hospitals_nearby")),
-                    weight_hospitals_nearby=parse_float(row.get("weight_hospitals_nearby")),
-                    preferred_parks_nearby=parse_int(row.get("preferred_parks_nearby")),
-                    weight_parks_nearby=parse_float(row.get("weight_parks_nearby")),
-                    preferred_public_transport_score=parse_int(row.get("preferred_public_transport_score")),
-                    weight_public_transport_score=parse_float(row.get("weight_public_transport_score"))
-                )
-                db.add(client)
-                db.commit()
-                added_count += 1
-                print(f"✅ Added client {client_id} ({added_count} total)")
-            except Exception as e:
-                db.rollback()
-                print(f"❌ Error adding client {client_id} at row {i}: {e}")
+CSV_PATH = "./app/services/data/Synthetic_Contacts__2000_Buyers_.csv"
 
-    db.close()
-    print(f"✅ Done. Total clients added: {added_count}")
+def main(csv_path=CSV_PATH, batch_size=IMPORT_BATCH_ROWS, dry_run=False):
+    db = SessionLocal()
+    try:
+        report = import_csv(db, csv_path, CLIENT_IMPORT, batch_size=batch_size, dry_run=dry_run)
+    finally:
+        db.close()
+    print_report(report, "Clients")
+    return report
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv_path", nargs="?", default=CSV_PATH)
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_ROWS)
+    parser.add_argument("--dry-run", action="store_true", help="validate and count, write nothing")
+    args = parser.parse_args()
+    main(args.csv_path, args.batch_size, args.dry_run)
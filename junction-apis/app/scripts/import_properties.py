@@ -1,66 +1,33 @@
+"""
+Bulk import (upsert on property_id) of a properties CSV into the properties table.
+
+    python -m app.scripts.import_properties [csv_path] [--batch-size 1000] [--dry-run]
+
+Rows are validated column by column before anything is written; rejected rows are listed
+with their CSV line number. Existing properties are updated in place (and reactivated).
+Run app.scripts.rebuild_match_scores afterwards to refresh the stored scores.
+"""
+import argparse
 
-import csv
-from sqlalchemy.orm import Session
 from app.core.database import SessionLocal
-from app.models.property import Property
-import time
+from app.services.modules.bulk_import import IMPORT_BATCH_ROWS, PROPERTY_IMPORT, import_csv, print_report
 
 CSV_PATH = "./app/services/data/synthetic_houses_200.csv" 
 
-def parse_optional_int(val):
-    try:
-        return int(val)
-    except (ValueError, TypeError):
-        return None
-
-def main():
+def main(csv_path=CSV_PATH, batch_size=IMPORT_BATCH_ROWS, dry_run=False):
     print("🏘️ Starting property import...")
-    db: Session = SessionLocal()
-    existing_properties = set(row[0] for row in db.query(Property.property_id).all())
-    print(f"🔍 Found {len(existing_properties)} existing properties in DB.")
-
-    added_count = 0
-    skipped_count = 0
-    start_time = time.time()
-
-    with open(CSV_PATH, newline='', encoding='utf-8-sig') as csvfile:
-        reader = csv.DictReader(csvfile)
-    
-        print("CSV columns:", reader.fieldnames)
-        for i, row in enumerate(reader, start=1):
-            print(f"Processing row {i}: {row}")  # Add this line
-            property_id = str(row['property_id'])
-            try:
-                prop = Property(
-                    property_id=property_id,
-                    location=row["location"],
-                    price_DZD=float(row["price_DZD"]),
-                    area=int(row["area"]),
-                    property_type=row["property_type"],
-                    rooms=int(row["rooms"]),
-                    schools_nearby=parse_optional_int(row["schools_nearby"]),
-                    hospitals_nearby=parse_optional_int(row["hospitals_nearby"]),
-                    parks_nearby=parse_optional_int(row["parks_nearby"]),
-                    public_transport_score=parse_optional_int(row["public_transport_score"])
-                )
-                db.add(prop)
-                db.commit()
-                added_count += 1
-
-                if added_count % 50 == 0:
-                    print(f"✅ Inserted {added_count} properties...")
-
-            except Exception as e:
-                db.rollback()
-                print(f"❌ Error at row {i} (property_id={property_id}): {e}")
-
-    db.close()
-    duration = time.time() - start_time
-
-    print("\n✅ Property import complete")
-    print(f"🧾 Total added: {added_count}")
-    print(f"⏩ Skipped existing: {skipped_count}")
-    print(f"⏱ Duration: {duration:.2f} seconds")
+    db = SessionLocal()
+    try:
+        report = import_csv(db, csv_path, PROPERTY_IMPORT, batch_size=batch_size, dry_run=dry_run)
+    finally:
+        db.close()
+    print_report(report, "Properties")
+    return report
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv_path", nargs="?", default=CSV_PATH)
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_ROWS)
+    parser.add_argument("--dry-run", action="store_true", help="validate and count, write nothing")
+    args = parser.parse_args()
+    main(args.csv_path, args.batch_size, args.dry_run)
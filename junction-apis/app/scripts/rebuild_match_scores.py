@@ -0,0 +1,34 @@
+"""
+Populate the match_scores table with the batched scorer.
+
+    python -m app.scripts.rebuild_match_scores [property_id ...]
+
+Without arguments every active property is rescored against every active client and the
+table is replaced with each property's and each client's top STORED_TOP_K; with property ids
+only those properties are rescored. Property.match is refreshed too.
+"""
+import sys
+
+from app.core.database import SessionLocal
+from app.services.modules.client_store import client_store
+from app.services.modules.match_scores import ensure_table, rebuild_match_scores
+from app.services.modules.model_utils import get_model_registry
+
+
+def main(property_ids=None):
+    registry = get_model_registry()
+    db = SessionLocal()
+    try:
+        ensure_table(db.get_bind())
+        snapshot = client_store.rebuild(db)
+        client_store.flush()
+        print(f"🔄 Scoring against {len(snapshot)} active clients with the {registry.variant} model...")
+        stats = rebuild_match_scores(db, registry, snapshot, property_ids)
+    finally:
+        db.close()
+    print(f"✅ Stored {stats['rows']:,} scores for {stats['properties']} properties in {stats['seconds']:.2f} s")
+    return stats
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or None)
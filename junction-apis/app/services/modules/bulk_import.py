@@ -0,0 +1,235 @@
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.models.client import Client
+from app.models.property import Property
+
+IMPORT_BATCH_ROWS = 1000
+TRUE_VALUES = {"true", "1", "yes"}
+FALSE_VALUES = {"false", "0", "no", ""}
+
+
+@dataclass
+class ImportSpec:
+    """How one CSV maps onto a table: the upsert key and the type of every imported column."""
+    model: type
+    key: str
+    required: tuple
+    integers: tuple = ()
+    floats: tuple = ()
+    booleans: tuple = ()
+    strings: tuple = ()
+    ranges: tuple = ()  # (low column, high column) pairs that must satisfy low <= high
+
+    @property
+    def columns(self):
+        return (self.key,) + self.strings + self.integers + self.floats + self.booleans
+
+
+CLIENT_IMPORT = ImportSpec(
+    model=Client,
+    key="client_id",
+    required=(
+        "preferred_location", "min_budget_DZD", "max_budget_DZD", "min_area", "max_area",
+        "preferred_property_type", "marital_status"
+    ),
+    strings=("preferred_location", "preferred_property_type", "marital_status"),
+    integers=(
+        "min_area", "max_area", "preferred_rooms", "preferred_schools_nearby", "preferred_hospitals_nearby",
+        "preferred_parks_nearby", "preferred_public_transport_score"
+    ),
+    floats=(
+        "min_budget_DZD", "max_budget_DZD", "weight_location", "weight_property_type", "weight_rooms",
+        "weight_schools_nearby", "weight_hospitals_nearby", "weight_parks_nearby", "weight_public_transport_score"
+    ),
+    booleans=("has_kids",),
+    ranges=(("min_budget_DZD", "max_budget_DZD"), ("min_area", "max_area")),
+)
+
+PROPERTY_IMPORT = ImportSpec(
+    model=Property,
+    key="property_id",
+    required=("location", "price_DZD", "area", "property_type", "rooms"),
+    strings=("location", "property_type"),
+    integers=("area", "rooms", "schools_nearby", "hospitals_nearby", "parks_nearby", "public_transport_score"),
+    floats=("price_DZD",),
+)
+
+
+@dataclass
+class ImportReport:
+    rows_read: int = 0
+    valid: int = 0
+    inserted: int = 0
+    updated: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    dry_run: bool = False
+    errors: list = field(default_factory=list)  # {"row": CSV line number, "key", "batch", "error"}
+
+    @property
+    def rows_per_second(self):
+        return round(self.rows_read / self.seconds, 1) if self.seconds else None
+
+    def as_dict(self):
+        return {
+            "rows_read": self.rows_read,
+            "valid": self.valid,
+            "invalid": len(self.errors),
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "batches": self.batches,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": self.rows_per_second,
+            "dry_run": self.dry_run,
+            "errors": self.errors,
+        }
+
+
+def validate_frame(df, spec):
+    """
+    Column-wise type conversion and checks of a CSV read as strings. Returns the clean
+    records (dicts ready for an executemany), their CSV line numbers (header = line 1)
+    and one error per rejected row.
+    """
+    df = df.rename(columns=lambda c: c.strip().lstrip("﻿"))
+    n_rows = len(df)
+    problems = [[] for _ in range(n_rows)]
+
+    def flag(mask, message):
+        for i in np.flatnonzero(mask):
+            problems[i].append(message)
+
+    missing_columns = [c for c in (spec.key,) + spec.required if c not in df.columns]
+    if missing_columns:
+        raise ValueError(f"CSV is missing required column(s): {', '.join(missing_columns)}")
+
+    out = {}
+    # Optional columns absent from the file are left out, so upserts keep their stored values
+    for column in [c for c in spec.columns if c in df.columns]:
+        raw = df[column].str.strip()
+        empty = raw.eq("").to_numpy()
+        if column in spec.required or column == spec.key:
+            flag(empty, f"{column} is required")
+
+        if column in spec.integers or column in spec.floats:
+            numbers = pd.to_numeric(raw.where(~empty), errors="coerce")
+            flag(~empty & numbers.isna().to_numpy(), f"{column} is not a number")
+            if column in spec.integers:
+                integral = (numbers % 1 == 0).to_numpy()
+                flag(~integral & numbers.notna().to_numpy(), f"{column} is not an integer")
+                out[column] = numbers.where(integral).astype("Int64")
+            else:
+                out[column] = numbers.astype("Float64")
+        elif column in spec.booleans:
+            lowered = raw.str.lower()
+            flag(~lowered.isin(TRUE_VALUES | FALSE_VALUES).to_numpy(), f"{column} is not a boolean")
+            out[column] = lowered.isin(TRUE_VALUES)
+        else:
+            out[column] = raw.where(~empty)
+
+    for low, high in spec.ranges:
+        flag((out[low] > out[high]).fillna(False).to_numpy(dtype=bool), f"{low} is greater than {high}")
+
+    # A key repeated in the file: the last occurrence wins, like successive upserts would
+    duplicated = out[spec.key].duplicated(keep="last").to_numpy() & out[spec.key].notna().to_numpy()
+    flag(duplicated, f"duplicate {spec.key} (a later row replaces it)")
+
+    frame = pd.DataFrame(out)
+    valid = np.array([not p for p in problems], dtype=bool)
+    errors = [
+        {"row": i + 2, "key": df[spec.key].iloc[i], "batch": None, "error": "; ".join(p)}
+        for i, p in enumerate(problems) if p
+    ]
+    clean = frame[valid].astype(object).where(frame[valid].notna(), None)
+    return clean.to_dict("records"), (np.flatnonzero(valid) + 2).tolist(), errors
+
+
+def upsert_statement(spec, dialect_name, columns):
+    """INSERT ... ON CONFLICT (key) DO UPDATE of columns, for PostgreSQL and SQLite."""
+    insert = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}.get(dialect_name)
+    if insert is None:
+        raise ValueError(f"Bulk upserts are not supported on {dialect_name}")
+    table = spec.model.__table__
+    stmt = insert(table)
+    updates = {c: stmt.excluded[c] for c in columns if c != spec.key}
+    updates.update(updated_at=func.now(), is_active=True)
+    return stmt.on_conflict_do_update(index_elements=[table.c[spec.key]], set_=updates)
+
+
+def import_csv(db, csv_path, spec, batch_size=IMPORT_BATCH_ROWS, dry_run=False, verbose=True):
+    """
+    Validate a whole CSV column by column, then upsert the valid rows in batches of
+    batch_size with one executemany each, one transaction per batch. A batch that fails
+    is retried row by row so only its bad rows are rejected. With dry_run nothing is
+    written; the report still tells which rows would be inserted or updated.
+    """
+    start = time.perf_counter()
+    report = ImportReport(dry_run=dry_run)
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    records, lines, report.errors = validate_frame(df, spec)
+    report.rows_read, report.valid = len(df), len(records)
+
+    table = spec.model.__table__
+    key_column = table.c[spec.key]
+    stmt = upsert_statement(spec, db.get_bind().dialect.name, list(records[0]) if records else [spec.key])
+
+    for batch_no, offset in enumerate(range(0, len(records), batch_size), 1):
+        batch = records[offset:offset + batch_size]
+        batch_lines = lines[offset:offset + batch_size]
+        keys = [r[spec.key] for r in batch]
+        existing = {k for (k,) in db.query(key_column).filter(key_column.in_(keys))}
+        if dry_run:
+            written = batch
+        else:
+            written = _write_batch(db, stmt, batch, batch_lines, spec, batch_no, report.errors)
+        report.batches += 1
+        report.updated += sum(1 for r in written if r[spec.key] in existing)
+        report.inserted += sum(1 for r in written if r[spec.key] not in existing)
+        if verbose:
+            elapsed = time.perf_counter() - start
+            print(f"✅ Batch {batch_no}: {offset + len(batch)}/{len(records)} rows "
+                  f"({(offset + len(batch)) / elapsed:,.0f} rows/s)")
+
+    report.seconds = time.perf_counter() - start
+    report.errors.sort(key=lambda e: e["row"])
+    return report
+
+
+def _write_batch(db, stmt, batch, lines, spec, batch_no, errors):
+    try:
+        db.execute(stmt, batch)
+        db.commit()
+        return batch
+    except Exception:
+        db.rollback()
+
+    written = []
+    for record, line in zip(batch, lines):
+        try:
+            db.execute(stmt, [record])
+            db.commit()
+            written.append(record)
+        except Exception as e:
+            db.rollback()
+            errors.append({"row": line, "key": record[spec.key], "batch": batch_no, "error": str(e.__cause__ or e).splitlines()[0]})
+    return written
+
+
+def print_report(report, label):
+    summary = report.as_dict()
+    mode = " (dry run, nothing written)" if report.dry_run else ""
+    print(f"\n📦 {label} import{mode}: {summary['rows_read']} rows read, {summary['valid']} valid, "
+          f"{summary['invalid']} rejected")
+    print(f"   ➕ {summary['inserted']} inserted, 🔁 {summary['updated']} updated in {summary['batches']} batches")
+    print(f"   ⏱ {summary['seconds']:.2f} s ({summary['rows_per_second']} rows/s)")
+    for error in report.errors[:20]:
+        where = f"row {error['row']}" + (f", batch {error['batch']}" if error["batch"] else "")
+        print(f"   ❌ {where} ({error['key']}): {error['error']}")
+    if len(report.errors) > 20:
+        print(f"   ... {len(report.errors) - 20} more rejected rows")
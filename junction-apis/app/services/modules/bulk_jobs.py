@@ -0,0 +1,207 @@
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+from sqlalchemy import and_, or_
+
+from app.core.config import settings
+from app.models.bulk_job import BulkJob
+from app.models.property import Property
+from app.services.modules.client_store import client_store
+from app.services.modules.match_scores import house_record
+from app.services.modules.model_utils import get_model_registry, scoring_slots
+from app.services.modules.recommendation import iter_bulk_ndjson
+from app.services.modules.scoring_pool import scoring_pool
+
+# Properties scored between two progress (and heartbeat) commits
+PROGRESS_EVERY = 10
+
+_table_checked = False
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def ensure_table(db):
+    global _table_checked
+    if not _table_checked:
+        BulkJob.__table__.create(bind=db.get_bind(), checkfirst=True)
+        _table_checked = True
+
+
+def create_job(db, top_n=10, explain=False, strict=False):
+    """Queue a bulk run over every property and wake the local worker."""
+    ensure_table(db)
+    job = BulkJob(
+        job_id=uuid.uuid4().hex, status="pending", top_n=top_n, explain=explain, strict=strict, done=0, attempts=0
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    bulk_job_worker.notify()
+    return job
+
+
+def get_job(db, job_id):
+    ensure_table(db)
+    return db.query(BulkJob).filter(BulkJob.job_id == job_id).first()
+
+
+class LostClaim(Exception):
+    """Another worker re-claimed the job (this one stopped heartbeating in time)."""
+
+
+class BulkJobWorker:
+    """
+    In-process worker for bulk recommendation jobs: no broker, the bulk_jobs table is the
+    queue. Each API process runs one worker thread; a job is claimed with a compare-and-set
+    on (status, attempts), so when several processes share the database every job still
+    runs once. A running job whose heartbeat is older than stale_seconds (its process died)
+    is claimed again from scratch.
+
+    Results are written as NDJSON (one line per property, then a summary line, exactly
+    like GET /recommendations/properties/?stream=true) under result_dir.
+    """
+
+    def __init__(self, result_dir=settings.BULK_JOB_DIR, poll_seconds=settings.BULK_JOB_POLL_SECONDS,
+                 stale_seconds=settings.BULK_JOB_STALE_SECONDS):
+        self.result_dir = result_dir
+        self.poll_seconds = poll_seconds
+        self.stale_seconds = stale_seconds
+        self.session_factory = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, session_factory):
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+        self.session_factory = session_factory
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="bulk-job-worker", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def notify(self):
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                ran = self.run_next()
+            except Exception as e:
+                print(f" ⚠️  Bulk job worker error: {e}")
+                ran = False
+            if not ran:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+    def run_next(self):
+        """Claim and run the oldest runnable job; False when there was none."""
+        db = self.session_factory()
+        try:
+            ensure_table(db)
+            job = self.claim(db)
+            if job is None:
+                return False
+            self.run(db, job)
+            return True
+        finally:
+            db.close()
+
+    def claim(self, db):
+        stale = _now() - timedelta(seconds=self.stale_seconds)
+        candidates = (
+            db.query(BulkJob.job_id, BulkJob.status, BulkJob.attempts)
+            .filter(or_(
+                BulkJob.status == "pending",
+                and_(BulkJob.status == "running", BulkJob.heartbeat_at < stale),
+            ))
+            .order_by(BulkJob.created_at)
+            .limit(5)
+            .all()
+        )
+        for job_id, status, attempts in candidates:
+            now = _now()
+            claimed = (
+                db.query(BulkJob)
+                .filter(BulkJob.job_id == job_id, BulkJob.status == status, BulkJob.attempts == attempts)
+                .update({
+                    "status": "running", "attempts": attempts + 1, "done": 0, "error": None,
+                    "started_at": now, "heartbeat_at": now,
+                }, synchronize_session=False)
+            )
+            db.commit()
+            if claimed:
+                job = db.query(BulkJob).filter(BulkJob.job_id == job_id).one()
+                # Detached, so job.attempts stays the claim this worker holds instead of
+                # reloading after every commit (whatever another worker wrote)
+                db.expunge(job)
+                return job
+        return None
+
+    def _update(self, db, job, **values):
+        """Write job state, but only while this worker still holds the claim."""
+        updated = (
+            db.query(BulkJob)
+            .filter(BulkJob.job_id == job.job_id, BulkJob.attempts == job.attempts)
+            .update(dict(values, heartbeat_at=_now()), synchronize_session=False)
+        )
+        db.commit()
+        if not updated:
+            raise LostClaim(job.job_id)
+
+    def run(self, db, job):
+        path = os.path.join(self.result_dir, f"{job.job_id}.ndjson")
+        # One file per claim: a stale run that is still writing never touches the new one's
+        tmp_path = f"{path}.{job.attempts}.tmp"
+        try:
+            registry = get_model_registry()
+            snapshot = client_store.current(db)
+            houses = [house_record(p) for p in db.query(Property).filter(Property.is_active == True).all()]
+            self._update(db, job, total=len(houses))
+
+            os.makedirs(self.result_dir, exist_ok=True)
+            with open(tmp_path, "wb") as out, scoring_slots, \
+                    scoring_pool.session(snapshot, registry.encoder) as pool:
+                lines = iter_bulk_ndjson(
+                    houses, snapshot.to_frame(), registry.scorer, registry.encoder,
+                    top_n=job.top_n, show_explanations=job.explain, buyer_index=snapshot.buyer_index,
+                    strict=job.strict, pool=pool
+                )
+                # One line per property, then the summary line
+                for done, line in enumerate(islice(lines, len(houses)), 1):
+                    out.write(line)
+                    if done % PROGRESS_EVERY == 0:
+                        self._update(db, job, done=done)
+                out.writelines(lines)
+            # Publish only while the claim is still ours
+            self._update(db, job)
+            os.replace(tmp_path, path)
+            self._update(db, job, status="succeeded", done=len(houses), result_path=path, finished_at=_now())
+        except LostClaim:
+            db.rollback()
+            print(f" ⚠️  Bulk job {job.job_id} was re-claimed by another worker; dropping this run")
+        except Exception as e:
+            db.rollback()
+            print(f" ⚠️  Bulk job {job.job_id} failed: {e}")
+            try:
+                self._update(db, job, status="failed", error=str(e), finished_at=_now())
+            except LostClaim:
+                pass
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+bulk_job_worker = BulkJobWorker()
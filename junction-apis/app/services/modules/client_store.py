@@ -0,0 +1,448 @@
+import os
+import threading
+from datetime import timezone
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from fastapi import Depends
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.models.client import Client
+from app.services.modules.candidate_index import BuyerIndex
+from app.services.modules.timing import span
+
+# Every client attribute the recommendation pipeline reads
+CLIENT_FIELDS = [
+    "client_id", "preferred_location", "min_budget_DZD", "max_budget_DZD",
+    "min_area", "max_area", "preferred_property_type", "marital_status", "has_kids",
+    "weight_location", "weight_property_type", "preferred_rooms", "weight_rooms",
+    "preferred_schools_nearby", "weight_schools_nearby", "preferred_hospitals_nearby", "weight_hospitals_nearby",
+    "preferred_parks_nearby", "weight_parks_nearby", "preferred_public_transport_score", "weight_public_transport_score"
+]
+CATEGORICAL_CLIENT_FIELDS = ["preferred_location", "preferred_property_type", "marital_status"]
+NUMERIC_CLIENT_FIELDS = [
+    f for f in CLIENT_FIELDS if f not in CATEGORICAL_CLIENT_FIELDS and f not in ("client_id", "has_kids")
+]
+INTEGER_CLIENT_FIELDS = [
+    "min_area", "max_area", "preferred_rooms", "preferred_schools_nearby", "preferred_hospitals_nearby",
+    "preferred_parks_nearby", "preferred_public_transport_score"
+]
+# Columns a layered snapshot merges on first access (see ClientSnapshot._materialize)
+MERGED_ATTRIBUTES = ("client_ids", "numeric", "has_kids", "codes", "categories", "index")
+# Written records + tombstones a layered snapshot carries before the next write merges them
+COMPACT_ROWS = 1024
+
+
+class ClientSnapshot:
+    """
+    Immutable columnar view of the active clients: one NumPy array per field, integer
+    codes + category list for the categorical fields and a client_id -> row index.
+    Writers build a new snapshot and swap it in; readers keep whichever one they grabbed.
+
+    Writes don't copy the columns: with_records/without return a layered snapshot that
+    shares a base snapshot's arrays, tombstones the base rows it replaces or deletes and
+    keeps the written records as a small delta. The merged columns are assembled on first
+    access (record() and len() don't need them), and the next write builds on top of them.
+    """
+
+    def __init__(self, client_ids, numeric, has_kids, codes, categories, version=0, watermark=None):
+        self.client_ids = client_ids    # object array of client_id strings
+        self.numeric = numeric          # field -> int64 or float64 array (NaN for missing values)
+        self.has_kids = has_kids        # bool array
+        self.codes = codes              # field -> int32 codes into categories[field] (-1 for missing)
+        self.categories = categories    # field -> object array of category values
+        self.version = version
+        self.watermark = watermark      # latest created_at/updated_at seen, for incremental catch-up
+        self.index = {client_id: row for row, client_id in enumerate(client_ids)}
+        # (base snapshot, tombstoned base rows, client_id -> written record); swapped as one
+        self._layers = (self, frozenset(), {})
+        self._buyer_index = None
+
+    @classmethod
+    def _layered(cls, base, dead, delta, version, watermark):
+        snapshot = cls.__new__(cls)
+        snapshot.version = version
+        snapshot.watermark = watermark
+        snapshot._layers = (base, dead, delta)
+        snapshot._buyer_index = None
+        return snapshot
+
+    def __getattr__(self, name):
+        # Only reached for the merged columns of a layered snapshot that nobody has read yet
+        if name in MERGED_ATTRIBUTES:
+            self._materialize()
+            return self.__dict__[name]
+        raise AttributeError(name)
+
+    def _materialize(self):
+        """Merge the base columns (minus tombstones) with the delta into this snapshot's own arrays."""
+        base, dead, delta = self._layers
+        if base is self:
+            return
+        keep = np.ones(len(base), dtype=bool)
+        keep[list(dead)] = False
+        incoming = ClientSnapshot.from_frame(pd.DataFrame.from_records(list(delta.values()), columns=CLIENT_FIELDS))
+        codes, categories = {}, {}
+        for field in CATEGORICAL_CLIENT_FIELDS:
+            merged = union_categoricals([
+                pd.Categorical.from_codes(base.codes[field][keep], categories=base.categories[field]),
+                pd.Categorical.from_codes(incoming.codes[field], categories=incoming.categories[field]),
+            ], sort_categories=True)
+            codes[field] = merged.codes.astype(np.int32)
+            categories[field] = np.asarray(merged.categories, dtype=object)
+        client_ids = np.concatenate([base.client_ids[keep], incoming.client_ids])
+        self.__dict__.update(
+            client_ids=client_ids,
+            numeric={
+                f: _integral(np.concatenate([base.numeric[f][keep], incoming.numeric[f]]), f in INTEGER_CLIENT_FIELDS)
+                for f in NUMERIC_CLIENT_FIELDS
+            },
+            has_kids=np.concatenate([base.has_kids[keep], incoming.has_kids]),
+            codes=codes,
+            categories=categories,
+            index={client_id: row for row, client_id in enumerate(client_ids)},
+        )
+        # Drops the references to the base, so superseded arrays can be freed
+        self._layers = (self, frozenset(), {})
+
+    def _write_layers(self):
+        """(base, tombstones, delta) a write builds on; merges first once the delta has grown."""
+        base, dead, delta = self._layers
+        if len(dead) + len(delta) > COMPACT_ROWS:
+            self._materialize()
+            base, dead, delta = self._layers
+        return base, set(dead), dict(delta)
+
+    def __len__(self):
+        base, dead, delta = self._layers
+        if base is self:
+            return len(self.client_ids)
+        return len(base) - len(dead) + len(delta)
+
+    @property
+    def buyer_index(self):
+        """BuyerIndex over this snapshot's rows (same positions as to_frame()), built on first use."""
+        if self._buyer_index is None:
+            self._buyer_index = BuyerIndex(
+                self.numeric["min_budget_DZD"], self.numeric["max_budget_DZD"],
+                self.numeric["min_area"], self.numeric["max_area"],
+            )
+        return self._buyer_index
+
+    @classmethod
+    def empty(cls):
+        return cls.from_frame(pd.DataFrame(columns=CLIENT_FIELDS))
+
+    @classmethod
+    def from_frame(cls, df, version=0, watermark=None):
+        codes, categories = {}, {}
+        for field in CATEGORICAL_CLIENT_FIELDS:
+            categorical = pd.Categorical(df[field])
+            codes[field] = categorical.codes.astype(np.int32)
+            categories[field] = np.asarray(categorical.categories, dtype=object)
+        return cls(
+            client_ids=df["client_id"].astype(str).to_numpy(dtype=object),
+            numeric={f: _numeric_column(df[f], f in INTEGER_CLIENT_FIELDS) for f in NUMERIC_CLIENT_FIELDS},
+            has_kids=df["has_kids"].fillna(False).to_numpy(dtype=bool),
+            codes=codes,
+            categories=categories,
+            version=version,
+            watermark=watermark,
+        )
+
+    def to_frame(self):
+        """DataFrame in the shape predict_matches expects (categoricals stay as pandas categoricals)."""
+        data = {"client_id": self.client_ids}
+        for field in CLIENT_FIELDS[1:]:
+            if field in self.codes:
+                data[field] = pd.Categorical.from_codes(self.codes[field], categories=self.categories[field])
+            elif field == "has_kids":
+                data[field] = self.has_kids
+            else:
+                data[field] = self.numeric[field]
+        return pd.DataFrame(data, columns=CLIENT_FIELDS, copy=False)
+
+    def record(self, client_id):
+        """A single client as a plain dict, or None if it is not in the snapshot."""
+        base, dead, delta = self._layers
+        if base is not self:
+            if client_id in delta:
+                return dict(delta[client_id])
+            return None if base.index.get(client_id) in dead else base.record(client_id)
+        row = self.index.get(client_id)
+        if row is None:
+            return None
+        record = {"client_id": self.client_ids[row], "has_kids": bool(self.has_kids[row])}
+        for field, codes in self.codes.items():
+            record[field] = self.categories[field][codes[row]] if codes[row] >= 0 else None
+        for field, values in self.numeric.items():
+            record[field] = None if np.isnan(values[row]) else values[row].item()
+        return record
+
+    def with_records(self, records, watermark=None):
+        """New snapshot with records (dicts with CLIENT_FIELDS) inserted or replaced."""
+        records = list(records)
+        if not records:
+            return self
+        # Typed like the snapshot columns would hold them
+        incoming = ClientSnapshot.from_frame(pd.DataFrame.from_records(records, columns=CLIENT_FIELDS))
+        base, dead, delta = self._write_layers()
+        for client_id in incoming.client_ids:
+            # Re-inserted at the end, like a replaced row used to be
+            delta.pop(client_id, None)
+            delta[client_id] = incoming.record(client_id)
+            row = base.index.get(client_id)
+            if row is not None:
+                dead.add(row)
+        snapshot = ClientSnapshot._layered(
+            base, frozenset(dead), delta, self.version + 1, _latest(self.watermark, watermark)
+        )
+        if len(dead) + len(delta) > COMPACT_ROWS:
+            snapshot._materialize()
+        return snapshot
+
+    def without(self, client_ids, watermark=None):
+        """New snapshot with the given client_ids removed."""
+        base, dead, delta = self._write_layers()
+        removed = 0
+        for client_id in client_ids:
+            removed += delta.pop(client_id, None) is not None
+            row = base.index.get(client_id)
+            if row is not None and row not in dead:
+                dead.add(row)
+                removed += 1
+        if not removed:
+            return self
+        return ClientSnapshot._layered(
+            base, frozenset(dead), delta, self.version + 1, _latest(self.watermark, watermark)
+        )
+
+    def save(self, path):
+        """Persist as a compact .npz (no pickled objects) so a restarted worker starts warm."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        arrays = {
+            "client_id": self.client_ids.astype(str),
+            "has_kids": self.has_kids,
+            "meta": np.array([str(self.version), self.watermark.isoformat() if self.watermark else ""]),
+        }
+        for field, values in self.numeric.items():
+            arrays[f"num__{field}"] = values
+        for field in self.codes:
+            arrays[f"code__{field}"] = self.codes[field]
+            arrays[f"cat__{field}"] = self.categories[field].astype(str)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            version, watermark = data["meta"]
+            return cls(
+                client_ids=data["client_id"].astype(object),
+                numeric={f: data[f"num__{f}"] for f in NUMERIC_CLIENT_FIELDS},
+                has_kids=data["has_kids"],
+                codes={f: data[f"code__{f}"] for f in CATEGORICAL_CLIENT_FIELDS},
+                categories={f: data[f"cat__{f}"].astype(object) for f in CATEGORICAL_CLIENT_FIELDS},
+                version=int(version),
+                watermark=pd.Timestamp(str(watermark)).to_pydatetime() if watermark else None,
+            )
+
+
+def _numeric_column(values, integer):
+    return _integral(pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64), integer)
+
+
+def _integral(values, integer):
+    # Integer columns stay int64 unless they contain missing values, like pd.read_csv would do
+    if integer and len(values) and not np.isnan(values).any():
+        return values.astype(np.int64, copy=False)
+    return values
+
+
+def _utc(timestamp):
+    # SQLite hands back naive datetimes (stored as UTC); Postgres returns aware ones
+    return timestamp.replace(tzinfo=timezone.utc) if timestamp.tzinfo is None else timestamp
+
+
+def _latest(*timestamps):
+    timestamps = [_utc(t) for t in timestamps if t is not None]
+    return max(timestamps) if timestamps else None
+
+
+def _column_max(values):
+    values = values.dropna()
+    return pd.to_datetime(values, utc=True).max().to_pydatetime() if len(values) else None
+
+
+def client_record(client):
+    """CLIENT_FIELDS dict for a Client ORM object."""
+    return {field: getattr(client, field) for field in CLIENT_FIELDS}
+
+
+class ClientStore:
+    """
+    Process-local warm store of active clients. Built once at startup (from the on-disk
+    snapshot plus an incremental catch-up when possible), then kept current by the
+    clients endpoints; the loading thread catches up with other workers' writes every
+    refresh_seconds. Reads never take a lock: they just use the current snapshot.
+    Writes are persisted off the request path: save_delay seconds after the first unsaved
+    one (a burst is saved once), and by flush() at shutdown.
+    """
+
+    def __init__(self, snapshot_path=settings.CLIENT_SNAPSHOT_PATH, refresh_seconds=settings.CLIENT_STORE_REFRESH_SECONDS,
+                 save_delay=settings.CLIENT_SNAPSHOT_SAVE_DELAY_SECONDS):
+        self.snapshot_path = snapshot_path
+        self.refresh_seconds = refresh_seconds
+        self.save_delay = save_delay
+        self._snapshot = ClientSnapshot.empty()
+        self._write_lock = threading.Lock()
+        self.ready = False
+        self._saved = self._snapshot    # what snapshot_path holds (or the startup snapshot)
+        self._save_lock = threading.Lock()
+        self._timer_lock = threading.Lock()
+        self._save_timer = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def snapshot(self) -> ClientSnapshot:
+        return self._snapshot
+
+    def _swap(self, snapshot):
+        self._snapshot = snapshot
+        if self.snapshot_path:
+            self._schedule_save()
+
+    def _schedule_save(self):
+        with self._timer_lock:
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.save_delay, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def flush(self):
+        """Persist the current snapshot now if it changed since the last save (shutdown, checkpoints)."""
+        with self._timer_lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer is not None:
+            timer.cancel()
+        with self._save_lock:
+            snapshot = self._snapshot
+            if snapshot is self._saved or not self.snapshot_path:
+                return
+            try:
+                snapshot.save(self.snapshot_path)
+                self._saved = snapshot
+            except OSError as e:
+                print(f" ⚠️  Could not persist client snapshot: {e}")
+
+    def rebuild(self, db):
+        """Full scan of the active clients (only the needed columns, no ORM objects)."""
+        columns = [getattr(Client, f) for f in CLIENT_FIELDS]
+        rows = db.query(*columns, Client.created_at, Client.updated_at).filter(Client.is_active == True).all()
+        df = pd.DataFrame.from_records(rows, columns=CLIENT_FIELDS + ["created_at", "updated_at"])
+        watermark = _latest(*(_column_max(df[c]) for c in ("created_at", "updated_at")))
+        with self._write_lock:
+            self._swap(ClientSnapshot.from_frame(df, self._snapshot.version + 1, watermark))
+            self.ready = True
+        return self._snapshot
+
+    def catch_up(self, db):
+        """Apply rows created/updated since the snapshot watermark; rebuild if counts disagree."""
+        snapshot = self._snapshot
+        if snapshot.watermark is None:
+            return self.rebuild(db)
+        # >= so a write in the watermark's own timestamp tick (SQLite keeps whole seconds) is
+        # not missed; rows the snapshot already holds unchanged are skipped below
+        changed = db.query(Client).filter(
+            or_(Client.created_at >= snapshot.watermark, Client.updated_at >= snapshot.watermark)
+        ).all()
+        watermark = _latest(snapshot.watermark, *(c.updated_at or c.created_at for c in changed))
+        # Typed like the snapshot holds them, so unchanged rows compare equal
+        incoming = ClientSnapshot.from_frame(pd.DataFrame.from_records(
+            [client_record(c) for c in changed if c.is_active], columns=CLIENT_FIELDS
+        ))
+        with self._write_lock:
+            current = self._snapshot
+            updated = current.with_records(
+                (record for record in map(incoming.record, incoming.client_ids) if record != current.record(record["client_id"])),
+                watermark
+            ).without((c.client_id for c in changed if not c.is_active), watermark)
+            if updated is not current:
+                self._swap(updated)
+        # Permanent deletes leave no trace in the timestamps; a count mismatch catches them
+        active = db.query(func.count(Client.id)).filter(Client.is_active == True).scalar()
+        if active != len(self._snapshot):
+            return self.rebuild(db)
+        self.ready = True
+        return self._snapshot
+
+    def warm_start(self, db):
+        """Start from the on-disk snapshot when there is one, otherwise scan the table."""
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            try:
+                with self._write_lock:
+                    self._snapshot = self._saved = ClientSnapshot.load(self.snapshot_path)
+                return self.catch_up(db)
+            except Exception as e:
+                print(f" ⚠️  Ignoring unreadable client snapshot {self.snapshot_path}: {e}")
+        return self.rebuild(db)
+
+    def load_in_background(self, session_factory):
+        """Warm start in a thread that then catches up every refresh_seconds until stop()."""
+        def sync(step, failure):
+            db = session_factory()
+            try:
+                step(db)
+            except Exception as e:
+                print(f" ⚠️  Client store failed to {failure}: {e}")
+            finally:
+                db.close()
+
+        def run():
+            sync(self.warm_start, "load")
+            while self.refresh_seconds and not self._stop.wait(self.refresh_seconds):
+                sync(self.catch_up, "catch up")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="client-store-loader", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def upsert(self, client):
+        """Refresh a single client after a create/update (removes it if it became inactive)."""
+        if not client.is_active:
+            return self.remove(client.client_id)
+        with self._write_lock:
+            self._swap(self._snapshot.with_records([client_record(client)], client.updated_at or client.created_at))
+
+    def remove(self, *client_ids):
+        with self._write_lock:
+            snapshot = self._snapshot.without(client_ids)
+            if snapshot is not self._snapshot:
+                self._swap(snapshot)
+
+    def current(self, db):
+        """Snapshot for a request: builds it on first use if the loading thread has not yet."""
+        if not self.ready:
+            self.warm_start(db)
+        return self._snapshot
+
+
+client_store = ClientStore()
+
+
+def get_client_snapshot(db: Session = Depends(get_db)) -> ClientSnapshot:
+    """FastAPI dependency: the current snapshot of active clients."""
+    with span("clients"):
+        return client_store.current(db)
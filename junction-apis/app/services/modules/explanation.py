@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+
+from app.services.modules.model_utils import FeatureEncoder, blend_confidences, distances_km
+from app.services.modules.timing import span
+
+# Explanation buckets. Location: 0 same wilaya, 1 nearby (<= 100 km), 2 moderate (<= 300 km),
+# 3 far, 4 distance unknown. Amenities: 0 none, 1 one nearby, 2 two or more.
+# Transport: 0 poor, 1 fair (>= 4), 2 good (>= 6), 3 excellent (>= 8).
+LOCATION_BANDS = ("match", "nearby", "moderate", "far", "unknown")
+
+AMENITY_LABELS = (
+    ("schools_nearby", "Schools", "school", "schools"),
+    ("hospitals_nearby", "Hospitals", "hospital", "hospitals"),
+    ("parks_nearby", "Parks", "park", "parks"),
+)
+
+TRANSPORT_LABELS = ("Poor", "Fair", "Good", "Excellent")
+
+
+def _pair_values(side, field, n_rows, default=None):
+    """field for every pair: side is a single record (broadcast) or one row per pair"""
+    if isinstance(side, pd.DataFrame):
+        if field not in side:
+            return np.full(n_rows, default, dtype=object)
+        return side[field].to_numpy(dtype=object)
+    return np.full(n_rows, side.get(field, default), dtype=object)
+
+def _as_float(values):
+    return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+
+def explanation_buckets(buyers, houses, distance_km):
+    """
+    Bucket every (buyer, house) pair on the attributes the explanations talk about.
+    buyers and houses are each a single record or a DataFrame with one row per pair
+    (same convention as FeatureEncoder.transform); distance_km has one entry per pair
+    (None / NaN when unknown). Returns the raw values plus one int/bool array per bucket.
+    """
+    distance_km = np.asarray(distance_km, dtype=np.float64).reshape(-1)
+    n_rows = len(distance_km)
+    values = {
+        field: _pair_values(buyers, field, n_rows, default)
+        for field, default in (
+            ("preferred_location", None), ("preferred_property_type", None),
+            ("min_budget_DZD", None), ("max_budget_DZD", None),
+            ("min_area", None), ("max_area", None), ("has_kids", False),
+        )
+    }
+    values.update({
+        field: _pair_values(houses, field, n_rows, default)
+        for field, default in (
+            ("location", None), ("property_type", None), ("price_DZD", None), ("area", None),
+            ("rooms", 0), ("schools_nearby", 0), ("hospitals_nearby", 0), ("parks_nearby", 0),
+            ("public_transport_score", 0),
+        )
+    })
+    values["distance_km"] = distance_km
+
+    numeric = {
+        field: _as_float(values[field])
+        for field in ("min_budget_DZD", "max_budget_DZD", "min_area", "max_area", "price_DZD", "area",
+                      "schools_nearby", "hospitals_nearby", "parks_nearby", "public_transport_score")
+    }
+    buckets = {
+        "location": np.select(
+            [values["preferred_location"] == values["location"], np.isnan(distance_km),
+             distance_km <= 100, distance_km <= 300],
+            [0, 4, 1, 2], default=3
+        ),
+        "budget_fit": (numeric["min_budget_DZD"] <= numeric["price_DZD"]) & (numeric["price_DZD"] <= numeric["max_budget_DZD"]),
+        "area_fit": (numeric["min_area"] <= numeric["area"]) & (numeric["area"] <= numeric["max_area"]),
+        "type_match": values["preferred_property_type"] == values["property_type"],
+        "transport": np.select(
+            [numeric["public_transport_score"] >= 8, numeric["public_transport_score"] >= 6,
+             numeric["public_transport_score"] >= 4],
+            [3, 2, 1], default=0
+        ),
+        "has_kids": values["has_kids"].astype(bool),
+        "kid_amenities": (numeric["schools_nearby"] > 0) | (numeric["parks_nearby"] > 0),
+    }
+    for field, *_ in AMENITY_LABELS:
+        buckets[field] = np.select([numeric[field] >= 2, numeric[field] == 1], [2, 1], default=0)
+    return values, buckets
+
+def explain_matches(buyers, houses, distance_km):
+    """
+    Explanation strings for a batch of pairs (one list per pair), rendered from
+    explanation_buckets. Only call it for the rows that end up in a response.
+    """
+    values, buckets = explanation_buckets(buyers, houses, distance_km)
+    explanations = []
+    for i in range(len(values["distance_km"])):
+        wants, location = values["preferred_location"][i], values["location"][i]
+        band = buckets["location"][i]
+        if band == 0:
+            lines = [f" Location match: {location} (0 km)"]
+        elif band == 4:
+            lines = [f" Location mismatch: wants {wants}, house in {location}"]
+        else:
+            lines = [f" Location {LOCATION_BANDS[band]}: wants {wants}, house in {location} ({values['distance_km'][i]} km away)"]
+
+        price, min_budget, max_budget = values["price_DZD"][i], values["min_budget_DZD"][i], values["max_budget_DZD"][i]
+        lines.append(
+            f" Budget {'fits' if buckets['budget_fit'][i] else 'issue'}: {price:,.0f} DZD "
+            f"{'within' if buckets['budget_fit'][i] else 'outside'} {min_budget:,.0f}-{max_budget:,.0f}"
+        )
+        area, min_area, max_area = values["area"][i], values["min_area"][i], values["max_area"][i]
+        lines.append(
+            f" Area {'fits' if buckets['area_fit'][i] else 'issue'}: {area}m² "
+            f"{'within' if buckets['area_fit'][i] else 'outside'} {min_area}-{max_area}m²"
+        )
+        if buckets["type_match"][i]:
+            lines.append(f" Property type match: {values['property_type'][i]}")
+        else:
+            lines.append(f" Property type: wants {values['preferred_property_type'][i]}, house is {values['property_type'][i]}")
+        lines.append(f" Rooms: {values['rooms'][i]} bedrooms")
+
+        for field, label, singular, plural in AMENITY_LABELS:
+            tier, count = buckets[field][i], values[field][i]
+            if tier == 2:
+                lines.append(f" {label}: {count} {plural} nearby (excellent)")
+            elif tier == 1:
+                lines.append(f" {label}: {count} {singular} nearby (good)")
+            else:
+                lines.append(f" {label}: No {plural} nearby")
+
+        tier = buckets["transport"][i]
+        lines.append(f" Transport: {TRANSPORT_LABELS[tier]} access (score: {values['public_transport_score'][i]}/10)")
+
+        # Family considerations: only 'Great for kids' with at least one school or park nearby
+        if buckets["has_kids"][i]:
+            if buckets["kid_amenities"][i]:
+                lines.append(" Family-friendly: Great for kids (buyer has children)")
+            else:
+                lines.append(" Not ideal for families with children (no schools or parks nearby)")
+        explanations.append(lines)
+    return explanations
+
+def simple_explanation(buyer_data, house_data, confidence, distance_km=None):
+    """
+    Simple explanation of why a buyer matches a house - includes ALL house parameters + distance!
+    """
+    return explain_matches(buyer_data, house_data, [distance_km])[0]
+
+def explain_pair(model, expected_columns, house_data, buyer_data, encoder=None):
+    """
+    Score and explain a single (house, buyer) pair, for fetching reasons on demand
+    instead of embedding them in every list response. No budget filter is applied:
+    a pair outside the budget still gets its score and a "Budget issue" line.
+    """
+    distance_km = float(distances_km(buyer_data["preferred_location"], house_data["location"]))
+    if encoder is None:
+        encoder = FeatureEncoder.from_columns(expected_columns)
+    features = encoder.transform(buyer_data, house_data, [distance_km])
+    with span("predict"):
+        probas = model.predict_proba(features)[:, 1]
+    confidence_model, confidence_distance, confidence = blend_confidences(probas, [distance_km])
+    with span("explain"):
+        explanations = explain_matches(buyer_data, house_data, [distance_km])[0]
+
+    return {
+        "client_id": buyer_data["client_id"],
+        "preferred_location": buyer_data["preferred_location"],
+        "distance_km": distance_km,
+        "confidence_model": confidence_model[0].item(),
+        "confidence_distance": confidence_distance[0].item(),
+        "confidence": confidence[0].item(),
+        "explanations": explanations
+    }
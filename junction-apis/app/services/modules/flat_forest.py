@@ -0,0 +1,124 @@
+import numpy as np
+
+LEAF = -1
+# Above this many rows sklearn's own predict_proba is faster: its per-call overhead is
+# amortised and it walks each tree in compiled code (see app/scripts/benchmark_flat_forest.py)
+FLAT_FOREST_MAX_ROWS = 200
+# Levels walked between two compactions of the finished (row, tree) pairs
+STEPS_PER_COMPACTION = 6
+
+
+class FlatForest:
+    """
+    A fitted RandomForestClassifier flattened into one struct-of-arrays: every tree's
+    nodes are concatenated, children point at global node ids and leaves carry their
+    class probabilities. predict_proba walks all (row, tree) pairs level by level with
+    NumPy gathers, which avoids sklearn's per-call validation and per-tree dispatch;
+    for a single-client request that overhead is most of the latency.
+
+    Leaves point back at themselves (threshold +inf) so a pair that reaches its leaf
+    early simply stays there until the next compaction.
+
+    With a fallback model, batches larger than max_rows are handed to it instead.
+    """
+
+    def __init__(self, feature, threshold, children, is_leaf, value, roots, classes, n_features,
+                 fallback=None, max_rows=FLAT_FOREST_MAX_ROWS):
+        self.feature = feature        # intp, split feature of each node (0 on leaves)
+        self.threshold = threshold    # float64, go left when x[feature] <= threshold
+        self.children = children      # int32 (n_nodes, 2): [right, left] global node ids
+        self.is_leaf = is_leaf        # bool
+        self.value = value            # float64 (n_nodes, n_classes): leaf class probabilities
+        self.roots = roots            # intp, root node id of each tree
+        self.classes_ = classes
+        self.n_features_in_ = n_features
+        self.fallback = fallback
+        self.max_rows = max_rows
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.children, self.is_leaf, self.value, self.roots))
+
+    @classmethod
+    def from_sklearn(cls, model, fallback=None, max_rows=FLAT_FOREST_MAX_ROWS):
+        """Export a fitted RandomForestClassifier (single output)."""
+        features, thresholds, children, leaves, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == LEAF
+            node_ids = np.arange(offset, offset + tree.node_count)
+            # Same normalisation as DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            children.append(np.stack([
+                np.where(is_leaf, node_ids, tree.children_right + offset),
+                np.where(is_leaf, node_ids, tree.children_left + offset),
+            ], axis=1))
+            leaves.append(is_leaf)
+            values.append(value / normalizer)
+            roots.append(offset)
+            offset += tree.node_count
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=np.concatenate(children).astype(np.int32),
+            is_leaf=np.concatenate(leaves),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            classes=np.asarray(model.classes_),
+            n_features=model.n_features_in_,
+            fallback=fallback,
+            max_rows=max_rows,
+        )
+
+    def apply(self, X):
+        """Leaf node id reached by every row in every tree, shape (n_rows, n_trees)."""
+        # sklearn compares float32 inputs against float64 thresholds; do the same
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        children = self.children.ravel()  # child of node n is children[2 * n + went_left]
+        leaves = np.empty(n_rows * self.n_trees, dtype=np.int32)
+
+        # Active (row, tree) pairs, row-major: pair k belongs to row k // n_trees
+        pair = np.arange(n_rows * self.n_trees)
+        row_start = (pair // self.n_trees) * n_features
+        node = np.tile(self.roots, n_rows)
+        while len(pair):
+            for _ in range(STEPS_PER_COMPACTION):
+                went_left = flat_X[row_start + self.feature[node]] <= self.threshold[node]
+                node = children[2 * node + went_left]
+            done = self.is_leaf[node]
+            leaves[pair[done]] = node[done]
+            keep = ~done
+            pair, row_start, node = pair[keep], row_start[keep], node[keep]
+        return leaves.reshape(n_rows, self.n_trees)
+
+    def predict_proba(self, X):
+        """Same probabilities as the source RandomForestClassifier.predict_proba."""
+        if self.fallback is not None and len(X) > self.max_rows:
+            return self.fallback.predict_proba(X)
+        leaves = self.apply(X).T
+        proba = np.zeros((leaves.shape[1], self.value.shape[1]), dtype=np.float64)
+        # Accumulate tree by tree, in estimator order, like sklearn does
+        for tree_leaves in leaves:
+            proba += self.value[tree_leaves]
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
@@ -0,0 +1,524 @@
+import threading
+import time
+from collections import Counter
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, tuple_
+
+from app.core.config import settings
+from app.models.client import Client
+from app.models.match_score import MatchScore
+from app.models.property import Property
+from app.services.modules.client_store import client_store
+from app.services.modules.model_utils import blend_confidences, distances_km, get_model_registry
+from app.services.modules.recommendation import iter_bulk_scores
+
+# Property.match holds how many of its stored clients score at least this final confidence
+MATCH_THRESHOLD = 0.5
+INSERT_BATCH_ROWS = 10000
+# Ids per IN (...) list, well under SQLite's bound-parameter limit
+IN_BATCH = 500
+HOUSE_RECORD_FIELDS = (
+    "location", "price_DZD", "area", "property_type", "rooms",
+    "schools_nearby", "hospitals_nearby", "parks_nearby", "public_transport_score"
+)
+
+
+def house_record(prop):
+    """house_data dict for a Property ORM object (same keys the scorer reads)."""
+    return {field: getattr(prop, field) for field in HOUSE_RECORD_FIELDS}
+
+
+def ensure_table(bind):
+    MatchScore.__table__.create(bind=bind, checkfirst=True)
+
+
+def score_rows(property_ids, client_ids, distances, probas, variant):
+    """
+    match_scores rows for a batch of pairs. property_ids / client_ids are either one id
+    per pair or a single id shared by all of them.
+    """
+    distances = np.asarray(distances, dtype=np.float64)
+    confidence_model, confidence_distance, confidence = blend_confidences(probas, distances)
+    if isinstance(property_ids, str):
+        property_ids = repeat(property_ids)
+    if isinstance(client_ids, str):
+        client_ids = repeat(client_ids)
+    return [
+        {
+            "property_id": property_id,
+            "client_id": client_id,
+            "distance_km": distance,
+            "confidence_model": model_score,
+            "confidence_distance": distance_score,
+            "confidence": final,
+            "model_variant": variant,
+        }
+        for property_id, client_id, distance, model_score, distance_score, final in zip(
+            property_ids, client_ids, distances.tolist(), confidence_model.tolist(),
+            confidence_distance.tolist(), confidence.tolist()
+        )
+    ]
+
+
+def _stored_rows(db, owner, ids):
+    """property_id, client_id, confidence of the stored rows whose owner column is in ids."""
+    ids = list(ids)
+    rows = []
+    for start in range(0, len(ids), IN_BATCH):
+        rows.extend(
+            db.query(MatchScore.property_id, MatchScore.client_id, MatchScore.confidence)
+            .filter(getattr(MatchScore, owner).in_(ids[start:start + IN_BATCH]))
+            .all()
+        )
+    return pd.DataFrame(rows, columns=["property_id", "client_id", "confidence"])
+
+
+def _ranks(rows, owner, other):
+    """Rank (1 = best) of each row among its owner's rows, which must all be in rows."""
+    order = rows.sort_values([owner, "confidence", other], ascending=[True, False, True])
+    return order.groupby(owner).cumcount().add(1).reindex(rows.index)
+
+
+def _top_k(keys, confidence, k):
+    """Positions of the k best rows of one ranking, in the stored order: confidence desc, then key."""
+    return np.lexsort((np.asarray(keys, dtype=str), -np.asarray(confidence)))[:k]
+
+
+def _ranks_above(confidence, key, bound):
+    """Whether a row would rank before bound, a (confidence, key) pair (None: nothing to beat)."""
+    return bound is None or confidence > bound[0] or (confidence == bound[0] and key < bound[1])
+
+
+def _kth_rows(db, owner, other, ids, k):
+    """
+    owner id -> (confidence, other id) of the k-th stored row of the owners in ids; owners
+    with fewer rows are left out.
+    """
+    rows = _stored_rows(db, owner, ids)
+    rows = rows[_ranks(rows, owner, other) == k]
+    return dict(zip(rows[owner], zip(rows["confidence"], rows[other])))
+
+
+def _stored_keys(db, column, ids):
+    """(property_id, client_id) of the stored rows whose column is in ids."""
+    ids = list(ids)
+    keys = set()
+    for start in range(0, len(ids), IN_BATCH):
+        keys.update(
+            db.query(MatchScore.property_id, MatchScore.client_id).filter(column.in_(ids[start:start + IN_BATCH])).all()
+        )
+    return keys
+
+
+def _insert(db, rows, variant):
+    """Store {(property_id, client_id): (distance_km, proba)}; returns how many rows were written."""
+    items = list(rows.items())
+    for start in range(0, len(items), INSERT_BATCH_ROWS):
+        batch = items[start:start + INSERT_BATCH_ROWS]
+        db.execute(MatchScore.__table__.insert(), score_rows(
+            [key[0] for key, _ in batch], [key[1] for key, _ in batch],
+            [value[0] for _, value in batch], [value[1] for _, value in batch], variant
+        ))
+    return len(items)
+
+
+def _pushed_out(db, k, owner, other, inserted):
+    """
+    Rows that inserted rows pushed out of their owner's top k: an owner that gained n rows
+    only moved its rows down by at most n ranks, to (k, k + n] for those that were in it.
+    """
+    gained = Counter(key[0 if owner == "property_id" else 1] for key in inserted)
+    rows = _stored_rows(db, owner, gained)
+    ranks = _ranks(rows, owner, other)
+    return rows[(ranks > k) & (ranks <= k + rows[owner].map(gained))]
+
+
+def _outside(db, k, owner, other, rows):
+    """The (property_id, client_id) of rows that are not in their owner's top k."""
+    ranked = _stored_rows(db, owner, set(rows[owner]))
+    ranked = ranked[_ranks(ranked, owner, other) > k]
+    return set(zip(ranked["property_id"], ranked["client_id"])) & set(zip(rows["property_id"], rows["client_id"]))
+
+
+def _prune(db, k, inserted):
+    """
+    Drop the rows that inserting these (property_id, client_id) pushed out of both their
+    property's and their client's top k (deletes only move rows up); returns their keys.
+    """
+    pushed_by_property = _pushed_out(db, k, "property_id", "client_id", inserted)
+    pushed_by_client = _pushed_out(db, k, "client_id", "property_id", inserted)
+    pruned = (
+        _outside(db, k, "client_id", "property_id", pushed_by_property)
+        | _outside(db, k, "property_id", "client_id", pushed_by_client)
+    )
+    _delete(db, pruned)
+    return pruned
+
+
+def _delete(db, keys):
+    keys = list(keys)
+    for start in range(0, len(keys), IN_BATCH):
+        db.query(MatchScore).filter(
+            tuple_(MatchScore.property_id, MatchScore.client_id).in_(keys[start:start + IN_BATCH])
+        ).delete(synchronize_session=False)
+
+
+def _apply(db, rows, deleted, variant, k):
+    """
+    Insert rows once the deleted keys are gone, prune what they pushed out and refresh
+    Property.match of the properties that lost or gained rows. Returns rows written.
+    """
+    written = _insert(db, rows, variant)
+    pruned = _prune(db, k, rows)
+    refresh_match_counts(db, {property_id for property_id, _ in set(rows) | set(deleted) | pruned})
+    return written
+
+
+def _score_properties(registry, properties, contacts_df, buyer_index=None):
+    """
+    Score properties against contacts_df with the batched scorer. Yields, for each property
+    someone can afford: (property, rows, distances, probas, confidence) where rows are the
+    eligible clients' positions in contacts_df.
+    """
+    scores = iter_bulk_scores(
+        registry.scorer, registry.encoder, [house_record(p) for p in properties], contacts_df, buyer_index=buyer_index
+    )
+    for (_i, _house, _result, rows, distances, probas), prop in zip(scores, properties):
+        if probas is not None:
+            yield prop, rows, distances, probas, blend_confidences(probas, distances)[2]
+
+
+def _active_properties(db, property_ids=None):
+    query = db.query(Property).filter(Property.is_active == True)
+    if property_ids is not None:
+        query = query.filter(Property.property_id.in_(list(property_ids)))
+    return query.order_by(Property.property_id).all()
+
+
+def _property_top_rows(db, registry, snapshot, property_ids, k):
+    """The top k clients of each property, scored against every client (minus what is already stored)."""
+    stored = _stored_keys(db, MatchScore.property_id, property_ids)
+    rows = {}
+    scored = _score_properties(registry, _active_properties(db, property_ids), snapshot.to_frame(), snapshot.buyer_index)
+    for prop, candidates, distances, probas, confidence in scored:
+        client_ids = snapshot.client_ids[candidates]
+        for row in _top_k(client_ids, confidence, k):
+            key = (prop.property_id, client_ids[row])
+            if key not in stored:
+                rows[key] = (distances[row], probas[row])
+    return rows
+
+
+def _client_top_rows(db, registry, snapshot, client_ids, k):
+    """The top k properties of each client, scored against every property (minus what is already stored)."""
+    positions = [snapshot.index[c] for c in client_ids if c in snapshot.index]
+    if not positions:
+        return {}
+    contacts_df = snapshot.to_frame().iloc[positions].reset_index(drop=True)
+    pairs = [
+        pd.DataFrame({
+            "property_id": prop.property_id, "client_id": contacts_df["client_id"].to_numpy()[rows],
+            "distance_km": distances, "proba": probas, "confidence": confidence
+        })
+        for prop, rows, distances, probas, confidence in _score_properties(registry, _active_properties(db), contacts_df)
+    ]
+    if not pairs:
+        return {}
+    top = (
+        pd.concat(pairs, ignore_index=True)
+        .sort_values(["client_id", "confidence", "property_id"], ascending=[True, False, True])
+        .groupby("client_id").head(k)
+    )
+    stored = _stored_keys(db, MatchScore.client_id, client_ids)
+    return {
+        (property_id, client_id): (distance, proba)
+        for property_id, client_id, distance, proba in zip(top["property_id"], top["client_id"], top["distance_km"], top["proba"])
+        if (property_id, client_id) not in stored
+    }
+
+
+def rebuild_match_scores(db, registry, snapshot, property_ids=None, verbose=True):
+    """
+    Score every eligible (property, client) pair with the batched scorer and store the top
+    STORED_TOP_K clients of every property and the top STORED_TOP_K properties of every
+    client (the table is replaced). With property_ids, only those are rescored (see
+    rescore_property). Also refreshes Property.match.
+    """
+    start = time.perf_counter()
+    if property_ids is not None:
+        rows = sum(rescore_property(db, registry, snapshot, property_id) for property_id in property_ids)
+        return {
+            "properties": len(property_ids),
+            "clients": len(snapshot),
+            "rows": rows,
+            "model_variant": registry.variant,
+            "seconds": round(time.perf_counter() - start, 2),
+        }
+
+    k = settings.STORED_TOP_K
+    properties = _active_properties(db)
+    db.query(MatchScore).delete(synchronize_session=False)
+
+    # Every client's best k properties so far. Properties come in property_id order, so on
+    # equal confidence the property already kept ranks first and is not replaced
+    best = np.full((len(snapshot), k), -np.inf)
+    best_property = np.full((len(snapshot), k), -1)
+    best_distance = np.zeros((len(snapshot), k))
+    best_proba = np.zeros((len(snapshot), k))
+    rows = {}
+    scored = _score_properties(registry, properties, snapshot.to_frame(), snapshot.buyer_index)
+    position = {prop.property_id: i for i, prop in enumerate(properties)}
+    for prop, candidates, distances, probas, confidence in scored:
+        client_ids = snapshot.client_ids[candidates]
+        for row in _top_k(client_ids, confidence, k):
+            rows[(prop.property_id, client_ids[row])] = (distances[row], probas[row])
+
+        kept = best[candidates]
+        worst = kept.min(axis=1)
+        # The slot to replace: the lowest confidence, and of those the last property kept
+        slot = np.where(kept == worst[:, None], best_property[candidates], -2).argmax(axis=1)
+        better = confidence > worst
+        update = (candidates[better], slot[better])
+        best[update] = confidence[better]
+        best_property[update] = position[prop.property_id]
+        best_distance[update] = distances[better]
+        best_proba[update] = probas[better]
+        if verbose and (position[prop.property_id] + 1) % 50 == 0:
+            print(f"✅ Scored {position[prop.property_id] + 1}/{len(properties)} properties")
+
+    for client, slot in zip(*np.nonzero(best_property >= 0)):
+        key = (properties[best_property[client, slot]].property_id, snapshot.client_ids[client])
+        rows.setdefault(key, (best_distance[client, slot], best_proba[client, slot]))
+    total_rows = _insert(db, rows, registry.variant)
+    refresh_match_counts(db)
+    db.commit()
+
+    return {
+        "properties": len(properties),
+        "clients": len(snapshot),
+        "rows": total_rows,
+        "model_variant": registry.variant,
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def refresh_match_counts(db, property_ids=None):
+    """Recompute Property.match from the stored scores (of the given properties, or all of them)."""
+    counts = db.query(MatchScore.property_id, func.count()).filter(MatchScore.confidence >= MATCH_THRESHOLD)
+    properties = db.query(Property)
+    if property_ids is not None:
+        property_ids = list(property_ids)
+        if not property_ids:
+            return
+        counts = counts.filter(MatchScore.property_id.in_(property_ids))
+        properties = properties.filter(Property.property_id.in_(property_ids))
+    counts = dict(counts.group_by(MatchScore.property_id).all())
+    for prop in properties:
+        prop.match = counts.get(prop.property_id, 0)
+
+
+def rescore_property(db, registry, snapshot, property_id):
+    """
+    A created, updated or deleted property against every active client: O(clients), plus
+    O(properties) for every client whose own top k held it (its next best is not stored).
+    Only the rankings it touches are read. Leaves the table as rebuild_match_scores would;
+    returns how many rows were written.
+    """
+    k = settings.STORED_TOP_K
+    stored = _stored_rows(db, "property_id", [property_id])
+    clients = _stored_rows(db, "client_id", stored["client_id"])
+    clients = clients[(clients["property_id"] == property_id) & (_ranks(clients, "client_id", "property_id") <= k)]
+    refill = clients["client_id"].tolist()
+    db.query(MatchScore).filter(MatchScore.property_id == property_id).delete(synchronize_session=False)
+
+    rows = {}
+    scored = _score_properties(registry, _active_properties(db, [property_id]), snapshot.to_frame(), snapshot.buyer_index)
+    for _prop, candidates, distances, probas, confidence in scored:
+        client_ids = snapshot.client_ids[candidates].tolist()
+        # The property's own top k, and the pairs that now make it into their client's top k
+        kth = _kth_rows(db, "client_id", "property_id", client_ids, k)
+        top = set(_top_k(client_ids, confidence, k).tolist())
+        for row, client_id in enumerate(client_ids):
+            if row in top or _ranks_above(confidence[row], property_id, kth.get(client_id)):
+                rows[(property_id, client_id)] = (distances[row], probas[row])
+    rows.update(_client_top_rows(db, registry, snapshot, refill, k))
+
+    deleted = zip(stored["property_id"], stored["client_id"])
+    written = _apply(db, rows, deleted, registry.variant, k)
+    db.commit()
+    return written
+
+
+def rescore_client(db, registry, snapshot, client_id):
+    """
+    A created, updated or deleted client (as snapshot has it) against every active property:
+    O(properties), plus O(clients) for every property whose own top k held it.
+    Only the rankings it touches are read. Leaves the table as rebuild_match_scores would;
+    returns how many rows were written.
+    """
+    k = settings.STORED_TOP_K
+    stored = _stored_rows(db, "client_id", [client_id])
+    properties = _stored_rows(db, "property_id", stored["property_id"])
+    properties = properties[
+        (properties["client_id"] == client_id) & (_ranks(properties, "property_id", "client_id") <= k)
+    ]
+    refill = properties["property_id"].tolist()
+    db.query(MatchScore).filter(MatchScore.client_id == client_id).delete(synchronize_session=False)
+
+    rows = {}
+    record = snapshot.record(client_id)
+    if record is not None:
+        # Same eligibility as the property side: max_budget_DZD >= price_DZD
+        properties = db.query(Property).filter(
+            Property.is_active == True, Property.price_DZD <= record["max_budget_DZD"]
+        ).all()
+        if properties:
+            houses = pd.DataFrame.from_records([house_record(p) for p in properties], columns=HOUSE_RECORD_FIELDS)
+            distances = distances_km(record["preferred_location"], houses["location"])
+            features = registry.encoder.transform(record, houses, distances)
+            probas = registry.scorer.predict_proba(features)[:, 1]
+            confidence = blend_confidences(probas, distances)[2]
+            property_ids = [p.property_id for p in properties]
+            # The client's own top k, and the pairs that now make it into their property's top k
+            kth = _kth_rows(db, "property_id", "client_id", property_ids, k)
+            top = set(_top_k(property_ids, confidence, k).tolist())
+            for row, property_id in enumerate(property_ids):
+                if row in top or _ranks_above(confidence[row], client_id, kth.get(property_id)):
+                    rows[(property_id, client_id)] = (distances[row], probas[row])
+    rows.update(_property_top_rows(db, registry, snapshot, refill, k))
+
+    deleted = zip(stored["property_id"], stored["client_id"])
+    written = _apply(db, rows, deleted, registry.variant, k)
+    db.commit()
+    return written
+
+
+class IncrementalRescoring:
+    """
+    Runs the incremental jobs after the response (FastAPI BackgroundTasks) on sessions of
+    the factory given to start(), which also creates the table. Jobs are serialized so a
+    property job and a client job never insert the same (property, client) pair at once.
+    """
+
+    def __init__(self):
+        self.session_factory = None
+        self._lock = threading.Lock()
+
+    def start(self, session_factory):
+        self.session_factory = session_factory
+        db = session_factory()
+        try:
+            ensure_table(db.get_bind())
+        finally:
+            db.close()
+
+    def run(self, name, job):
+        if self.session_factory is None:
+            print(f" ⚠️  Incremental rescoring skipped ({name}): not started")
+            return
+        db = self.session_factory()
+        try:
+            with self._lock:
+                job(db, get_model_registry())
+        except Exception as e:
+            db.rollback()
+            print(f" ⚠️  Incremental rescoring failed ({name}): {e}")
+        finally:
+            db.close()
+
+
+incremental_rescoring = IncrementalRescoring()
+
+
+def property_changed(property_id):
+    """Background task for the properties endpoints."""
+    incremental_rescoring.run(
+        f"property {property_id}",
+        lambda db, registry: rescore_property(db, registry, client_store.current(db), property_id)
+    )
+
+
+def client_changed(client_id, previous_client_id=None):
+    """Background task for the clients endpoints (the client store is already up to date)."""
+    def job(db, registry):
+        snapshot = client_store.current(db)
+        if previous_client_id and previous_client_id != client_id:
+            rescore_client(db, registry, snapshot, previous_client_id)
+        rescore_client(db, registry, snapshot, client_id)
+
+    incremental_rescoring.run(f"client {client_id}", job)
+
+
+def _ranked_window(limit, offset):
+    # Only the first STORED_TOP_K ranks are complete; further stored rows are other rankings' picks
+    return max(0, min(limit, settings.STORED_TOP_K - offset))
+
+
+def top_clients_for_property(db, property_id, limit=10, offset=0):
+    """Stored ranking of the clients for a property (one ordered index scan)."""
+    rows = (
+        db.query(MatchScore, Client.preferred_location)
+        .join(Client, Client.client_id == MatchScore.client_id)
+        .filter(MatchScore.property_id == property_id)
+        .order_by(MatchScore.confidence.desc(), MatchScore.client_id)
+        .offset(offset)
+        .limit(_ranked_window(limit, offset))
+        .all()
+    )
+    return [
+        {
+            "client_id": score.client_id,
+            "preferred_location": preferred_location,
+            "distance_km": score.distance_km,
+            "confidence_model": score.confidence_model,
+            "confidence_distance": score.confidence_distance,
+            "confidence": score.confidence,
+        }
+        for score, preferred_location in rows
+    ]
+
+
+def top_properties_for_client(db, client_id, limit=10, offset=0):
+    """Stored ranking of the properties for a client (one ordered index scan)."""
+    rows = (
+        db.query(MatchScore, Property)
+        .join(Property, Property.property_id == MatchScore.property_id)
+        .filter(MatchScore.client_id == client_id)
+        .order_by(MatchScore.confidence.desc(), MatchScore.property_id)
+        .offset(offset)
+        .limit(_ranked_window(limit, offset))
+        .all()
+    )
+    return [
+        {
+            "property_id": prop.property_id,
+            "location": prop.location,
+            "price": prop.price_DZD,
+            "area": prop.area,
+            "type": prop.property_type,
+            "distance_km": score.distance_km,
+            "confidence_model": score.confidence_model,
+            "confidence_distance": score.confidence_distance,
+            "confidence": score.confidence,
+        }
+        for score, prop in rows
+    ]
+
+
+def stored_scores_info(db, property_id=None, client_id=None):
+    """
+    Row count and last scoring time of the stored scores; for one entity the count is the
+    length of its stored ranking (at most STORED_TOP_K).
+    """
+    query = db.query(func.count(), func.max(MatchScore.scored_at))
+    if property_id is not None:
+        query = query.filter(MatchScore.property_id == property_id)
+    if client_id is not None:
+        query = query.filter(MatchScore.client_id == client_id)
+    count, scored_at = query.one()
+    if property_id is not None or client_id is not None:
+        count = min(count, settings.STORED_TOP_K)
+    return {"total": count, "scored_at": scored_at.isoformat() if scored_at else None}
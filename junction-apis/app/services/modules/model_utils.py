@@ -0,0 +1,529 @@
+import os
+import threading
+from math import radians, cos, sin, asin, sqrt
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.services.modules.flat_forest import FlatForest
+
+MODEL_PATH = "./app/services/ml_models/match_predictor.pkl"
+COLUMNS_PATH = "./app/services/ml_models/match_columns.pkl"
+ENCODER_PATH = "./app/services/ml_models/match_encoder.pkl"
+DATASET_PATH = "./app/services/data/balanced_contacts_20k.csv"
+
+# Trainable model families, all fitted on the same encoded features. "random_forest" is the
+# original model (and keeps the match_predictor.pkl file name); the others trade a little
+# accuracy for smaller artifacts and faster scoring (see app/scripts/evaluate_models.py).
+MODEL_VARIANTS = ("random_forest", "shallow_forest", "hist_gradient_boosting", "logistic_regression")
+DEFAULT_MODEL_VARIANT = "random_forest"
+
+# Raw attributes the model features are built from, by the side of the pair they come from
+BUYER_FIELDS = (
+    "min_budget_DZD", "max_budget_DZD", "min_area", "max_area", "has_kids",
+    "preferred_location", "preferred_property_type", "marital_status"
+)
+HOUSE_FIELDS = (
+    "price_DZD", "area", "rooms", "schools_nearby", "hospitals_nearby", "parks_nearby",
+    "public_transport_score", "location", "property_type"
+)
+CATEGORICAL_FIELDS = ("preferred_location", "preferred_property_type", "marital_status", "location", "property_type")
+DISTANCE_FEATURE = "distance_km"
+
+# Coordinates of Algerian cities (Latitude, Longitude)
+WILAYA_COORDS = {
+    "Adrar": (27.8743, -0.2942),
+    "Chlef": (36.1652, 1.3342),
+    "Laghouat": (33.8005, 2.8736),
+    "Oum El Bouaghi": (35.8689, 7.1135),
+    "Batna": (35.5550, 6.1741),
+    "Bejaia": (36.7509, 5.0567),
+    "Biskra": (34.8481, 5.7249),
+    "Bechar": (31.6238, -2.2164),
+    "Blida": (36.4700, 2.8339),
+    "Bouira": (36.3741, 3.9014),
+    "Tamanrasset": (22.7850, 5.5228),
+    "Tebessa": (35.4042, 8.1203),
+    "Tlemcen": (34.8880, -1.3169),
+    "Tiaret": (35.3713, 1.3160),
+    "Tizi Ouzou": (36.7169, 4.0497),
+    "Algiers": (36.7538, 3.0588),
+    "Djelfa": (34.6694, 3.2581),
+    "Jijel": (36.8191, 5.7660),
+    "Setif": (36.1911, 5.4137),
+    "Saida": (34.8325, 0.1517),
+    "Skikda": (36.8791, 6.9063),
+    "Sidi Bel Abbes": (35.2022, -0.6311),
+    "Annaba": (36.9000, 7.7667),
+    "Guelma": (36.4621, 7.4261),
+    "Constantine": (36.3650, 6.6147),
+    "Medea": (36.2647, 2.7667),
+    "Mostaganem": (35.9404, 0.0898),
+    "MSila": (35.7055, 4.5411),
+    "Mascara": (35.3967, 0.1400),
+    "Ouargla": (31.9522, 5.3333),
+    "Oran": (35.6971, -0.6308),
+    "El Bayadh": (33.6831, 1.0191),
+    "Illizi": (26.4833, 8.4666),
+    "Bordj Bou Arreridj": (36.0730, 4.7632),
+    "Boumerdes": (36.7678, 3.4791),
+    "El Tarf": (36.7670, 8.3131),
+    "Tindouf": (27.6711, -8.1470),
+    "Tissemsilt": (35.6071, 1.8104),
+    "El Oued": (33.3683, 6.8674),
+    "Khenchela": (35.4350, 7.1438),
+    "Souk Ahras": (36.2822, 7.9511),
+    "Tipaza": (36.5897, 2.4474),
+    "Mila": (36.4500, 6.2644),
+    "Ain Defla": (36.2590, 1.9640),
+    "Naama": (33.2667, -0.3167),
+    "Ain Temouchent": (35.3000, -1.1333),
+    "Ghardaia": (32.4894, 3.6735),
+    "Relizane": (35.7370, 0.5550),
+    "El Mghair": (33.9536, 5.9211),
+    "El Menia": (30.5667, 2.8833),
+    "Ouled Djellal": (34.4167, 4.9697),
+    "Bordj Badji Mokhtar": (21.3333, 0.9167),
+    "Beni Abbes": (30.1333, -2.1333),
+    "Timimoun": (29.2417, 0.2333),
+    "Touggourt": (33.0992, 6.0609),
+    "Djanet": (24.5543, 9.4820),
+    "In Salah": (27.1989, 2.4731),
+    "In Guezzam": (19.5631, 5.7740),
+}
+
+def haversine_distance(city1, city2):
+    """Calculate distance between two cities using Haversine formula"""
+    coord1 = WILAYA_COORDS.get(city1)
+    coord2 = WILAYA_COORDS.get(city2)
+
+    if not coord1 or not coord2:
+        return 9999  # Return large distance if city not found
+
+    lat1, lon1 = coord1
+    lat2, lon2 = coord2
+
+    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = sin(dlat / 2)**2 + cos(lat1) * cos(lat2) * sin(dlon / 2)**2
+    c = 2 * asin(sqrt(a))
+    r = 6371  # Earth radius in kilometers
+    return round(c * r, 1)
+
+# Integer codes for the wilayas, in WILAYA_COORDS order. Any city that is not in the
+# table maps to UNKNOWN_CITY_CODE, whose row/column in the matrix holds the 9999 fallback.
+WILAYA_CODES = {city: code for code, city in enumerate(WILAYA_COORDS)}
+
+UNKNOWN_CITY_CODE = len(WILAYA_CODES)
+
+UNKNOWN_DISTANCE_KM = 9999
+
+def build_distance_matrix():
+    """Precompute all city-to-city distances (km) as a float32 matrix indexed by city code"""
+    n = len(WILAYA_CODES)
+    lat, lon = np.radians(np.array(list(WILAYA_COORDS.values()), dtype=np.float64)).T
+    dlat = lat[None, :] - lat[:, None]
+    dlon = lon[None, :] - lon[:, None]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin(dlon / 2) ** 2
+    matrix = np.full((n + 1, n + 1), UNKNOWN_DISTANCE_KM, dtype=np.float32)
+    matrix[:n, :n] = np.round(2 * np.arcsin(np.sqrt(a)) * 6371, 1)
+    return matrix
+
+DISTANCE_MATRIX = build_distance_matrix()
+
+def city_codes(cities):
+    """Map a city name or a sequence/Series of city names to integer city codes"""
+    if isinstance(cities, str) or cities is None:
+        return WILAYA_CODES.get(cities, UNKNOWN_CITY_CODE)
+    # Categorical input only maps its categories; unknown cities come back as NaN
+    codes = pd.Series(cities, copy=False).map(WILAYA_CODES).to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.where(np.isnan(codes), UNKNOWN_CITY_CODE, codes).astype(np.intp)
+
+def distances_km(buyer_cities, house_cities):
+    """
+    Vectorized haversine_distance: one fancy-indexing lookup into DISTANCE_MATRIX.
+    Either side may be a single city name, which is broadcast against the other.
+    """
+    return distances_between(city_codes(buyer_cities), city_codes(house_cities))
+
+def distances_between(buyer_codes, house_codes):
+    """distances_km for cities already mapped with city_codes"""
+    distances = DISTANCE_MATRIX[buyer_codes, house_codes]
+    # Same 0.1 km resolution as haversine_distance, as float64 so values serialize cleanly
+    return np.round(np.asarray(distances, dtype=np.float64), 1)
+
+def score_from_distance_km(distance_km):
+    """Convert distance to a score between 0 and 1 (closer = higher score)"""
+    MAX_DISTANCE = 1000  # Maximum distance for scoring
+    scaled = max(0.0, 1 - (distance_km / MAX_DISTANCE))
+    return round(scaled, 4)
+
+def scores_from_distance_km(distances):
+    """Vectorized score_from_distance_km over an array of distances"""
+    MAX_DISTANCE = 1000  # Maximum distance for scoring
+    return np.round(np.maximum(0.0, 1 - (np.asarray(distances, dtype=np.float64) / MAX_DISTANCE)), 4)
+
+def blend_confidences(probas, distances):
+    """
+    Confidence arrays for a batch of candidates: model (rounded probability), distance score
+    and the final 0.7 * model + 0.3 * distance blend, all rounded to 4 decimals.
+    """
+    confidence_model = np.round(np.asarray(probas, dtype=np.float64), 4)
+    confidence_distance = scores_from_distance_km(distances)
+    confidence = np.round(0.7 * confidence_model + 0.3 * confidence_distance, 4)
+    return confidence_model, confidence_distance, confidence
+
+def top_k_indices(scores, k):
+    """
+    Positions of the k highest scores, best first, in O(n) with np.argpartition.
+    Ties keep their input order, so the result matches a stable descending sort cut at k.
+    """
+    n = len(scores)
+    k = n if k is None else max(0, min(k, n))
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        threshold = scores[np.argpartition(scores, n - k)[n - k]]
+        above = np.flatnonzero(scores > threshold)
+        tied = np.flatnonzero(scores == threshold)[:k - len(above)]
+        candidates = np.concatenate([above, tied])
+    else:
+        candidates = np.arange(n)
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+def encoder_path_for(columns_path):
+    """The encoder artifact lives next to match_columns.pkl"""
+    return os.path.join(os.path.dirname(columns_path), os.path.basename(ENCODER_PATH))
+
+
+def model_path_for(variant, model_path=MODEL_PATH):
+    """match_predictor.pkl for the default variant, match_predictor_<variant>.pkl otherwise"""
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Unknown model variant {variant!r}, expected one of {', '.join(MODEL_VARIANTS)}")
+    if variant == DEFAULT_MODEL_VARIANT:
+        return model_path
+    root, ext = os.path.splitext(model_path)
+    return f"{root}_{variant}{ext}"
+
+
+def build_model(variant=DEFAULT_MODEL_VARIANT):
+    """Unfitted estimator for a model variant (sklearn is only imported when training)."""
+    if variant == "random_forest":
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(n_estimators=100, random_state=42)
+    if variant == "shallow_forest":
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(n_estimators=30, max_depth=12, min_samples_leaf=5, random_state=42)
+    if variant == "hist_gradient_boosting":
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        return HistGradientBoostingClassifier(max_iter=200, learning_rate=0.1, random_state=42)
+    if variant == "logistic_regression":
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import make_pipeline
+        from sklearn.preprocessing import StandardScaler
+        return make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000))
+    raise ValueError(f"Unknown model variant {variant!r}, expected one of {', '.join(MODEL_VARIANTS)}")
+
+
+def training_matrix(csv_path="./app/services/data/balanced_contacts_20k.csv", verbose=True):
+    """
+    Encoded training data: (columns, float32 feature matrix, match labels).
+    City names are replaced by the buyer-house distance, everything else is one-hot encoded.
+    """
+    if verbose:
+        print(" Loading dataset...")
+        print(f" Reading CSV file: {csv_path}")
+    df = pd.read_csv(csv_path)
+    if verbose:
+        print(f" Dataset loaded: {len(df)} records")
+        print(" Preparing features and target variables...")
+
+    # Calculate real distances for training data
+    if verbose:
+        print(" Calculating distances for training data...")
+    distances = distances_km(df["preferred_location"], df["location"])
+
+    df["distance_km"] = distances
+    if verbose:
+        print(f" Distance calculation complete! Average distance: {distances.mean():.1f} km")
+
+    # Drop location columns and use only distance
+    if verbose:
+        print(" Removing categorical location features, keeping only distance...")
+    X = df.drop(columns=["client_id", "property_id", "match", "preferred_location", "location"])
+    y = df["match"]
+    if verbose:
+        print(" Using distance-based features only (no city names)")
+        print(" One-hot encoding categorical features...")
+    X_encoded = pd.get_dummies(X)
+    if verbose:
+        print(f" Features encoded: {X_encoded.shape[1]} total features")
+
+    return X_encoded.columns, X_encoded.to_numpy(dtype=np.float32), y
+
+def split_training_matrix(X_matrix, y):
+    """The fixed 80/20 split the served model is trained and evaluated on."""
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(X_matrix, y, test_size=0.2, random_state=42)
+
+def train_model(csv_path="./app/services/data/balanced_contacts_20k.csv", model_out="./app/services/ml_models/match_predictor.pkl", columns_out="./app/services/ml_models/match_columns.pkl", variant=DEFAULT_MODEL_VARIANT):
+    import joblib
+
+    # ✅ Check if model and column files already exist
+    if os.path.exists(model_out) and os.path.exists(columns_out):
+        print(f" Loading existing model from {model_out}")
+        print(" Loading model file...")
+        model = joblib.load(model_out)
+        print(" Loading column definitions...")
+        expected_columns = joblib.load(columns_out)
+        # Scoring feeds plain float32 matrices from FeatureEncoder; older pickles were fitted
+        # on a DataFrame, so drop their feature names to keep sklearn from warning on every call
+        if hasattr(model, "feature_names_in_"):
+            del model.feature_names_in_
+        print(" Model and columns loaded successfully!")
+        return model, expected_columns
+
+    columns, X_matrix, y = training_matrix(csv_path)
+
+    print(" Saving column definitions...")
+    joblib.dump(columns, columns_out)
+
+    print(" Fitting feature encoder...")
+    encoder = FeatureEncoder.from_columns(columns)
+    joblib.dump(encoder, encoder_path_for(columns_out))
+
+    print(" Splitting data into train/test sets...")
+    X_train, X_test, y_train, y_test = split_training_matrix(X_matrix, y)
+    print(f" Data split: {len(X_train)} training, {len(X_test)} testing samples")
+
+    print(f" Training {variant} model...")
+    print(" This may take a moment...")
+    model = build_model(variant)
+    model.fit(X_train, y_train)
+    print(" Model training complete!")
+
+    print(" Saving trained model...")
+    joblib.dump(model, model_out)
+    print(f" Model saved to {model_out}")
+    return model, columns
+
+
+class FeatureEncoder:
+    """
+    Builds the model input matrix (float32, expected_columns order) directly from buyer and
+    house attributes. It replaces pd.get_dummies + column alignment in the scoring path:
+    numeric fields are copied into their column and categorical fields are one-hot encoded
+    by integer code. Values never seen during training leave their one-hot block at zero,
+    exactly like the columns get_dummies would have dropped.
+    """
+
+    def __init__(self):
+        self.columns = []
+        self.numeric = []       # (column index, field)
+        self.categories = {}    # field -> [category, ...]
+        self.offsets = {}       # field -> column index of each category, aligned with categories[field]
+        self.distance_index = None
+
+    def fit(self, columns):
+        """Derive the encoding from the one-hot column names produced at training time."""
+        self.columns = list(columns)
+        self.numeric, self.categories, self.offsets = [], {}, {}
+        self.distance_index = None
+        # Longest prefix first so "preferred_property_type_x" is not read as "property_type"
+        prefixes = sorted(CATEGORICAL_FIELDS, key=len, reverse=True)
+
+        for index, column in enumerate(self.columns):
+            if column == DISTANCE_FEATURE:
+                self.distance_index = index
+            elif column in BUYER_FIELDS or column in HOUSE_FIELDS:
+                self.numeric.append((index, column))
+            else:
+                field = next((f for f in prefixes if column.startswith(f + "_")), None)
+                if field is None:
+                    continue  # Unknown column: stays at zero, as the old alignment loop did
+                self.categories.setdefault(field, []).append(column[len(field) + 1:])
+                self.offsets.setdefault(field, []).append(index)
+
+        self.offsets = {field: np.asarray(idx, dtype=np.intp) for field, idx in self.offsets.items()}
+        return self
+
+    @classmethod
+    def from_columns(cls, columns):
+        return cls().fit(columns)
+
+    @property
+    def n_features(self):
+        return len(self.columns)
+
+    def category_codes(self, field, values):
+        """Integer code of each value within the fitted categories of field (-1 when unseen)."""
+        categories = self.categories.get(field, [])
+        if np.ndim(values) == 0:
+            return categories.index(values) if values in categories else -1
+        if isinstance(values, pd.Categorical):
+            # Already coded (e.g. the client store): only the category list is remapped
+            return values.set_categories(categories).codes
+        return pd.Categorical(np.asarray(values, dtype=object), categories=categories).codes
+
+    def transform(self, buyers, houses, distance_km):
+        """
+        Encode one row per pair. buyers and houses are each either a single record
+        (dict / Series, broadcast to every row) or column-oriented data (DataFrame or
+        dict of arrays) with one entry per row. distance_km has one entry per row.
+        """
+        X = self.buyer_block(buyers, len(distance_km))
+        self.fill_pairs(X, houses, distance_km)
+        return X
+
+    def buyer_block(self, buyers, n_rows=None):
+        """Feature matrix with only the buyer columns filled (house columns stay at zero)."""
+        if n_rows is None:
+            n_rows = len(buyers)
+        X = np.zeros((n_rows, self.n_features), dtype=np.float32)
+        self._fill(X, buyers, BUYER_FIELDS)
+        return X
+
+    def fill_pairs(self, X, houses, distance_km):
+        """Write the house columns and the pair distance into X in place."""
+        self._fill(X, houses, HOUSE_FIELDS)
+        if self.distance_index is not None:
+            X[:, self.distance_index] = distance_km
+        return X
+
+    def _fill(self, X, side, fields):
+        for index, field in self.numeric:
+            if field in fields:
+                value = self._field(side, field)
+                X[:, index] = 0 if value is None else value
+
+        for field, offsets in self.offsets.items():
+            if field not in fields:
+                continue
+            codes = self.category_codes(field, self._field(side, field))
+            if np.ndim(codes) == 0:
+                if codes >= 0:
+                    X[:, offsets[codes]] = 1
+            else:
+                known = np.flatnonzero(codes >= 0)
+                X[known, offsets[codes[known]]] = 1
+
+    @staticmethod
+    def _field(side, field):
+        if field not in side:
+            return None
+        value = side[field]
+        if isinstance(value, pd.Series):
+            return value.array if isinstance(value.dtype, pd.CategoricalDtype) else value.to_numpy()
+        return value
+
+
+class ModelRegistry:
+    """
+    Process-wide holder for the match model and its expected feature columns.
+    The artifacts are loaded (or trained if missing) once and then shared by every request.
+    Endpoints score with `scorer`: the model itself, or for a random forest a FlatForest
+    that serves small batches and hands large ones back to the model.
+    """
+
+    def __init__(self, variant=DEFAULT_MODEL_VARIANT, model_path=None, columns_path=COLUMNS_PATH, dataset_path=DATASET_PATH):
+        self.variant = variant
+        self.model_path = model_path or model_path_for(variant)
+        self.columns_path = columns_path
+        self.dataset_path = dataset_path
+        self.model = None
+        self.scorer = None
+        self.expected_columns = None
+        self.encoder = None
+        self.ready = False
+        self.error = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Load the artifacts and warm the model up. Safe to call from several threads."""
+        with self._lock:
+            if self.ready:
+                return self
+            try:
+                model, expected_columns = train_model(self.dataset_path, self.model_path, self.columns_path, self.variant)
+                encoder = load_encoder(expected_columns, encoder_path_for(self.columns_path))
+                scorer = serving_scorer(model)
+                self._warm_up(model, encoder)
+                self._warm_up(scorer, encoder)
+            except Exception as e:
+                self.error = str(e)
+                raise
+
+            self.model = model
+            self.scorer = scorer
+            self.expected_columns = expected_columns
+            self.encoder = encoder
+            self.error = None
+            self.ready = True
+        return self
+
+    def load_in_background(self):
+        """Start loading in a daemon thread so the worker can accept requests meanwhile."""
+        thread = threading.Thread(target=self._load_quietly, name="model-registry-loader", daemon=True)
+        thread.start()
+        return thread
+
+    def _load_quietly(self):
+        try:
+            self.load()
+        except Exception as e:
+            print(f" ⚠️  Model registry failed to load: {e}")
+
+    @staticmethod
+    def _warm_up(model, encoder):
+        # A first predict_proba call pays for lazy allocations inside the estimators;
+        # do it here instead of on the first user request.
+        model.predict_proba(np.zeros((1, encoder.n_features), dtype=np.float32))
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "variant": self.variant,
+            "model_path": self.model_path,
+            "scorer": type(self.scorer).__name__ if self.scorer is not None else None,
+            "n_features": len(self.expected_columns) if self.expected_columns is not None else None,
+            "error": self.error,
+        }
+
+
+def serving_scorer(model):
+    """The object endpoints call predict_proba on for this model."""
+    from sklearn.ensemble import RandomForestClassifier
+
+    if isinstance(model, RandomForestClassifier) and model.n_outputs_ == 1:
+        return FlatForest.from_sklearn(model, fallback=model)
+    return model
+
+
+def load_encoder(expected_columns, encoder_path=ENCODER_PATH):
+    """Load the persisted encoder, refitting it from expected_columns if missing or stale."""
+    if os.path.exists(encoder_path):
+        import joblib
+
+        encoder = joblib.load(encoder_path)
+        if encoder.columns == list(expected_columns):
+            return encoder
+    return FeatureEncoder.from_columns(expected_columns)
+
+
+model_registry = ModelRegistry(settings.MATCH_MODEL_VARIANT)
+
+
+# Bounds how many requests score at the same time, so CPU-heavy scoring cannot take every
+# threadpool worker and light CRUD requests keep their own threads
+scoring_slots = threading.BoundedSemaphore(settings.SCORING_CONCURRENCY)
+
+
+def get_model_registry() -> ModelRegistry:
+    """FastAPI dependency: the loaded registry (blocks until loading finishes if startup is still running)."""
+    if not model_registry.ready:
+        model_registry.load()
+    return model_registry
@@ -0,0 +1,33 @@
+def evaluate_profits(top_matches, buyer_data=None, commission_rate=0.03, use_client_data=False, return_json=True):
+    results_with_profit = []
+
+    for match in top_matches:
+        price = match["price"]
+
+        # عند البحث عن منازل لعميل
+        if not use_client_data:
+            max_budget = buyer_data["max_budget_DZD"]
+        else:
+            max_budget = match["max_budget_DZD"]
+
+        potential_margin = max(0, max_budget - price)
+        potential_margin_percent = round((potential_margin / max_budget) * 100, 2)
+        commission_profit = round(price * commission_rate)
+
+        enriched = match.copy()
+        enriched["potential_margin_DZD"] = potential_margin
+        enriched["potential_margin_percent"] = potential_margin_percent
+        enriched["commission_profit_DZD"] = commission_profit
+
+        results_with_profit.append(enriched)
+
+    results_sorted_by_profit = sorted(results_with_profit, key=lambda x: x["potential_margin_percent"], reverse=True)
+
+    if not return_json:
+        print("\n💰 Profit Analysis (Sorted by Potential Margin %):")
+        for i, r in enumerate(results_sorted_by_profit):
+            print(f"{i+1}. {r['location']} | Price: {r['price']:,.0f} DZD | Potential Profit: {r['potential_margin_DZD']:,.0f} DZD ({r['potential_margin_percent']}%)")
+            print(f"    Commission: {r['commission_profit_DZD']:,.0f} DZD | Confidence: {r['confidence']:.4f}")
+            print("-" * 60)
+
+    return results_sorted_by_profit
@@ -0,0 +1,712 @@
+import numpy as np
+import pandas as pd
+
+from app.core.responses import dumps
+from app.services.modules.candidate_index import BuyerIndex
+from app.services.modules.explanation import explain_matches
+from app.services.modules.model_utils import (
+    FeatureEncoder, blend_confidences, city_codes, distances_between, distances_km, top_k_indices, train_model
+)
+from app.services.modules.profit import evaluate_profits
+from app.services.modules.timing import span
+
+# Top-level sections of a predict_matches / recommend_houses_for_client payload
+PROPERTY_SECTIONS = ("house_info", "processing_info", "filtering_results", "matches", "profit_analysis", "summary")
+CLIENT_SECTIONS = ("client_info", "processing_info", "filtering_results", "recommendations", "profit_analysis", "summary")
+
+
+def parse_fields(text, sections, profit=True):
+    """
+    The fields= projection of a recommendation payload, as {section: None (all of it) or
+    a frozenset of row fields}. text is comma-separated: "matches" keeps a whole section,
+    "matches.client_id" one field of its rows. profit=False drops profit_analysis.
+    None means no projection at all. Raises ValueError on an unknown section.
+    """
+    if not text and profit:
+        return None
+    fields = {}
+    for name in filter(None, (n.strip() for n in (text or ",".join(sections)).split(","))):
+        section, _, field = name.partition(".")
+        if section not in sections:
+            raise ValueError(f"Unknown field {name!r}: expected one of {', '.join(sections)}, optionally with .<row field>")
+        if not field:
+            fields[section] = None
+        elif fields.setdefault(section, set()) is not None:
+            fields[section].add(field)
+    if not profit:
+        fields.pop("profit_analysis", None)
+    return {section: None if rows is None else frozenset(rows) for section, rows in fields.items()}
+
+def wanted(fields, section, field=None):
+    """Whether a parse_fields projection (None: everything) asks for section, or for that field of its rows"""
+    if fields is None:
+        return True
+    if section not in fields:
+        return False
+    return field is None or fields[section] is None or field in fields[section]
+
+def project(result_json, fields):
+    """The requested sections of a payload (and its "error", if any), with only the requested row fields"""
+    if fields is None:
+        return result_json
+    projected = {}
+    for section, value in result_json.items():
+        if section == "error":
+            projected[section] = value
+        elif section in fields:
+            rows = fields[section]
+            if rows is not None and isinstance(value, list):
+                value = [{k: v for k, v in row.items() if k in rows} for row in value]
+            projected[section] = value
+    return projected
+
+
+def predict_matches(model, expected_columns, house_data, contacts_df, top_n=10, include_explanations=False, return_json=True, encoder=None, buyer_index=None, strict=False, pool=None, fields=None):
+    """
+    Rank the buyers of contacts_df for one house. With a pool (a PooledScorer bound to the
+    snapshot contacts_df was built from, with its RangeIndex) the model runs in the scoring
+    pool on the shared buyer rows instead of in this thread.
+    fields (see parse_fields) limits the JSON payload; what it leaves out is not computed.
+    """
+    # Prepare result structure for JSON output
+    result_json = new_match_result(house_data, len(contacts_df))
+
+    if not return_json:
+        print(f"\n Running predictions for this house:")
+        for key, value in house_data.items():
+            print(f"  {key}: {value}")
+        print(f"\n Scoring {len(contacts_df)} buyers...")
+
+    # Step 1 + 2: Budget filter and distances
+    contacts_df = select_buyers(house_data, contacts_df, result_json, return_json, buyer_index, strict)
+    if contacts_df is None:
+        return project(result_json, fields) if return_json else []
+
+    if pool is not None:
+        with span("predict"):
+            probas = pool.predict_pairs([house_data], [contacts_df.index.to_numpy()], [contacts_df["distance_km"].to_numpy()])[0]
+        result = finish_match_result(result_json, house_data, contacts_df, probas, top_n, include_explanations, return_json, fields)
+        return project(result, fields) if return_json else result
+
+    # Step 3: Encode buyers + house straight into the model's feature matrix
+    if encoder is None:
+        encoder = FeatureEncoder.from_columns(expected_columns)
+    with span("encode"):
+        features = encoder.transform(contacts_df, house_data, contacts_df["distance_km"].to_numpy())
+
+    # Step 4: Predict all at once
+    with span("predict"):
+        probas = model.predict_proba(features)[:, 1]
+
+    result = finish_match_result(result_json, house_data, contacts_df, probas, top_n, include_explanations, return_json, fields)
+    return project(result, fields) if return_json else result
+
+def new_match_result(house_data, initial_buyers_count):
+    """Empty predict_matches payload for one house"""
+    return {
+        "house_info": house_data,
+        "processing_info": {
+            "initial_buyers_count": initial_buyers_count,
+            "house_price": house_data["price_DZD"]
+        },
+        "filtering_results": {},
+        "matches": [],
+        "profit_analysis": []
+    }
+
+def select_buyers(house_data, contacts_df, result_json, return_json=True, buyer_index=None, strict=False):
+    """
+    Keep the buyers who can afford the house and attach their distance to it.
+    buyer_index (a BuyerIndex built on contacts_df) turns the filter into a range lookup;
+    strict also requires min_budget_DZD <= price and the house area within [min_area, max_area].
+    Records the filtering stats in result_json; returns None when nobody is left.
+    """
+    # Step 1: Filter buyers by budget BEFORE any processing
+    house_price = house_data["price_DZD"]
+    initial_count = len(contacts_df)
+
+    with span("filter"):
+        if buyer_index is not None:
+            contacts_df = contacts_df.iloc[buyer_index.eligible(house_price, house_data.get("area"), strict)].copy()
+        elif strict:
+            house_area = house_data.get("area")
+            contacts_df = contacts_df[
+                (contacts_df["max_budget_DZD"] >= house_price) & (contacts_df["min_budget_DZD"] <= house_price)
+                & (contacts_df["min_area"] <= house_area) & (contacts_df["max_area"] >= house_area)
+            ].copy()
+        else:
+            # Remove buyers whose maximum budget is less than house price
+            contacts_df = contacts_df[contacts_df["max_budget_DZD"] >= house_price].copy()
+    if not record_filtering(house_data, result_json, initial_count, len(contacts_df), return_json, strict):
+        return None
+
+    # Step 2: Calculate distances and add to dataframe
+    if not return_json:
+        print(" Calculating distances between buyers and house...")
+
+    with span("distance"):
+        contacts_df["distance_km"] = distances_km(contacts_df["preferred_location"], house_data["location"])
+
+    return contacts_df
+
+def record_filtering(house_data, result_json, initial_count, filtered_count, return_json=True, strict=False):
+    """Filtering stats of select_buyers in result_json; False (with the error set) when nobody is left."""
+    house_price = house_data["price_DZD"]
+    excluded_count = initial_count - filtered_count
+
+    exclusion_reason = f"budget < {house_price:,.0f} DZD"
+    if strict:
+        exclusion_reason = f"budget range excludes {house_price:,.0f} DZD or area range excludes {house_data.get('area')}m²"
+
+    # Update JSON result
+    result_json["filtering_results"] = {
+        "excluded_buyers": excluded_count,
+        "remaining_buyers": filtered_count,
+        "exclusion_reason": exclusion_reason
+    }
+
+    if not return_json:
+        print(f" Budget filtering: {excluded_count} buyers excluded ({exclusion_reason})")
+        print(f" Remaining buyers to evaluate: {filtered_count}")
+
+    if filtered_count == 0:
+        result_json["error"] = "No buyers have sufficient budget for this house"
+        if not return_json:
+            print(" ⚠️  No buyers have sufficient budget for this house!")
+        return False
+    return True
+
+def finish_match_result(result_json, house_data, contacts_df, probas, top_n=10, include_explanations=False, return_json=True, fields=None, rows=None, distances=None):
+    """
+    Turn model probabilities into the predict_matches payload.
+    contacts_df holds the buyers that passed the budget filter (with their distance_km)
+    and probas the match probability of each of them, in the same order. Explanations,
+    buyer details and the profit analysis are only built when fields asks for them;
+    the caller applies the projection itself (project).
+    The bulk path passes every buyer instead, with the candidates' positions in it (rows)
+    and their distances, so only the winners' rows are ever taken out of contacts_df.
+    """
+    # Step 5: Distance scoring and confidence blend for every candidate at once
+    with span("rank"):
+        if distances is None:
+            distances = contacts_df["distance_km"].to_numpy()
+        confidence_model, confidence_distance, confidence = blend_confidences(probas, distances)
+
+        # Step 6: Pick the top_n by confidence; only the winners are turned into dicts
+        winners = top_k_indices(confidence, top_n)
+    winner_rows = contacts_df.iloc[winners if rows is None else rows[winners]]
+    include_profit = wanted(fields, "profit_analysis")
+    include_details = include_explanations and any(wanted(fields, rows, "buyer_details") for rows in ("matches", "profit_analysis"))
+    include_explanations = include_explanations and any(wanted(fields, rows, "explanations") for rows in ("matches", "profit_analysis"))
+    if include_explanations:
+        # Explanations are rendered in one pass over the winners only
+        with span("explain"):
+            explanations = explain_matches(winner_rows, house_data, distances[winners])
+    # The winners' values are taken out column by column with tolist(), so the payload is
+    # made of plain Python types from the start and needs no conversion pass afterwards
+    columns = ["client_id", "preferred_location", "max_budget_DZD"]
+    if include_details:
+        columns += ["min_budget_DZD", "min_area", "max_area", "preferred_property_type", "marital_status", "has_kids"]
+    buyers = {column: winner_rows[column].tolist() for column in columns}
+    scores = zip(distances[winners].tolist(), confidence_model[winners].tolist(),
+                 confidence_distance[winners].tolist(), confidence[winners].tolist())
+    top_matches = []
+    for rank, (distance_km, model_score, distance_score, final_score) in enumerate(scores):
+        result = {
+            "client_id": buyers["client_id"][rank],
+            "preferred_location": buyers["preferred_location"][rank],
+            "distance_km": distance_km,
+            "confidence_model": model_score,
+            "confidence_distance": distance_score,
+            "confidence": final_score
+        }
+
+        if include_explanations:
+            result["explanations"] = explanations[rank]
+        if include_details:
+            result.update({
+                "buyer_details": {
+                    "budget_range": f"{buyers['min_budget_DZD'][rank]:,.0f} - {buyers['max_budget_DZD'][rank]:,.0f} DZD",
+                    "area_range": f"{buyers['min_area'][rank]} - {buyers['max_area'][rank]} m²",
+                    "property_type": buyers['preferred_property_type'][rank],
+                    "marital_status": buyers['marital_status'][rank],
+                    "has_kids": buyers['has_kids'][rank]
+                }
+            })
+
+        top_matches.append(result)
+
+    # Step 7: Display results by confidence (only if not returning JSON)
+    if not return_json:
+        print(f"\n🔍 Top {len(top_matches)} matched buyers (by confidence):")
+        print("=" * 60)
+        for i, r in enumerate(top_matches):
+            print(f"{i+1:2d}. ID {r['client_id']} from {r['preferred_location']} ({r['distance_km']:.1f} km) — Confidence: {r['confidence']:.4f}")
+            print(f"     ML={r['confidence_model']:.4f} | Dist={r['confidence_distance']:.4f}")
+            if include_explanations and "explanations" in r:
+                for explanation in r["explanations"]:
+                    print(f"      {explanation}")
+            print("-" * 60)
+
+    # Step 8: Add price info for profit analysis
+    for r in top_matches:
+        r["price"] = house_data["price_DZD"]
+
+    # Step 9: Profit analysis
+    buyers_with_profit = []
+    for r, max_budget in zip(top_matches if include_profit else [], buyers["max_budget_DZD"]):
+        potential_margin = max(0, max_budget - r["price"])
+        potential_margin_percent = round((potential_margin / max_budget) * 100, 2)
+        commission_profit = round(r["price"] * 0.03)
+
+        enriched = r.copy()
+        enriched["potential_margin_DZD"] = potential_margin
+        enriched["potential_margin_percent"] = potential_margin_percent
+        enriched["commission_profit_DZD"] = commission_profit
+        buyers_with_profit.append(enriched)
+
+    # إعادة الترتيب حسب الربح
+    buyers_with_profit = sorted(buyers_with_profit, key=lambda x: x["potential_margin_percent"], reverse=True)
+
+    if not return_json:
+        print(f"\n💰 Profit Analysis (Sorted by Potential Margin %):")
+        for i, r in enumerate(buyers_with_profit):
+            print(f"{i+1}. BUYER ID: {r['client_id']} | Location: {r['preferred_location']}")
+            print(f"   💰 Potential Profit: {r['potential_margin_DZD']:,.0f} DZD ({r['potential_margin_percent']}%)")
+            print(f"   🏦 Commission: {r['commission_profit_DZD']:,.0f} DZD | Confidence: {r['confidence']:.4f}")
+            print("-" * 60)
+
+    # Update JSON result
+    result_json["matches"] = top_matches
+    result_json["summary"] = {
+        "total_matches": len(top_matches),
+        "top_confidence": top_matches[0]["confidence"] if top_matches else 0
+    }
+    if include_profit:
+        result_json["profit_analysis"] = buyers_with_profit
+        result_json["summary"]["best_profit_margin"] = buyers_with_profit[0]["potential_margin_percent"] if buyers_with_profit else 0
+
+    return result_json if return_json else top_matches
+
+
+# Upper bound on (property, buyer) pairs encoded and sent to predict_proba in one call
+BULK_CHUNK_ROWS = 65536
+
+def iter_bulk_scores(model, encoder, properties_list, contacts_df, return_json=True, chunk_rows=BULK_CHUNK_ROWS, buyer_index=None, strict=False, pool=None):
+    """
+    Score many properties against the same buyers in one pass.
+    Buyer features and cities are encoded once; each property only adds its own columns to a
+    copy of the eligible buyers' rows (no per-property DataFrame is built). Pair rows are
+    accumulated until chunk_rows is reached and scored with a single predict_proba call, then
+    split back per property.
+    Yields (property_index, house_data, result_json, rows, distances, probas) in input order:
+    rows are the eligible buyers' positions in contacts_df, distances their distance_km and
+    probas their match probabilities; all three are None when nobody passed the filter.
+    With a pool (PooledScorer of the snapshot contacts_df comes from) each chunk is scored
+    by the pool's workers from the shared buyer rows; only positions and distances are sent.
+    """
+    contacts_df = contacts_df.reset_index(drop=True)
+    with span("encode"):
+        buyer_matrix = encoder.buyer_block(contacts_df) if pool is None else None
+        buyer_cities = city_codes(contacts_df["preferred_location"])
+    if buyer_index is None:
+        # Built once for the whole batch: each property's filter is then a range lookup
+        buyer_index = BuyerIndex.from_frame(contacts_df)
+    if pool is not None:
+        chunk_rows *= pool.pool.processes  # one chunk keeps every worker busy
+    pending = []  # (index, house_data, result_json, rows, distances, features)
+    pending_rows = 0
+
+    def flush():
+        scored = [p for p in pending if p[5] is not None]
+        with span("predict"):
+            if scored and pool is not None:
+                splits = pool.predict_pairs([p[1] for p in scored], [p[5] for p in scored], [p[4] for p in scored])
+            elif scored:
+                probas = model.predict_proba(np.vstack([p[5] for p in scored]))[:, 1]
+                splits = np.split(probas, np.cumsum([len(p[5]) for p in scored])[:-1])
+            else:
+                splits = []
+        split_iter = iter(splits)
+        for index, house_data, result_json, rows, distances, features in pending:
+            probas = None if features is None else next(split_iter)
+            yield index, house_data, result_json, rows, distances, probas
+        pending.clear()
+
+    for i, house_data in enumerate(properties_list, 1):
+        result_json = new_match_result(house_data, len(contacts_df))
+        with span("filter"):
+            rows = buyer_index.eligible(house_data["price_DZD"], house_data.get("area"), strict)
+        if not record_filtering(house_data, result_json, len(contacts_df), len(rows), return_json, strict):
+            pending.append((i, house_data, result_json, None, None, None))
+            continue
+        with span("distance"):
+            distances = distances_between(buyer_cities[rows], city_codes(house_data["location"]))
+
+        # contacts_df has a RangeIndex, so rows are positions in buyer_matrix too
+        if pool is None:
+            features = buyer_matrix[rows]
+            with span("encode"):
+                encoder.fill_pairs(features, house_data, distances)
+        else:
+            features = rows  # encoded by the pool's workers
+        pending.append((i, house_data, result_json, rows, distances, features))
+        pending_rows += len(features)
+
+        if pending_rows >= chunk_rows:
+            yield from flush()
+            pending_rows = 0
+
+    yield from flush()
+
+def iter_bulk_predictions(model, encoder, properties_list, contacts_df, top_n=10, include_explanations=False, return_json=True, chunk_rows=BULK_CHUNK_ROWS, buyer_index=None, strict=False, pool=None, fields=None):
+    """
+    iter_bulk_scores turned into payloads: yields (property_index, house_data, prediction_result)
+    in input order, where prediction_result is what predict_matches would have returned
+    before the fields projection.
+    """
+    contacts_df = contacts_df.reset_index(drop=True)
+    scores = iter_bulk_scores(model, encoder, properties_list, contacts_df, return_json, chunk_rows, buyer_index, strict, pool)
+    for index, house_data, result_json, rows, distances, probas in scores:
+        if probas is None:
+            yield index, house_data, result_json if return_json else []
+        else:
+            yield index, house_data, finish_match_result(
+                result_json, house_data, contacts_df, probas, top_n, include_explanations, return_json, fields,
+                rows=rows, distances=distances
+            )
+
+def get_bulk_recommendations(
+    properties_source,
+    top_n=10,
+    show_explanations=True,
+    dataset_path="./app/services/data/balanced_contacts_20k.csv",
+    model_path="./app/services/ml_models/match_predictor.pkl",
+    columns_path="./app/services/ml_models/match_columns.pkl",
+    contacts_path=None,
+    return_json=True,
+    contacts_df=None,
+    model=None,
+    expected_columns=None,
+    encoder=None,
+    buyer_index=None,
+    strict=False,
+    pool=None,
+    fields=None
+):
+    """
+    Accepts either a list of property dicts or a CSV file path for properties_source.
+    If a string is passed, it is treated as a CSV file path and loaded.
+    Returns recommendations for multiple properties at once.
+    If return_json=True, returns structured JSON data instead of printing.
+    Pass an already loaded model and expected_columns (e.g. from the model registry)
+    and/or a contacts_df (e.g. from the client store) to skip loading them from disk;
+    buyer_index must then be built on that same contacts_df (ClientSnapshot.buyer_index is),
+    and so must pool (see ScoringPool.session) when the scoring pool is used.
+    fields (see parse_fields) projects every prediction_result.
+    """
+    import csv
+
+    # Prepare JSON result structure
+    bulk_result = {
+        "processing_info": {
+            "total_properties": 0,
+            "model_path": model_path,
+            "dataset_path": dataset_path
+        },
+        "properties_results": [],
+        "summary": {}
+    }
+
+    # Load model and columns once for all properties (more efficient)
+    if model is None or expected_columns is None:
+        if not return_json:
+            print(" Loading ML model and training data...")
+        model, expected_columns = train_model(dataset_path, model_path, columns_path)
+    if encoder is None:
+        encoder = FeatureEncoder.from_columns(expected_columns)
+
+    # Load contacts data once
+    if contacts_df is not None:
+        contacts_df = contacts_df.reset_index(drop=True)
+    elif contacts_path:
+        contacts_df = pd.read_csv(contacts_path)
+    else:
+        contacts_df = pd.read_csv(dataset_path)
+
+    bulk_result["processing_info"]["total_buyers"] = len(contacts_df)
+
+    if not return_json:
+        print(f" Loaded {len(contacts_df)} buyer contacts")
+
+    # If properties_source is a string, treat as CSV file path
+    if isinstance(properties_source, str):
+        if not return_json:
+            print(f" Loading properties from CSV file: {properties_source}")
+        with open(properties_source, newline='', encoding='utf-8') as csvfile:
+            reader = csv.DictReader(csvfile)
+            properties_list = [dict(row) for row in reader]
+
+        # Convert numeric fields from str to int/float
+        for prop in properties_list:
+            prop["price_DZD"] = float(prop["price_DZD"])
+            prop["area"] = int(prop["area"])
+            prop["rooms"] = int(prop["rooms"])
+            prop["schools_nearby"] = int(prop["schools_nearby"])
+            prop["hospitals_nearby"] = int(prop["hospitals_nearby"])
+            prop["parks_nearby"] = int(prop["parks_nearby"])
+            prop["public_transport_score"] = int(prop["public_transport_score"])
+
+        if not return_json:
+            print(f" Loaded {len(properties_list)} properties from CSV")
+    else:
+        properties_list = properties_source
+        if not return_json:
+            print(f" Processing {len(properties_list)} properties from list")
+
+    bulk_result["processing_info"]["total_properties"] = len(properties_list)
+
+    if not return_json:
+        print(f"\n🏠 BULK RECOMMENDATIONS: Processing {len(properties_list)} properties...")
+        print("=" * 80)
+
+    results = []
+    total_matches = 0
+    predictions = iter_bulk_predictions(
+        model, encoder, properties_list, contacts_df,
+        top_n=top_n, include_explanations=show_explanations, return_json=return_json,
+        buyer_index=buyer_index, strict=strict, pool=pool, fields=fields
+    )
+    for i, house_data, matches in predictions:
+        total_matches += len(matches.get("matches", [])) if return_json else len(matches)
+        # Add property info to results for easier tracking
+        property_result = {
+            "property_info": house_data,
+            "prediction_result": project(matches, fields) if return_json else matches,
+            "property_index": i
+        }
+        results.append(property_result)
+
+        if not return_json:
+            print(f"✅ Completed property {i}/{len(properties_list)}: {house_data.get('location', 'Unknown')} - {house_data.get('price_DZD', 0):,.0f} DZD")
+
+    # Add results to bulk_result
+    bulk_result["properties_results"] = results
+
+    # Calculate summary statistics
+    bulk_result["summary"] = bulk_summary(len(results), total_matches)
+
+    if not return_json:
+        print(f"\n🎯 BULK PROCESSING COMPLETE!")
+        print(f"📊 Processed {len(results)} properties successfully")
+        print(f"📈 Total matches found: {total_matches}")
+        print("=" * 80)
+
+    return bulk_result if return_json else results
+
+def bulk_summary(properties_processed, total_matches):
+    """The "summary" block of a bulk run"""
+    return {
+        "total_properties_processed": properties_processed,
+        "total_matches_found": total_matches,
+        "average_matches_per_property": round(total_matches / properties_processed, 2) if properties_processed else 0
+    }
+
+def iter_bulk_ndjson(properties_list, contacts_df, model, encoder, top_n=10, show_explanations=True, buyer_index=None, strict=False, pool=None, fields=None):
+    """
+    Streaming variant of get_bulk_recommendations: yields one NDJSON line (str) per property,
+    shaped like an entry of "properties_results", as soon as that property is scored, then a
+    last line {"summary": ..., "processing_info": ...}. Nothing is kept once a line is sent.
+    """
+    contacts_df = contacts_df.reset_index(drop=True)
+    predictions = iter_bulk_predictions(
+        model, encoder, properties_list, contacts_df,
+        top_n=top_n, include_explanations=show_explanations, return_json=True,
+        buyer_index=buyer_index, strict=strict, pool=pool, fields=fields
+    )
+    processed, total_matches = 0, 0
+    for i, house_data, matches in predictions:
+        processed += 1
+        total_matches += len(matches.get("matches", []))
+        line = {"property_info": house_data, "prediction_result": project(matches, fields), "property_index": i}
+        with span("serialize"):
+            line = dumps(line) + b"\n"
+        yield line
+
+    yield dumps({
+        "summary": bulk_summary(processed, total_matches),
+        "processing_info": {"total_properties": len(properties_list), "total_buyers": len(contacts_df)}
+    }) + b"\n"
+
+
+def recommend_houses_for_client(client_id, buyers_df, houses_df, model, expected_columns, top_n=5, include_explanations=True, return_json=True, encoder=None, strict=False, fields=None, pool=None, position=None):
+    # fields (see parse_fields) limits the JSON payload; what it leaves out is not computed.
+    # With a pool (PooledScorer) and the client's row position in its snapshot, the model
+    # runs in the scoring pool on the shared buyer row, one pair per remaining house.
+    # Prepare JSON result structure
+    result_json = {
+        "client_info": {},
+        "processing_info": {
+            "initial_houses_count": len(houses_df)
+        },
+        "filtering_results": {},
+        "recommendations": [],
+        "profit_analysis": []
+    }
+
+    # استخراج بيانات العميل المحدد
+    client_row = buyers_df[buyers_df["client_id"] == client_id]
+    if client_row.empty:
+        error_msg = f"No client found with ID: {client_id}"
+        if return_json:
+            result_json["error"] = error_msg
+            return project(result_json, fields)
+        else:
+            print(error_msg)
+            return []
+
+    buyer_data = client_row.iloc[0].to_dict()
+    result_json["client_info"] = {
+        "client_id": client_id,
+        "preferred_location": buyer_data['preferred_location'],
+        "budget_range": f"{buyer_data['min_budget_DZD']:,.0f} - {buyer_data['max_budget_DZD']:,.0f} DZD",
+        "area_preference": f"{buyer_data['min_area']} - {buyer_data['max_area']} m²",
+        "property_type": buyer_data['preferred_property_type'],
+        "has_kids": buyer_data['has_kids']
+    }
+
+    if not return_json:
+        print(f"\n Recommending houses for CLIENT ID {client_id} from {buyer_data['preferred_location']}:")
+        print(f"  Budget: {buyer_data['min_budget_DZD']:,.0f} - {buyer_data['max_budget_DZD']:,.0f} DZD")
+        print(f"  Area preference: {buyer_data['min_area']} - {buyer_data['max_area']} m²")
+        print(f"  Type: {buyer_data['preferred_property_type']} | Has kids: {buyer_data['has_kids']}")
+
+    # Filter houses by budget BEFORE any processing
+    max_budget = buyer_data["max_budget_DZD"]
+    initial_house_count = len(houses_df)
+
+    # Remove houses that exceed buyer's maximum budget (and, in strict mode, the ones
+    # below the minimum budget or outside the area range)
+    with span("filter"):
+        if strict:
+            houses_filtered = houses_df[
+                (houses_df["price_DZD"] <= max_budget) & (houses_df["price_DZD"] >= buyer_data["min_budget_DZD"])
+                & (houses_df["area"] >= buyer_data["min_area"]) & (houses_df["area"] <= buyer_data["max_area"])
+            ].copy()
+        else:
+            houses_filtered = houses_df[houses_df["price_DZD"] <= max_budget].copy()
+    filtered_house_count = len(houses_filtered)
+    excluded_house_count = initial_house_count - filtered_house_count
+
+    exclusion_reason = f"price > {max_budget:,.0f} DZD"
+    if strict:
+        exclusion_reason = (
+            f"price outside {buyer_data['min_budget_DZD']:,.0f}-{max_budget:,.0f} DZD"
+            f" or area outside {buyer_data['min_area']}-{buyer_data['max_area']}m²"
+        )
+
+    result_json["filtering_results"] = {
+        "excluded_houses": excluded_house_count,
+        "remaining_houses": filtered_house_count,
+        "exclusion_reason": exclusion_reason
+    }
+
+    if not return_json:
+        print(f" Budget filtering: {excluded_house_count} houses excluded ({exclusion_reason})")
+        print(f" Remaining houses to evaluate: {filtered_house_count}")
+
+    if filtered_house_count == 0:
+        error_msg = "No houses are within this buyer's budget!"
+        if return_json:
+            result_json["error"] = error_msg
+            return project(result_json, fields)
+        else:
+            print(f" ⚠️  {error_msg}")
+            return []
+
+    houses_copy = houses_filtered.copy()
+
+    # حساب المسافات بين كل منزل وموقع العميل
+    with span("distance"):
+        houses_copy["distance_km"] = distances_km(buyer_data["preferred_location"], houses_copy["location"])
+
+    if pool is not None and position is not None:
+        with span("predict"):
+            distances = houses_copy["distance_km"].to_numpy()
+            probas = np.concatenate(pool.predict_pairs(
+                houses_copy.to_dict("records"), [np.array([position])] * len(distances), np.split(distances, len(distances))
+            ))
+    else:
+        # تجهيز البيانات للتنبؤ: العميل (سجل واحد) مع كل منزل مباشرة في مصفوفة الميزات
+        if encoder is None:
+            encoder = FeatureEncoder.from_columns(expected_columns)
+        with span("encode"):
+            features = encoder.transform(buyer_data, houses_copy, houses_copy["distance_km"].to_numpy())
+
+        # التنبؤ
+        with span("predict"):
+            probas = model.predict_proba(features)[:, 1]
+    with span("rank"):
+        distances = houses_copy["distance_km"].to_numpy()
+        confidence_model, confidence_distance, confidence = blend_confidences(probas, distances)
+
+        # إزالة التكرار بناءً على خصائص المنزل: keep the best row of each identical listing
+        # (the first one on ties), then the top_n of those by confidence
+        listing_keys = [houses_copy[c].to_numpy() for c in ("location", "price_DZD", "area", "property_type")]
+        best_per_listing = pd.Series(confidence).groupby(listing_keys, sort=False, dropna=False).idxmax().to_numpy()
+        best_per_listing = np.sort(best_per_listing)
+        winners = best_per_listing[top_k_indices(confidence[best_per_listing], top_n)]
+
+    # 1. الترتيب حسب الثقة: only the winners are turned into dicts
+    winner_rows = houses_copy.iloc[winners]
+    include_profit = wanted(fields, "profit_analysis")
+    include_explanations = include_explanations and any(wanted(fields, rows, "explanations") for rows in ("recommendations", "profit_analysis"))
+    if include_explanations:
+        with span("explain"):
+            explanations = explain_matches(buyer_data, winner_rows, distances[winners])
+    houses = {field: winner_rows[field].tolist() for field in ("location", "price_DZD", "area", "property_type")}
+    scores = zip(winners.tolist(), distances[winners].tolist(), confidence_model[winners].tolist(),
+                 confidence_distance[winners].tolist(), confidence[winners].tolist())
+    top_matches = []
+    for rank, (i, distance_km, model_score, distance_score, final_score) in enumerate(scores):
+        result = {
+            "house_index": i,
+            "location": houses["location"][rank],
+            "price": houses["price_DZD"][rank],
+            "area": houses["area"][rank],
+            "type": houses["property_type"][rank],
+            "distance_km": distance_km,
+            "confidence_model": model_score,
+            "confidence_distance": distance_score,
+            "confidence": final_score
+        }
+
+        if include_explanations:
+            result["explanations"] = explanations[rank]
+
+        top_matches.append(result)
+
+    if not return_json:
+        print(f"\n Top {top_n} recommended houses for client {client_id} (by confidence):\n" + "-"*60)
+        for i, r in enumerate(top_matches):
+            print(f"{i+1}. House in {r['location']} — {r['price']:,.0f} DZD, {r['area']}m², {r['type']}, {r['distance_km']:.1f} km")
+            print(f"   Confidence: {r['confidence']:.4f} (Model={r['confidence_model']:.4f}, Dist={r['confidence_distance']:.4f})")
+            if include_explanations:
+                for ex in r["explanations"]:
+                    print(f"    {ex}")
+            print("-" * 60)
+
+    # Update JSON result
+    result_json["recommendations"] = top_matches
+    result_json["summary"] = {
+        "total_recommendations": len(top_matches),
+        "top_confidence": top_matches[0]["confidence"] if top_matches else 0
+    }
+
+    # 2. التحليل حسب الربح
+    if include_profit:
+        profit_analysis = evaluate_profits(top_matches, buyer_data, return_json=return_json)
+        result_json["profit_analysis"] = profit_analysis
+        result_json["summary"]["best_profit_margin"] = profit_analysis[0]["potential_margin_percent"] if profit_analysis else 0
+
+    return project(result_json, fields) if return_json else top_matches
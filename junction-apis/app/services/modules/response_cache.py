@@ -0,0 +1,156 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from fastapi import Request, Response
+from sqlalchemy import func
+
+from app.core.config import settings
+from app.core.responses import dumps, gzip_vary, json_response
+from app.models.property import Property
+from app.services.modules.timing import span
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header lists etag (weak comparison, as for GET) or is "*"."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+class DataVersion:
+    """
+    Version of the data a recommendation is computed from. Property writes bump the
+    property counter; client writes already produce a new client snapshot version.
+    The boot id keeps two API processes from ever sharing a version (and so an ETag)
+    for different data. Writes made elsewhere (another process, the import scripts,
+    the bulk job worker) reach this one through the client store catch-up and, for
+    properties, the row count and latest timestamps of the properties table, read at
+    most every refresh_seconds.
+    """
+
+    def __init__(self, refresh_seconds=settings.RESPONSE_CACHE_TTL_SECONDS):
+        self.boot_id = uuid.uuid4().hex[:8]
+        self.properties = 0
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._stored = None  # (monotonic read time, version of the properties table)
+
+    def bump_properties(self):
+        with self._lock:
+            self.properties += 1
+
+    def stored_properties(self, db):
+        stored = self._stored
+        if stored is None or time.monotonic() - stored[0] >= self.refresh_seconds:
+            count, created, updated = db.query(
+                func.count(Property.id), func.max(Property.created_at), func.max(Property.updated_at)
+            ).one()
+            stored = self._stored = (time.monotonic(), f"{count}.{created}.{updated}")
+        return stored[1]
+
+    def current(self, clients, db):
+        return f"{self.boot_id}.{clients.version}.{self.properties}.{self.stored_properties(db)}"
+
+
+class ResponseCache:
+    """
+    In-process LRU + TTL cache of rendered JSON responses. Keys carry the data version,
+    so a write never has to find and drop entries: the old ones simply stop being asked
+    for and age out. The ETag is derived from the key, so a client revalidating an
+    unchanged view gets a 304 without the response being computed again; only while the
+    entry is cached, so that no view is confirmed for longer than the TTL.
+    """
+
+    def __init__(self, max_entries=settings.RESPONSE_CACHE_SIZE, ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, body bytes)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    @staticmethod
+    def etag(key):
+        return '"' + hashlib.sha1(repr(key).encode()).hexdigest()[:20] + '"'
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def fresh(self, key):
+        """Whether key is cached and not expired (not counted as a lookup)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] > time.monotonic()
+
+    def put(self, key, body):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+    def respond(self, request: Request, key, compute, media_type="application/json", render=dumps, headers=None):
+        """
+        Response for key: 304 when the client already holds it (If-None-Match) and it is
+        still cached, the cached body when there is one, otherwise render(compute()) (JSON of plain Python types by
+        default) rendered once. Large JSON bodies are gzipped for clients that accept it.
+        """
+        etag = self.etag(key)
+        if etag_matches(request.headers.get("if-none-match"), etag) and self.fresh(key):
+            self.not_modified += 1
+            return Response(status_code=304, headers=gzip_vary({"ETag": etag}, media_type))
+
+        body = self.get(key)
+        status = "hit"
+        if body is None:
+            payload = compute()
+            with span("serialize"):
+                body = render(payload)
+            self.put(key, body)
+            status = "miss"
+        headers = {**(headers or {}), "ETag": etag, "X-Cache": status}
+        if media_type != "application/json":
+            return Response(content=body, media_type=media_type, headers=headers)
+        return json_response(request, None, headers=headers, body=body)
+
+
+data_version = DataVersion()
+response_cache = ResponseCache()
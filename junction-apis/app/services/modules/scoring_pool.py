@@ -0,0 +1,338 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from app.core.config import settings
+
+# A task is a run of consecutive properties of about this many (property, buyer) pairs
+TASK_ROWS = 16384
+# After a worker died, the pool is started again by the next session, but not more often than this
+RESTART_SECONDS = 30
+
+
+class SharedArrays:
+    """
+    A few NumPy arrays laid out back to back in one shared memory block. The creating
+    process owns the block (unlink); other processes attach to it by name.
+    """
+
+    def __init__(self, shm, layout, owner):
+        self.shm = shm
+        self.layout = layout  # [(key, dtype str, shape, byte offset)]
+        self.owner = owner
+        self.arrays = {
+            key: np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+            for key, dtype, shape, offset in layout
+        }
+
+    @property
+    def spec(self):
+        """What a worker needs to attach: (block name, layout)."""
+        return self.shm.name, self.layout
+
+    def __getitem__(self, key):
+        return self.arrays[key]
+
+    @classmethod
+    def create(cls, **shapes):
+        """Allocate one block for arrays given as key=(dtype, shape)."""
+        layout, size = [], 0
+        for key, (dtype, shape) in shapes.items():
+            dtype = np.dtype(dtype)
+            size = -(-size // dtype.alignment) * dtype.alignment
+            layout.append((key, dtype.str, tuple(shape), size))
+            size += dtype.itemsize * int(np.prod(shape))
+        return cls(shared_memory.SharedMemory(create=True, size=max(size, 1)), layout, owner=True)
+
+    @classmethod
+    def attach(cls, spec):
+        name, layout = spec
+        return cls(shared_memory.SharedMemory(name=name), layout, owner=False)
+
+    def release(self):
+        self.arrays = {}
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# --- Worker process side -----------------------------------------------------------------
+
+_worker = {}
+
+
+def _init_worker(variant, model_path, columns_path, dataset_path):
+    # Each worker loads the model artifact once; every task after that only moves indices
+    from app.services.modules.model_utils import ModelRegistry
+
+    registry = ModelRegistry(variant, model_path, columns_path, dataset_path).load()
+    _worker.update(scorer=registry.scorer, encoder=registry.encoder, blocks={})
+
+
+def _attached(spec, keep=4):
+    blocks = _worker["blocks"]
+    block = blocks.get(spec[0])
+    if block is None:
+        # Keep the last few blocks mapped; older client snapshots are not coming back
+        while len(blocks) >= keep:
+            blocks.pop(next(iter(blocks))).release()
+        block = blocks[spec[0]] = SharedArrays.attach(spec)
+    return block
+
+
+def _score_pairs(scorer, encoder, buyer_matrix, pairs, houses, bounds):
+    """Score the pairs of a run of properties; probabilities are written into pairs["proba"]."""
+    start, end = bounds[0][0], bounds[-1][1]
+    features = buyer_matrix[pairs["position"][start:end]]
+    for house_data, (house_start, house_end) in zip(houses, bounds):
+        encoder.fill_pairs(features[house_start - start:house_end - start], house_data, pairs["distance"][house_start:house_end])
+    pairs["proba"][start:end] = scorer.predict_proba(features)[:, 1]
+    return end - start
+
+
+def _score_range(buyers_spec, pairs_spec, houses, bounds):
+    buyer_matrix = _attached(buyers_spec)["features"]
+    pairs = SharedArrays.attach(pairs_spec)
+    try:
+        return _score_pairs(_worker["scorer"], _worker["encoder"], buyer_matrix, pairs, houses, bounds)
+    finally:
+        pairs.release()
+
+
+# --- API process side --------------------------------------------------------------------
+
+class PooledScorer:
+    """
+    Scores (property, buyer) pairs of one client snapshot in the pool. Callers pass the
+    buyers' row positions in the snapshot and the pair distances; the rows themselves are
+    already in shared memory, so a task only carries house dicts and index ranges.
+    If a worker dies the request is scored in this thread instead.
+    """
+
+    def __init__(self, pool, executor, buyers, scorer, encoder):
+        self.pool = pool
+        self.executor = executor
+        self.buyers = buyers
+        self.scorer = scorer
+        self.encoder = encoder
+
+    def predict_pairs(self, houses, positions, distances):
+        """Match probability of every pair, as one array per house (same order as the inputs)."""
+        lengths = [len(p) for p in positions]
+        ends = np.cumsum(lengths)
+        pairs = SharedArrays.create(
+            position=(np.intp, (int(ends[-1]) if lengths else 0,)),
+            distance=(np.float64, (int(ends[-1]) if lengths else 0,)),
+            proba=(np.float64, (int(ends[-1]) if lengths else 0,)),
+        )
+        try:
+            if lengths:
+                pairs["position"][:] = np.concatenate(positions)
+                pairs["distance"][:] = np.concatenate(distances)
+            runs = list(_runs(lengths, self.pool.task_rows))
+            try:
+                futures = [
+                    self.executor.submit(_score_range, self.buyers.spec, pairs.spec, [houses[i] for i in run], bounds)
+                    for run, bounds in runs
+                ]
+                for future in futures:
+                    future.result()
+            except BrokenProcessPool:
+                self.pool.broken(self.executor)
+                for run, bounds in runs:
+                    _score_pairs(self.scorer, self.encoder, self.buyers["features"], pairs, [houses[i] for i in run], bounds)
+            return np.split(pairs["proba"].copy(), ends[:-1])
+        finally:
+            pairs.release()
+
+
+def _runs(lengths, task_rows):
+    """Group consecutive houses into tasks of about task_rows pairs: (house indices, pair bounds)."""
+    run, bounds, rows, start = [], [], 0, 0
+    for i, length in enumerate(lengths):
+        if length == 0:
+            continue
+        run.append(i)
+        bounds.append((start, start + length))
+        start += length
+        rows += length
+        if rows >= task_rows:
+            yield run, bounds
+            run, bounds, rows = [], [], 0
+    if run:
+        yield run, bounds
+
+
+class ScoringPool:
+    """
+    Optional process pool that scores bulk, single property and client recommendations on
+    every core instead of the request thread. The encoded buyer matrix of the current client
+    snapshot is published once into shared memory and each worker loads the model once at
+    start-up, so per-request traffic is limited to house dicts and pair indices.
+
+    Disabled when processes is 0 (the default: the API then scores in-process). When a
+    worker dies the pool is shut down and the next session starts a new one in the
+    background; requests score in-process meanwhile.
+    """
+
+    def __init__(self, processes=settings.SCORING_PROCESSES, task_rows=TASK_ROWS):
+        self.processes = processes
+        self.task_rows = task_rows
+        self.executor = None
+        self.ready = False
+        self.error = None
+        self._lock = threading.Lock()
+        self._registry = None    # what the workers loaded, kept to restart them
+        self._restart_at = None  # monotonic time a broken pool may be started again
+        self._published = None   # (snapshot, encoder, SharedArrays)
+        self._users = {}         # block name -> sessions using it
+        self._retired = []       # blocks superseded while still in use
+
+    @property
+    def enabled(self):
+        return self.processes > 0
+
+    def start(self, registry):
+        """Spawn the workers and wait until they have loaded the model."""
+        with self._lock:
+            if not self.enabled or self.executor is not None:
+                return self
+            # spawn, not fork: the API process runs threads (anyio, loaders) that fork would not copy
+            executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(registry.variant, registry.model_path, registry.columns_path, registry.dataset_path),
+            )
+            try:
+                for future in [executor.submit(_ping) for _ in range(self.processes)]:
+                    future.result()
+            except Exception as e:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.error = str(e)
+                raise
+            self.executor = executor
+            self._registry = registry
+            self._restart_at = None
+            self.error = None
+            self.ready = True
+        return self
+
+    def start_in_background(self, registry):
+        def run():
+            try:
+                self.start(registry.load())
+            except Exception as e:
+                print(f" ⚠️  Scoring pool failed to start: {e}")
+
+        thread = threading.Thread(target=run, name="scoring-pool-starter", daemon=True)
+        thread.start()
+        return thread
+
+    def broken(self, executor):
+        """A worker of executor died: stop dispatching to it; the next session starts a new pool."""
+        with self._lock:
+            if self.executor is not executor:
+                return  # already replaced
+            self.executor = None
+            self.ready = False
+            self.error = "worker process terminated abruptly"
+            self._restart_at = time.monotonic()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _restart(self):
+        """Start a broken pool again in the background, at most every RESTART_SECONDS."""
+        with self._lock:
+            if self._restart_at is None or time.monotonic() < self._restart_at:
+                return
+            self._restart_at = time.monotonic() + RESTART_SECONDS
+            registry = self._registry
+
+        def run():
+            try:
+                self.start(registry)
+            except Exception as e:
+                print(f" ⚠️  Scoring pool failed to restart: {e}")
+
+        threading.Thread(target=run, name="scoring-pool-restarter", daemon=True).start()
+
+    @contextmanager
+    def session(self, snapshot, encoder):
+        """
+        PooledScorer for snapshot (rows in to_frame() order), or None when the pool is
+        disabled or not started yet. The snapshot's shared block stays alive until exit.
+        """
+        executor, registry = self.executor, self._registry
+        if not self.ready or executor is None:
+            self._restart()
+            yield None
+            return
+        block = self._acquire(snapshot, encoder)
+        try:
+            yield PooledScorer(self, executor, block, registry.scorer, encoder)
+        finally:
+            self._release(block)
+
+    def _acquire(self, snapshot, encoder):
+        with self._lock:
+            published = self._published
+            if published is None or published[0] is not snapshot or published[1] is not encoder:
+                matrix = encoder.buyer_block(snapshot.to_frame())
+                block = SharedArrays.create(features=(matrix.dtype, matrix.shape))
+                block["features"][:] = matrix
+                if published is not None:
+                    self._retire(published[2])
+                published = self._published = (snapshot, encoder, block)
+            block = published[2]
+            self._users[block.shm.name] = self._users.get(block.shm.name, 0) + 1
+            return block
+
+    def _release(self, block):
+        with self._lock:
+            self._users[block.shm.name] -= 1
+            for retired in [b for b in self._retired if not self._users.get(b.shm.name)]:
+                self._retired.remove(retired)
+                self._users.pop(retired.shm.name, None)
+                retired.release()
+
+    def _retire(self, block):
+        if self._users.get(block.shm.name):
+            self._retired.append(block)
+        else:
+            self._users.pop(block.shm.name, None)
+            block.release()
+
+    def shutdown(self):
+        with self._lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=True, cancel_futures=True)
+                self.executor = None
+            self.ready = False
+            blocks = self._retired + ([self._published[2]] if self._published else [])
+            self._published, self._retired, self._users = None, [], {}
+        for block in blocks:
+            block.release()
+
+    def status(self):
+        published = self._published
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "processes": self.processes,
+            "published_clients": len(published[0]) if published else None,
+            "error": self.error,
+        }
+
+
+def _ping():
+    return os.getpid()
+
+
+scoring_pool = ScoringPool()
@@ -0,0 +1,186 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from starlette.routing import Match
+
+# Histogram bucket upper bounds, in seconds
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Spans of the request being served. The list is created by the middleware; sync endpoints
+# and dependencies run in the threadpool with a copy of the context, so they append to it too.
+_request_spans = ContextVar("request_spans", default=None)
+
+
+def _label_text(labelnames, values):
+    if not labelnames:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labelnames, escaped)) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[k] for k in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [(self.name, _label_text(self.labelnames, key), value) for key, value in sorted(values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=REQUEST_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [count per bucket (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, **labels):
+        key = tuple(labels[k] for k in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, seconds)] += 1
+            series[1] += seconds
+
+    def samples(self):
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        out = []
+        for key, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                out.append((f"{self.name}_bucket", _label_text(self.labelnames + ("le",), key + (le,)), cumulative))
+            labels = _label_text(self.labelnames, key)
+            out.append((f"{self.name}_sum", labels, round(total, 6)))
+            out.append((f"{self.name}_count", labels, cumulative))
+        return out
+
+
+class Metrics:
+    """Process-wide request and pipeline-stage metrics, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.stage_seconds = Histogram(
+            "junction_stage_duration_seconds", "Time spent in one recommendation pipeline stage", ("stage",), STAGE_BUCKETS
+        )
+        self.request_seconds = Histogram(
+            "junction_request_duration_seconds", "Request latency, until the last body byte", ("route", "method")
+        )
+        self.requests = Counter("junction_requests_total", "Requests served", ("route", "method", "status"))
+        self.in_flight = Gauge("junction_requests_in_flight", "Requests being served", ("route", "method"))
+
+    def render(self):
+        lines = []
+        for metric in (self.requests, self.in_flight, self.request_seconds, self.stage_seconds):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {value}" for name, labels, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def record_span(name, seconds):
+    metrics.stage_seconds.observe(seconds, stage=name)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((name, seconds))
+
+
+@contextmanager
+def span(name):
+    """Time a pipeline stage: aggregated into /metrics and reported in the request's Server-Timing."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - start)
+
+
+def server_timing(spans, total_seconds):
+    """Server-Timing header value: one entry per stage name (repeated spans are summed), then total."""
+    durations = {}
+    for name, seconds in spans:
+        durations[name] = durations.get(name, 0.0) + seconds
+    durations["total"] = total_seconds
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in durations.items())
+
+
+def route_template(request):
+    """The path template of the route serving request, so metrics are not labelled per id."""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+async def record_request_timings(request, call_next):
+    """
+    HTTP middleware: collects the spans of each request into a Server-Timing header
+    (stages finished before the response headers, plus total), and records route
+    counts, in-flight requests and latency for /metrics.
+    """
+    labels = {"route": route_template(request), "method": request.method}
+    spans = []
+    token = _request_spans.set(spans)
+    start = time.perf_counter()
+    metrics.in_flight.inc(**labels)
+
+    def finish(status):
+        metrics.in_flight.dec(**labels)
+        metrics.requests.inc(status=status, **labels)
+        metrics.request_seconds.observe(time.perf_counter() - start, **labels)
+
+    try:
+        response = await call_next(request)
+    except Exception:
+        finish(500)
+        raise
+    finally:
+        _request_spans.reset(token)
+    response.headers["Server-Timing"] = server_timing(spans, time.perf_counter() - start)
+
+    body = response.body_iterator
+
+    async def body_then_finish():
+        # Streaming responses keep working after the headers are sent; count them until the end
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            finish(response.status_code)
+
+    response.body_iterator = body_then_finish()
+    return response
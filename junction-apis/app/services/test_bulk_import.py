@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.client import Client
+from app.services.modules.bulk_import import CLIENT_IMPORT, import_csv
+
+CONTACTS_PATH = "./app/services/data/Synthetic_Contacts__2000_Buyers_.csv"
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'import.db'}")
+    Base.metadata.create_all(engine, tables=[Client.__table__])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def contacts():
+    return pd.read_csv(CONTACTS_PATH, dtype=str, keep_default_na=False).head(300)
+
+
+def test_import_rejects_bad_rows_and_upserts_the_rest(db, contacts, tmp_path):
+    csv_path = tmp_path / "contacts.csv"
+    bad = contacts.copy()
+    bad.loc[3, "min_area"] = "abc"
+    bad.loc[4, "max_budget_DZD"] = "1"
+    bad.to_csv(csv_path, index=False)
+
+    dry = import_csv(db, csv_path, CLIENT_IMPORT, batch_size=100, dry_run=True, verbose=False)
+    assert (dry.inserted, dry.updated, db.query(Client).count()) == (298, 0, 0)
+
+    report = import_csv(db, csv_path, CLIENT_IMPORT, batch_size=100, verbose=False)
+    assert (report.rows_read, report.inserted, report.updated, report.batches) == (300, 298, 0, 3)
+    assert [(e["row"], e["key"]) for e in report.errors] == [(5, "CLT0004"), (6, "CLT0005")]
+    assert db.query(Client).count() == 298
+
+    # Re-import with a changed budget and without the weight columns: an update that keeps them
+    changed = contacts.drop(columns=[c for c in contacts.columns if c.startswith("weight_")])
+    changed.loc[0, "max_budget_DZD"] = "99999999"
+    changed.to_csv(csv_path, index=False)
+    report = import_csv(db, csv_path, CLIENT_IMPORT, batch_size=100, verbose=False)
+    assert (report.inserted, report.updated, report.errors) == (2, 298, [])
+
+    client = db.query(Client).filter(Client.client_id == "CLT0001").one()
+    assert client.max_budget_DZD == 99999999 and client.updated_at is not None
+    assert client.weight_location == float(contacts.loc[0, "weight_location"])
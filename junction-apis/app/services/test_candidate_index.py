@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from app.services.modules.candidate_index import SORT_MAX_SHARE, BuyerIndex
+
+
+def mask_rows(df, price, area=None, strict=False):
+    """The boolean-mask filter of select_buyers that the index replaces."""
+    mask = df["max_budget_DZD"] >= price
+    if strict:
+        mask &= (df["min_budget_DZD"] <= price) & (df["min_area"] <= area) & (df["max_area"] >= area)
+    return np.flatnonzero(mask.to_numpy())
+
+
+def test_index_selects_the_rows_of_the_mask():
+    rng = np.random.default_rng(0)
+    n = 2000
+    # Coarse values so prices and areas land exactly on budget and area boundaries
+    min_budget = rng.integers(1, 20, n) * 1_000_000.0
+    min_area = rng.integers(5, 15, n) * 10.0
+    df = pd.DataFrame({
+        "min_budget_DZD": min_budget,
+        "max_budget_DZD": min_budget + rng.integers(0, 20, n) * 1_000_000.0,
+        "min_area": min_area,
+        "max_area": min_area + rng.integers(0, 10, n) * 10.0,
+    })
+    df.iloc[::97, 1] = np.nan
+    df.iloc[::89, 2] = np.nan
+    index = BuyerIndex.from_frame(df)
+
+    prices = np.unique(df[["min_budget_DZD", "max_budget_DZD"]].to_numpy())
+    prices = np.concatenate([prices, prices + 1, [0.0, 1e12]])
+    areas = np.concatenate([np.unique(df[["min_area", "max_area"]].to_numpy()), [0.0, 1e6]])
+    shares = set()
+    for price in prices:
+        expected = mask_rows(df, price)
+        assert np.array_equal(index.eligible(price), expected)
+        shares.add(len(expected) <= n * SORT_MAX_SHARE)
+        for area in areas[::3]:
+            assert np.array_equal(index.eligible(price, area, strict=True), mask_rows(df, price, area, strict=True))
+    # Both the sorted and the mask path were taken
+    assert shares == {True, False}
+
+    assert len(index.eligible(np.nan)) == 0
+    assert len(index.eligible(1_000_000.0, None, strict=True)) == 0
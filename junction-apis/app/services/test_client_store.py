@@ -0,0 +1,165 @@
+import time
+from datetime import timedelta
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.client import Client
+from app.services.modules.client_store import (
+    CATEGORICAL_CLIENT_FIELDS, CLIENT_FIELDS, COMPACT_ROWS, ClientSnapshot, ClientStore
+)
+
+CONTACTS_PATH = "./app/services/data/Synthetic_Contacts__2000_Buyers_.csv"
+
+
+@pytest.fixture
+def db(tmp_path):
+    """SQLite stand-in with the first 300 synthetic clients."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'clients.db'}")
+    Base.metadata.create_all(engine)
+    contacts = pd.read_csv(CONTACTS_PATH).head(300)
+    columns = [c.name for c in Client.__table__.columns if c.name in contacts.columns]
+    records = contacts[columns].astype(object).where(contacts[columns].notna(), None).to_dict("records")
+    with engine.begin() as connection:
+        connection.execute(Client.__table__.insert(), [dict(r, is_active=True) for r in records])
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def frame(snapshot):
+    """Snapshot contents independent of row order and category lists."""
+    df = snapshot.to_frame().astype({f: object for f in CATEGORICAL_CLIENT_FIELDS})
+    return df.sort_values("client_id").reset_index(drop=True)
+
+
+def assert_same_clients(snapshot, expected):
+    assert len(snapshot) == len(expected)
+    pd.testing.assert_frame_equal(frame(snapshot), frame(expected), check_dtype=False)
+    for client_id in expected.client_ids[:20]:
+        assert snapshot.record(client_id) == pytest.approx(expected.record(client_id))
+
+
+def edit(db, client, **changes):
+    """Change a client as another worker would, stamping updated_at past the snapshot watermark."""
+    for field, value in changes.items():
+        setattr(client, field, value)
+    client.updated_at = db.query(Client).order_by(Client.created_at.desc()).first().created_at + timedelta(minutes=1)
+    db.commit()
+    return client
+
+
+def test_writes_are_layered_until_read_and_match_a_rebuild(db, tmp_path):
+    store = ClientStore(str(tmp_path / "clients.npz"), refresh_seconds=0, save_delay=60)
+    base = store.rebuild(db)
+    clients = db.query(Client).order_by(Client.id).all()
+
+    edit(db, clients[0], max_budget_DZD=123_456_789.0, preferred_location="Atlantis")
+    store.upsert(clients[0])
+    store.remove(clients[1].client_id)
+    edit(db, clients[1], is_active=False)
+    layered = store.snapshot
+    # Nothing was merged: the write shares the base arrays
+    assert layered._layers[0] is base and "client_ids" not in layered.__dict__
+    assert len(layered) == len(base) - 1
+    assert layered.record(clients[0].client_id)["preferred_location"] == "Atlantis"
+    assert layered.record(clients[1].client_id) is None
+
+    assert_same_clients(layered, ClientStore(None).rebuild(db))
+    # Reading merged it; the next write builds on the merged arrays
+    assert layered._layers[0] is layered
+    store.remove(clients[2].client_id)
+    assert store.snapshot._layers[0] is layered
+
+
+def test_large_batches_are_merged_right_away():
+    snapshot = ClientSnapshot.from_frame(pd.read_csv(CONTACTS_PATH).reindex(columns=CLIENT_FIELDS))
+    records = snapshot.to_frame().head(COMPACT_ROWS + 1).to_dict("records")
+    updated = snapshot.with_records(dict(r, min_area=1) for r in records)
+    assert updated._layers[0] is updated
+    assert (updated.numeric["min_area"] == 1).sum() == COMPACT_ROWS + 1
+    assert len(updated) == len(snapshot)
+
+
+def test_load_after_a_write(db, tmp_path):
+    path = str(tmp_path / "clients.npz")
+    store = ClientStore(path, refresh_seconds=0, save_delay=60)
+    store.rebuild(db)
+    client = edit(db, db.query(Client).first(), min_area=7, marital_status="widowed")
+    store.upsert(client)
+    # The write is saved by the debounce timer, or right away on flush
+    assert store._save_timer is not None
+    store.flush()
+    assert store._save_timer is None
+
+    loaded = ClientSnapshot.load(path)
+    assert loaded.version == store.snapshot.version
+    assert loaded.watermark == store.snapshot.watermark
+    assert loaded.record(client.client_id)["marital_status"] == "widowed"
+    assert_same_clients(loaded, store.snapshot)
+
+
+def test_catch_up_from_a_stale_snapshot(db, tmp_path, monkeypatch):
+    path = str(tmp_path / "clients.npz")
+    writer = ClientStore(path, refresh_seconds=0, save_delay=60)
+    writer.rebuild(db)
+    writer.flush()
+
+    # Written by another worker after the snapshot was saved
+    clients = db.query(Client).order_by(Client.id).all()
+    edit(db, clients[0], min_budget_DZD=1.0)
+    edit(db, clients[1], is_active=False)
+    added = Client(**dict(writer.snapshot.record(clients[2].client_id), client_id="C-NEW"), created_at=clients[0].updated_at)
+    db.add(added)
+    db.commit()
+
+    store = ClientStore(path, refresh_seconds=0, save_delay=60)
+    monkeypatch.setattr(store, "rebuild", lambda db: pytest.fail("caught up by a full scan"))
+    snapshot = store.warm_start(db)
+    assert snapshot.record(clients[0].client_id)["min_budget_DZD"] == 1.0
+    assert snapshot.record(clients[1].client_id) is None
+    assert snapshot.record("C-NEW") is not None
+    assert_same_clients(snapshot, ClientStore(None).rebuild(db))
+
+    # A permanent delete leaves no timestamp behind: the count mismatch falls back to a scan
+    db.delete(clients[3])
+    db.commit()
+    store = ClientStore(path, refresh_seconds=0, save_delay=60)
+    assert_same_clients(store.warm_start(db), ClientStore(None).rebuild(db))
+
+
+def test_catch_up_keeps_writes_in_the_watermark_tick(db):
+    store = ClientStore(None, refresh_seconds=0)
+    snapshot = store.rebuild(db)
+    assert store.catch_up(db) is snapshot  # rows at the watermark are already held
+
+    # Another worker writes within the same timestamp tick as the last row seen
+    client = db.query(Client).order_by(Client.id).first()
+    client.min_budget_DZD = 1.0
+    client.updated_at = snapshot.watermark
+    db.commit()
+    assert store.catch_up(db).record(client.client_id)["min_budget_DZD"] == 1.0
+    assert_same_clients(store.snapshot, ClientStore(None).rebuild(db))
+
+
+def test_other_workers_writes_are_picked_up_by_the_loading_thread(db):
+    store = ClientStore(None, refresh_seconds=0.05)
+    store.load_in_background(sessionmaker(bind=db.get_bind()))
+    try:
+        deadline = time.monotonic() + 10
+        while not store.ready and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # Requests only read the snapshot; they never query the table once it is loaded
+        snapshot = store.current(None)
+
+        client = edit(db, db.query(Client).order_by(Client.id).first(), marital_status="widowed")
+        while store.snapshot is snapshot and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert store.snapshot.record(client.client_id)["marital_status"] == "widowed"
+    finally:
+        store.stop()
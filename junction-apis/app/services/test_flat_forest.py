@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from app.services.modules.flat_forest import FlatForest
+from app.services.modules.model_utils import distances_km, get_model_registry
+
+
+def test_flat_forest_matches_small_forest():
+    """Bit-identical probabilities on a freshly trained forest, including single-leaf trees."""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 6)).astype(np.float32)
+    y = (X[:, 0] + X[:, 1] ** 2 > 0.5).astype(int)
+    model = RandomForestClassifier(n_estimators=25, max_depth=None, min_samples_leaf=1, random_state=0).fit(X, y)
+    stump = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, np.zeros(len(X), dtype=int) + (X[:, 0] > 10))
+
+    for forest in (model, stump):
+        flat = FlatForest.from_sklearn(forest)
+        X_test = rng.normal(size=(300, 6)).astype(np.float32)
+        assert np.array_equal(flat.predict_proba(X_test), forest.predict_proba(X_test))
+        assert np.array_equal(flat.predict(X_test), forest.predict(X_test))
+
+
+def test_flat_forest_matches_match_predictor():
+    """Parity against the served match_predictor.pkl on real (buyer, house) pairs."""
+    registry = get_model_registry()
+    flat = FlatForest.from_sklearn(registry.model)
+    contacts = pd.read_csv("./app/services/data/contacts_20k.csv").head(500)
+    houses = pd.read_csv("./app/services/data/synthetic_houses_200.csv", encoding="utf-8-sig").head(8)
+
+    for house in houses.drop(columns=["property_id"]).to_dict("records"):
+        X = registry.encoder.transform(contacts, house, distances_km(contacts["preferred_location"], house["location"]))
+        assert np.array_equal(flat.predict_proba(X), registry.model.predict_proba(X))
+        assert np.array_equal(flat.predict_proba(X[:1]), registry.model.predict_proba(X[:1]))
+
+
+def test_flat_forest_falls_back_on_large_batches():
+    registry = get_model_registry()
+    calls = []
+
+    class Fallback:
+        def predict_proba(self, X):
+            calls.append(len(X))
+            return registry.model.predict_proba(X)
+
+    flat = FlatForest.from_sklearn(registry.model, fallback=Fallback(), max_rows=10)
+    X = np.zeros((11, flat.n_features_in_), dtype=np.float32)
+    assert np.array_equal(flat.predict_proba(X[:10]), registry.model.predict_proba(X[:10]))
+    assert calls == []
+    assert np.array_equal(flat.predict_proba(X), registry.model.predict_proba(X))
+    assert calls == [11]
@@ -0,0 +1,49 @@
+import subprocess
+import sys
+
+# Cumulative `import main` time (python -X importtime, best of 3 warm runs). It was about
+# 2.5 s while the endpoints imported the services monolith; about 1.1 s after the split.
+IMPORT_BUDGET_SECONDS = 2.0
+
+# Only needed to train models, render PDFs or load artifacts, never to serve the first request
+DEFERRED_PACKAGES = ("sklearn", "scipy", "fpdf", "joblib", "app.services.test_model_with_dataset")
+
+# Fails the import if any data file or model artifact is opened while importing the app
+NO_IO_AT_IMPORT = """
+import sys
+
+def audit(event, args):
+    if event == "open" and isinstance(args[0], str) and args[0].endswith((".csv", ".pkl", ".npz")):
+        raise RuntimeError(f"import-time read of {args[0]}")
+
+sys.addaudithook(audit)
+import main
+"""
+
+
+def import_main(*args):
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, check=True)
+
+
+def importtime():
+    """{module: cumulative microseconds} for a fresh `import main`."""
+    stderr = import_main("-X", "importtime", "-c", "import main").stderr
+    times = {}
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, module = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                times[module.strip()] = int(cumulative)
+    return times
+
+
+def test_app_import_stays_lean():
+    import_main("-c", "import main")  # compile the .pyc files first
+    runs = [importtime() for _ in range(3)]
+    loaded = [m for m in runs[0] if m.split(".")[0] in DEFERRED_PACKAGES or m in DEFERRED_PACKAGES]
+    assert loaded == []
+    assert min(run["main"] for run in runs) / 1e6 < IMPORT_BUDGET_SECONDS
+
+
+def test_app_import_does_no_io():
+    import_main("-c", NO_IO_AT_IMPORT)
@@ -0,0 +1,95 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.database import Base
+from app.models.client import Client
+from app.models.match_score import MatchScore
+from app.models.property import Property
+from app.services.modules.client_store import ClientStore
+from app.services.modules.match_scores import rebuild_match_scores, rescore_client, rescore_property
+from app.services.modules.model_utils import get_model_registry
+
+CONTACTS_PATH = "./app/services/data/Synthetic_Contacts__2000_Buyers_.csv"
+PROPERTIES_PATH = "./app/services/data/synthetic_houses_200.csv"
+TOP_K = 4
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """SQLite stand-in with 400 clients and 30 properties, keeping a small top k."""
+    monkeypatch.setattr(settings, "STORED_TOP_K", TOP_K)
+    engine = create_engine(f"sqlite:///{tmp_path / 'scores.db'}")
+    Base.metadata.create_all(engine)
+    contacts = pd.read_csv(CONTACTS_PATH).head(400)
+    properties = pd.read_csv(PROPERTIES_PATH, encoding="utf-8-sig").head(30)
+    with engine.begin() as connection:
+        for model, frame in ((Client, contacts), (Property, properties)):
+            columns = [c.name for c in model.__table__.columns if c.name in frame.columns]
+            records = frame[columns].astype(object).where(frame[columns].notna(), None).to_dict("records")
+            connection.execute(model.__table__.insert(), [dict(r, is_active=True) for r in records])
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def stored(db):
+    """Every stored score and Property.match, comparable across runs."""
+    scores = sorted(
+        (s.property_id, s.client_id, s.distance_km, s.confidence_model, s.confidence)
+        for s in db.query(MatchScore)
+    )
+    return scores, dict(db.query(Property.property_id, Property.match).all())
+
+
+def assert_matches_a_full_rebuild(db, registry, snapshot):
+    incremental = stored(db)
+    rebuild_match_scores(db, registry, snapshot, verbose=False)
+    assert incremental == stored(db)
+
+
+def test_top_k_per_property_and_per_client(db):
+    registry = get_model_registry()
+    snapshot = ClientStore(None).rebuild(db)
+    stats = rebuild_match_scores(db, registry, snapshot, verbose=False)
+
+    rows = pd.DataFrame(stored(db)[0], columns=["property_id", "client_id", "distance", "model", "confidence"])
+    assert stats["rows"] == len(rows)
+    assert rows.groupby("property_id").size().max() > TOP_K  # clients' own picks come on top
+    # Every stored row is in its property's or its client's top k
+    by_property = rows.sort_values(["property_id", "confidence", "client_id"], ascending=[True, False, True])
+    by_client = rows.sort_values(["client_id", "confidence", "property_id"], ascending=[True, False, True])
+    in_top = by_property.groupby("property_id").cumcount().lt(TOP_K) | by_client.groupby("client_id").cumcount().lt(TOP_K)
+    assert in_top.all()
+
+
+def test_incremental_rescoring_matches_a_full_rebuild(db):
+    registry = get_model_registry()
+    store = ClientStore(None)
+    rebuild_match_scores(db, registry, store.rebuild(db), verbose=False)
+
+    # A property every client wants now, one nobody can afford and one taken off the market
+    properties = db.query(Property).order_by(Property.property_id).all()
+    properties[0].price_DZD = 1_000_000
+    properties[1].price_DZD = 1e12
+    properties[2].is_active = False
+    db.commit()
+    for prop in properties[:3]:
+        rescore_property(db, registry, store.snapshot, prop.property_id)
+        assert_matches_a_full_rebuild(db, registry, store.snapshot)
+
+    # A client that outbids everyone, one who left and a new one
+    clients = db.query(Client).order_by(Client.id).all()
+    clients[0].max_budget_DZD = 1e12
+    clients[1].is_active = False
+    new_client = Client(**dict(store.snapshot.record(clients[2].client_id), client_id="C-NEW"))
+    db.add(new_client)
+    db.commit()
+    for client in (clients[0], clients[1], new_client):
+        store.upsert(client)
+        rescore_client(db, registry, store.snapshot, client.client_id)
+        assert_matches_a_full_rebuild(db, registry, store.snapshot)
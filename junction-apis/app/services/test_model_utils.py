@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+from app.services.modules.model_utils import (
+    UNKNOWN_DISTANCE_KM, WILAYA_COORDS, FeatureEncoder, city_codes, distances_km, get_model_registry,
+    haversine_distance, top_k_indices
+)
+
+BUYER_COLUMNS = [
+    "client_id", "preferred_location", "min_budget_DZD", "max_budget_DZD",
+    "min_area", "max_area", "preferred_property_type", "marital_status", "has_kids"
+]
+
+
+def test_distance_matrix_matches_haversine():
+    """Every wilaya pair, against the per-pair haversine_distance it replaced."""
+    cities = list(WILAYA_COORDS)
+    buyers = pd.Series([a for a in cities for _ in cities])
+    houses = pd.Series([b for _ in cities for b in cities])
+    expected = [haversine_distance(a, b) for a, b in zip(buyers, houses)]
+    assert distances_km(buyers, houses).tolist() == expected
+    # Categorical columns, as read from the client snapshot
+    assert distances_km(buyers.astype("category"), houses.astype("category")).tolist() == expected
+
+
+def test_unknown_locations_fall_back_like_haversine():
+    buyers = pd.Series(["Alger", "Atlantis", None, "Oran", "alger"])
+    for house in ("Oran", "Atlantis"):
+        expected = [haversine_distance(b, house) for b in buyers]
+        assert distances_km(buyers, house).tolist() == expected
+        assert distances_km(buyers.astype("category"), house).tolist() == expected
+    assert haversine_distance("Atlantis", "Oran") == UNKNOWN_DISTANCE_KM
+    assert distances_km("Atlantis", "Atlantis").tolist() == UNKNOWN_DISTANCE_KM
+    assert city_codes(None) == city_codes("Atlantis")
+    assert np.array_equal(city_codes(pd.Series([np.nan, "Oran"])), [city_codes("Atlantis"), city_codes("Oran")])
+
+
+def get_dummies_matrix(contacts, house, expected_columns):
+    """The scoring matrix as predict_matches built it before FeatureEncoder."""
+    df = contacts.copy()
+    for key, value in house.items():
+        df[key] = value
+    df["distance_km"] = [haversine_distance(b, house.get("location")) for b in df["preferred_location"]]
+    input_df = pd.get_dummies(df.drop(columns=["preferred_location", "location"], errors="ignore"))
+    return input_df.reindex(columns=expected_columns, fill_value=0).to_numpy(dtype=np.float32)
+
+
+def test_feature_encoder_matches_get_dummies():
+    expected_columns = list(get_model_registry().expected_columns)
+    encoder = FeatureEncoder.from_columns(expected_columns)
+    contacts = pd.read_csv("./app/services/data/contacts_20k.csv", usecols=BUYER_COLUMNS).sample(300, random_state=0)
+    # Categories the model never saw; a missing buyer column and house field are checked below
+    contacts.iloc[::7, contacts.columns.get_loc("preferred_property_type")] = "castle"
+    contacts.iloc[::11, contacts.columns.get_loc("marital_status")] = "unknown"
+    contacts.iloc[::13, contacts.columns.get_loc("preferred_location")] = "Atlantis"
+    houses = pd.read_csv("./app/services/data/synthetic_houses_200.csv", encoding="utf-8-sig").drop(columns=["property_id"])
+    records = houses.sample(6, random_state=0).to_dict("records")
+    records[0]["property_type"] = "castle"
+    del records[1]["parks_nearby"]
+
+    # Categorical columns, as the client store holds them
+    categorical = contacts.astype({c: "category" for c in ("preferred_location", "preferred_property_type", "marital_status")})
+    for frame in (contacts, contacts.drop(columns=["max_area"]), categorical):
+        for house in records:
+            distances = distances_km(frame["preferred_location"], house["location"])
+            X = encoder.transform(frame, house, distances)
+            assert np.array_equal(X, get_dummies_matrix(frame, house, expected_columns))
+
+
+def test_top_k_matches_a_stable_descending_sort():
+    rng = np.random.default_rng(0)
+    # Rounded like blend_confidences, so there are plenty of ties
+    for scores in (rng.random(500).round(2), np.repeat([0.5, 0.9, 0.1], 4), np.ones(7), np.array([0.3])):
+        expected = pd.Series(scores).sort_values(ascending=False, kind="stable").index.to_numpy()
+        for k in (1, 3, 10, len(scores) - 1, len(scores), len(scores) + 5, None):
+            assert top_k_indices(scores, k).tolist() == expected[:k].tolist()
+    # Ties break by row index: the earliest of the tied rows win
+    assert top_k_indices(np.array([0.2, 0.7, 0.7, 0.1, 0.7]), 2).tolist() == [1, 2]
+    assert top_k_indices(np.array([0.2, 0.7]), 0).tolist() == []
+    assert top_k_indices(np.array([]), 3).tolist() == []
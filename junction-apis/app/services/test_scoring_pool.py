@@ -0,0 +1,103 @@
+import os
+import signal
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.modules.client_store import ClientSnapshot
+from app.services.modules.model_utils import get_model_registry
+from app.services.modules.scoring_pool import ScoringPool
+from app.services.modules.recommendation import get_bulk_recommendations, predict_matches, recommend_houses_for_client
+
+CONTACTS_PATH = "./app/services/data/Synthetic_Contacts__2000_Buyers_.csv"
+PROPERTIES_PATH = "./app/services/data/synthetic_houses_200.csv"
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = ScoringPool(processes=2, task_rows=500)
+    pool.start(get_model_registry())
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture(scope="module")
+def snapshot():
+    return ClientSnapshot.from_frame(pd.read_csv(CONTACTS_PATH))
+
+
+@pytest.fixture(scope="module")
+def houses():
+    return pd.read_csv(PROPERTIES_PATH, encoding="utf-8-sig").head(12).to_dict("records")
+
+
+def test_pool_matches_in_process_scoring(pool, snapshot, houses):
+    registry = get_model_registry()
+    kwargs = dict(
+        contacts_df=snapshot.to_frame(), model=registry.scorer, expected_columns=registry.expected_columns,
+        encoder=registry.encoder, buyer_index=snapshot.buyer_index, top_n=10, show_explanations=True
+    )
+    expected = get_bulk_recommendations(houses, **kwargs)
+    with pool.session(snapshot, registry.encoder) as pooled:
+        assert pooled is not None
+        assert get_bulk_recommendations(houses, pool=pooled, **kwargs) == expected
+        single = predict_matches(
+            registry.scorer, registry.expected_columns, houses[0], snapshot.to_frame(), include_explanations=True,
+            encoder=registry.encoder, buyer_index=snapshot.buyer_index, pool=pooled
+        )
+    assert single == expected["properties_results"][0]["prediction_result"]
+
+
+def test_pool_matches_in_process_scoring_for_a_client(pool, snapshot):
+    registry = get_model_registry()
+    client_id = snapshot.client_ids[7]
+    kwargs = dict(
+        client_id=client_id, buyers_df=pd.DataFrame([snapshot.record(client_id)]),
+        houses_df=pd.read_csv(PROPERTIES_PATH, encoding="utf-8-sig"), model=registry.scorer,
+        expected_columns=registry.expected_columns, encoder=registry.encoder, top_n=10
+    )
+    expected = recommend_houses_for_client(**kwargs)
+    assert expected["recommendations"]
+    with pool.session(snapshot, registry.encoder) as pooled:
+        assert recommend_houses_for_client(pool=pooled, position=snapshot.index[client_id], **kwargs) == expected
+
+
+def test_superseded_snapshot_is_released_after_its_last_session(pool, snapshot, houses):
+    encoder = get_model_registry().encoder
+    positions = snapshot.buyer_index.eligible(houses[0]["price_DZD"])
+    distances = np.zeros(len(positions))
+    with pool.session(snapshot, encoder) as old:
+        newer = snapshot.without([snapshot.client_ids[0]])
+        with pool.session(newer, encoder) as new:
+            assert new.buyers is not old.buyers
+            assert pool._retired == [old.buyers]
+            # The superseded block keeps serving the session that still holds it
+            (probas,) = old.predict_pairs(houses[:1], [positions], [distances])
+            assert len(probas) == len(positions)
+    assert pool._retired == []
+
+
+def test_a_dead_worker_falls_back_in_process_and_the_pool_restarts(pool, snapshot, houses):
+    registry = get_model_registry()
+    kwargs = dict(
+        contacts_df=snapshot.to_frame(), model=registry.scorer, expected_columns=registry.expected_columns,
+        encoder=registry.encoder, buyer_index=snapshot.buyer_index, top_n=10, show_explanations=False
+    )
+    expected = get_bulk_recommendations(houses, **kwargs)
+    with pool.session(snapshot, registry.encoder) as pooled:
+        os.kill(next(iter(pool.executor._processes)), signal.SIGKILL)
+        # This request is scored in-process
+        assert get_bulk_recommendations(houses, pool=pooled, **kwargs) == expected
+    assert not pool.ready and pool.executor is None
+
+    # The next session starts a new pool in the background and scores in-process meanwhile
+    with pool.session(snapshot, registry.encoder) as pooled:
+        assert pooled is None
+    deadline = time.monotonic() + 60
+    while not pool.ready and time.monotonic() < deadline:
+        time.sleep(0.1)
+    with pool.session(snapshot, registry.encoder) as pooled:
+        assert pooled is not None
+        assert get_bulk_recommendations(houses, pool=pooled, **kwargs) == expected
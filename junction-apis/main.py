@@ -1,8 +1,17 @@
+import anyio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.core.config import settings
 from app.api.v1.api import api_router
+from app.core.database import SessionLocal
+from app.services.modules.model_utils import model_registry
+from app.services.modules.client_store import client_store
+from app.services.modules.scoring_pool import scoring_pool
+from app.services.modules.bulk_jobs import bulk_job_worker
+from app.services.modules.match_scores import incremental_rescoring
+from app.services.modules.timing import metrics, record_request_timings
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -18,12 +27,70 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Keyset pagination cursor of the listings, read by the dashboard on another origin
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Server-Timing header on every response, request and stage metrics for /metrics
+app.middleware("http")(record_request_timings)
+
 
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+@app.on_event("startup")
+async def size_threadpool():
+    # Sync endpoints (all DB and scoring work) run in anyio's worker threads
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+
+@app.on_event("startup")
+def load_match_model():
+    # Load the model once per worker; /api/v1/ready reports when it is resident
+    model_registry.load_in_background()
+
+@app.on_event("startup")
+def load_client_store():
+    # Warm columnar copy of the active clients used by the recommendation endpoints
+    client_store.load_in_background(SessionLocal)
+
+@app.on_event("startup")
+def start_incremental_rescoring():
+    # Creates the match_scores table (mode=stored reads it; rows come from
+    # python -m app.scripts.rebuild_match_scores) and keeps it current after writes
+    try:
+        incremental_rescoring.start(SessionLocal)
+    except Exception as e:
+        print(f" ⚠️  Could not create the match_scores table: {e}")
+
+@app.on_event("startup")
+def start_scoring_pool():
+    # Scoring worker processes (SCORING_PROCESSES > 0); requests score in-process until they are up
+    if scoring_pool.enabled:
+        scoring_pool.start_in_background(model_registry)
+
+@app.on_event("startup")
+def start_bulk_job_worker():
+    # Local worker for /recommendations/jobs (the bulk_jobs table is the queue)
+    bulk_job_worker.start(SessionLocal)
+
+@app.on_event("shutdown")
+def stop_bulk_job_worker():
+    bulk_job_worker.stop()
+
+@app.on_event("shutdown")
+def stop_scoring_pool():
+    scoring_pool.shutdown()
+
+@app.on_event("shutdown")
+def save_client_store():
+    # Stops the catch-up loop, then saves the writes since the last debounced save
+    client_store.stop()
+    client_store.flush()
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 async def root():
     return {